@@ -1,20 +1,50 @@
 """
 Job (任务) API 路由
 """
-from fastapi import APIRouter, HTTPException, status
+import asyncio
+from typing import Any, AsyncIterator, Dict, Literal, Optional
 
+from fastapi import APIRouter, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+
+from app.api.podcasts import build_audio_url, NO_CACHE_HEADERS
 from app.schemas.podcast import JobResponse
 from app.services.data_service import data_service
 
 router = APIRouter(prefix="/api/v1/jobs", tags=["jobs"])
 
+# 任务事件流：服务端检查任务状态的间隔（秒）、无变化时发送心跳的间隔（秒）及单个连接的最长持续时间（秒）
+JOB_EVENTS_INTERVAL = 0.5
+JOB_EVENTS_HEARTBEAT = 15
+JOB_EVENTS_MAX_DURATION = 600
+
+# 任务结束状态：推送后关闭事件流
+TERMINAL_STATUSES = frozenset({"completed", "failed"})
+
+
+def _attach_podcast(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    在任务数据中附带关联的播客详情
+    
+    与播客详情接口一致：有音频文件时使用流式播放 URL
+    """
+    podcast = data_service.get_podcast(job["podcast_id"])
+    if podcast and podcast.get("audio_s3_key"):
+        podcast["audio_url"] = build_audio_url(podcast["id"])
+    job["podcast"] = podcast
+    return job
+
 
 @router.get("/{job_id}", response_model=JobResponse)
-async def get_job(job_id: str):
+async def get_job(
+    job_id: str,
+    include: Optional[Literal["podcast"]] = Query(None, description="附带返回关联数据：podcast")
+):
     """
     获取任务状态
     
     - **job_id**: 任务ID
+    - **include**: 为 podcast 时同时返回关联播客的详情，轮询方无需再单独请求播客接口
     
     返回任务的当前状态、进度和错误信息（如果有）
     """
@@ -26,5 +56,72 @@ async def get_job(job_id: str):
             detail=f"任务不存在: {job_id}"
         )
     
+    if include == "podcast":
+        _attach_podcast(job)
+    
     return job
 
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    以 Server-Sent Events 推送任务状态
+    
+    - **job_id**: 任务ID
+    
+    连接建立后立即推送一次当前状态，之后每当状态、进度或提示信息变化时推送一次（data 为 JSON，
+    结构同任务状态接口）；任务完成或失败时附带关联播客详情并关闭连接。
+    客户端无需反复轮询，状态变化后很快即可收到
+    """
+    job = data_service.get_job(job_id)
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"任务不存在: {job_id}"
+        )
+    
+    return StreamingResponse(
+        _iter_job_events(job_id, job),
+        media_type="text/event-stream",
+        headers=NO_CACHE_HEADERS
+    )
+
+
+async def _iter_job_events(job_id: str, job: Optional[Dict[str, Any]]) -> AsyncIterator[str]:
+    """
+    生成任务事件流：服务端定期读取任务记录，只在内容变化时推送
+    
+    Args:
+        job_id: 任务ID
+        job: 已读取的任务数据
+    
+    Yields:
+        SSE 消息（data 帧或心跳注释行）
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + JOB_EVENTS_MAX_DURATION
+    last_sent_at = loop.time()
+    last_frame = None
+    
+    # 任务被删除（记录不存在）或连接超过最长持续时间时结束
+    while job is not None and loop.time() < deadline:
+        finished = job.get("status") in TERMINAL_STATUSES
+        if finished:
+            _attach_podcast(job)
+        
+        frame = JobResponse.model_validate(job).model_dump_json()
+        if frame != last_frame:
+            yield f"data: {frame}\n\n"
+            last_frame = frame
+            last_sent_at = loop.time()
+        elif loop.time() - last_sent_at >= JOB_EVENTS_HEARTBEAT:
+            # 心跳：避免客户端或代理因长时间无数据断开连接
+            yield ": keep-alive\n\n"
+            last_sent_at = loop.time()
+        
+        if finished:
+            return
+        
+        await asyncio.sleep(JOB_EVENTS_INTERVAL)
+        job = data_service.get_job(job_id)
@@ -1,20 +1,93 @@
 """
 Podcast API 路由
 """
-from fastapi import APIRouter, File, UploadFile, HTTPException, status, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, BackgroundTasks, File, UploadFile, HTTPException, status, Query, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse, RedirectResponse
+from starlette.background import BackgroundTask
+from botocore.exceptions import ClientError
 from typing import Optional, List
+import itertools
 import uuid
+import asyncio
+import logging
 from pathlib import Path
-import io
 
-from app.schemas.podcast import UploadResponse, ApiResponse, PodcastResponse, GenerateRequest, AnalyzeAndGenerateRequest, YouTubeGenerateRequest
+from app.schemas.podcast import UploadResponse, ApiResponse, PodcastResponse, GenerateRequest, AnalyzeAndGenerateRequest, YouTubeGenerateRequest, TTSStreamRequest
 from app.services.data_service import data_service
-from app.utils.s3_storage import s3_storage
+from app.services.ai_service import get_ai_service
+from app.services.youtube_extractor import youtube_extractor
+from app.utils.s3_storage import s3_storage, build_content_disposition
+from app.tasks.process_podcast import (
+    start_processing_task,
+    start_analyze_generate_task,
+    start_youtube_generate_task
+)
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/v1/podcasts", tags=["podcasts"])
 
+# 流式播放时每次从 S3 读取并发送给客户端的块大小
+STREAM_CHUNK_SIZE = 64 * 1024
+# 不超过该大小的音频数据（如浏览器的小范围 Range 请求）一次性读取并发送
+STREAM_ONE_SHOT_MAX_SIZE = 1024 * 1024
+
+# 上传校验和 URL 构建用到的配置，导入时计算一次
+ALLOWED_EXTENSIONS = frozenset(ext.lower() for ext in settings.allowed_extensions)
+ALLOWED_EXTENSIONS_HELP = ', '.join(sorted(ALLOWED_EXTENSIONS))
+MAX_UPLOAD_SIZE = settings.max_upload_size
+MAX_UPLOAD_SIZE_MB = MAX_UPLOAD_SIZE / (1024 * 1024)
+API_DOMAIN = settings.api_domain
+
+# 动态内容的缓存控制头，避免浏览器缓存
+NO_CACHE_HEADERS = {
+    "Cache-Control": "no-cache, no-store, must-revalidate",
+    "Pragma": "no-cache",
+    "Expires": "0"
+}
+
+
+def build_audio_url(podcast_id: str) -> str:
+    """
+    构建播客的流式播放 URL
+    
+    使用完整的后端流式播放 URL（支持 Vercel 等跨域部署）
+    """
+    return f"{API_DOMAIN}/api/v1/podcasts/{podcast_id}/stream"
+
+
+def get_file_extension(filename: str) -> str:
+    """
+    获取小写的文件扩展名（含点号），如 "Talk.MP3" -> ".mp3"
+    
+    与 Path(filename).suffix.lower() 结果一致，但不需要构造 Path 对象
+    """
+    name, dot, ext = filename.lower().rpartition('.')
+    if not dot or not name or not ext:
+        return ""
+    return f".{ext}"
+
+
+def get_upload_size(file: UploadFile) -> int:
+    """
+    获取上传文件大小（字节）
+    
+    优先使用 UploadFile.size / 分段的 Content-Length 头，
+    只有两者都缺失时才回退到 seek 探测，避免强制读完整个临时文件
+    """
+    if file.size is not None:
+        return file.size
+    
+    content_length = file.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        return int(content_length)
+    
+    file.file.seek(0, 2)  # 移动到文件末尾
+    file_size = file.file.tell()
+    file.file.seek(0)  # 重置到开头
+    return file_size
+
 
 def validate_file(file: UploadFile) -> tuple[bool, Optional[str]]:
     """
@@ -27,19 +100,16 @@ def validate_file(file: UploadFile) -> tuple[bool, Optional[str]]:
     if not file.filename:
         return False, "文件名不能为空"
     
-    # 检查文件扩展名
-    file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in settings.allowed_extensions:
-        return False, f"不支持的文件类型: {file_ext}。支持的类型: {', '.join(settings.allowed_extensions)}"
+    # 先检查扩展名，类型不对的文件无需读取大小
+    file_ext = get_file_extension(file.filename)
+    if file_ext not in ALLOWED_EXTENSIONS:
+        return False, f"不支持的文件类型: {file_ext}。支持的类型: {ALLOWED_EXTENSIONS_HELP}"
     
     # 检查文件大小
-    file.file.seek(0, 2)  # 移动到文件末尾
-    file_size = file.file.tell()
-    file.file.seek(0)  # 重置到开头
+    file_size = get_upload_size(file)
     
-    if file_size > settings.max_upload_size:
-        max_size_mb = settings.max_upload_size / (1024 * 1024)
-        return False, f"文件过大: {file_size / (1024 * 1024):.2f}MB。最大允许: {max_size_mb}MB"
+    if file_size > MAX_UPLOAD_SIZE:
+        return False, f"文件过大: {file_size / (1024 * 1024):.2f}MB。最大允许: {MAX_UPLOAD_SIZE_MB}MB"
     
     if file_size == 0:
         return False, "文件为空"
@@ -48,7 +118,7 @@ def validate_file(file: UploadFile) -> tuple[bool, Optional[str]]:
 
 
 @router.post("/upload", response_model=UploadResponse)
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     """
     上传文件创建播客
     
@@ -66,15 +136,12 @@ async def upload_file(file: UploadFile = File(...)):
         )
     
     try:
-        # 2. 上传文件到 S3
-        file_content = await file.read()
-        
-        # 重新包装为 BytesIO 对象
-        import io
-        file_obj = io.BytesIO(file_content)
+        # 2. 流式上传文件到 S3（不把整个文件读入内存）
+        file_size = get_upload_size(file)
         
-        s3_key = s3_storage.upload_file(
-            file_obj=file_obj,
+        s3_key = await asyncio.to_thread(
+            s3_storage.upload_fileobj,
+            file_obj=file.file,
             original_filename=file.filename,
             prefix="uploads",
             content_type=file.content_type
@@ -87,8 +154,8 @@ async def upload_file(file: UploadFile = File(...)):
             )
         
         # 3. 创建 podcast 和 job 记录
-        podcast_id = str(uuid.uuid4())
-        job_id = str(uuid.uuid4())
+        podcast_id = uuid.uuid4().hex
+        job_id = uuid.uuid4().hex
         
         # 确定文件类型
         file_type = "text"  # 默认是文本/文档
@@ -104,7 +171,7 @@ async def upload_file(file: UploadFile = File(...)):
             "title": file.filename,  # 使用文件名作为标题
             "original_filename": file.filename,
             "s3_key": s3_key,
-            "file_size_bytes": len(file_content),
+            "file_size_bytes": file_size,
             "status": "processing",
             # 新增字段：支持多种内容源
             "source_type": file_type,
@@ -114,15 +181,6 @@ async def upload_file(file: UploadFile = File(...)):
             "original_format": file.filename.split('.')[-1].lower() if '.' in file.filename else None
         }
         
-        success = data_service.save_podcast(podcast_data)
-        if not success:
-            # 回滚 S3 上传
-            s3_storage.delete_file(s3_key)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="保存播客记录失败"
-            )
-        
         # 保存 job 记录
         job_data = {
             "id": job_id,
@@ -132,19 +190,17 @@ async def upload_file(file: UploadFile = File(...)):
             "s3_key": s3_key
         }
         
-        success = data_service.save_job(job_data)
+        success = data_service.save_podcast_with_job(podcast_data, job_data)
         if not success:
-            # 回滚
-            data_service.delete_podcast(podcast_id)
-            s3_storage.delete_file(s3_key)
+            # 回滚 S3 上传
+            await asyncio.to_thread(s3_storage.delete_file, s3_key)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="保存任务记录失败"
+                detail="保存播客记录失败"
             )
         
         # 4. 启动后台处理
-        from app.tasks.process_podcast import start_processing_task
-        start_processing_task(podcast_id, job_id, s3_key)
+        background_tasks.add_task(start_processing_task, podcast_id, job_id, s3_key)
         
         # 5. 返回响应
         return UploadResponse(
@@ -157,7 +213,7 @@ async def upload_file(file: UploadFile = File(...)):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ 上传异常: {e}")
+        logger.exception("❌ 上传异常")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"文件上传失败: {str(e)}"
@@ -177,50 +233,22 @@ async def get_podcasts(
     - **limit**: 每页数量（1-100）
     - **search**: 搜索关键词（匹配标题）
     """
-    from fastapi.responses import JSONResponse
-    
     try:
-        # 读取所有播客
-        all_podcasts = data_service.read_podcasts()
-        
-        # 搜索过滤
-        if search:
-            search_lower = search.lower()
-            all_podcasts = [
-                p for p in all_podcasts 
-                if search_lower in p.get("title", "").lower()
-            ]
-        
-        # 排序：按创建时间降序
-        all_podcasts.sort(
-            key=lambda x: x.get("created_at", ""),
-            reverse=True
-        )
-        
-        # 分页
-        start = (page - 1) * limit
-        end = start + limit
-        podcasts = all_podcasts[start:end]
+        podcasts, total = data_service.list_podcasts(page=page, limit=limit, search=search)
         
         # 为每个播客设置流式播放 URL
-        from app.config import settings
         for podcast in podcasts:
             if podcast.get("audio_s3_key"):
-                # 使用完整的后端流式播放 URL（支持 Vercel 等跨域部署）
-                podcast["audio_url"] = f"{settings.api_domain}/api/v1/podcasts/{podcast['id']}/stream"
+                podcast["audio_url"] = build_audio_url(podcast["id"])
         
         # 返回带缓存控制头的响应，避免浏览器缓存动态内容
-        return JSONResponse(
+        return ORJSONResponse(
             content=podcasts,
-            headers={
-                "Cache-Control": "no-cache, no-store, must-revalidate",
-                "Pragma": "no-cache",
-                "Expires": "0"
-            }
+            headers={"X-Total-Count": str(total), **NO_CACHE_HEADERS}
         )
     
     except Exception as e:
-        print(f"❌ 获取播客列表异常: {e}")
+        logger.exception("❌ 获取播客列表异常")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"获取播客列表失败: {str(e)}"
@@ -234,8 +262,6 @@ async def get_podcast(podcast_id: str):
     
     - **podcast_id**: 播客ID
     """
-    from fastapi.responses import JSONResponse
-    
     podcast = data_service.get_podcast(podcast_id)
     
     if not podcast:
@@ -246,19 +272,10 @@ async def get_podcast(podcast_id: str):
     
     # 如果有音频文件，使用流式播放 URL
     if podcast.get("audio_s3_key"):
-        # 使用完整的后端流式播放 URL（支持 Vercel 等跨域部署）
-        from app.config import settings
-        podcast["audio_url"] = f"{settings.api_domain}/api/v1/podcasts/{podcast_id}/stream"
+        podcast["audio_url"] = build_audio_url(podcast_id)
     
     # 返回带缓存控制头的响应，避免浏览器缓存动态内容
-    return JSONResponse(
-        content=podcast,
-        headers={
-            "Cache-Control": "no-cache, no-store, must-revalidate",
-            "Pragma": "no-cache",
-            "Expires": "0"
-        }
-    )
+    return ORJSONResponse(content=podcast, headers=NO_CACHE_HEADERS)
 
 
 @router.delete("/{podcast_id}")
@@ -278,15 +295,12 @@ async def delete_podcast(podcast_id: str):
                 detail=f"播客不存在: {podcast_id}"
             )
         
-        # 删除 S3 文件
-        s3_key = podcast.get("s3_key")
-        if s3_key:
-            s3_storage.delete_file(s3_key)
-        
-        # 删除音频文件（如果存在）
-        audio_s3_key = podcast.get("audio_s3_key")
-        if audio_s3_key:
-            s3_storage.delete_file(audio_s3_key)
+        # 一次请求删除源文件和音频文件（如果存在）
+        s3_keys = [
+            key for key in (podcast.get("s3_key"), podcast.get("audio_s3_key"))
+            if key
+        ]
+        await asyncio.to_thread(s3_storage.delete_files, s3_keys)
         
         # 删除数据库记录
         success = data_service.delete_podcast(podcast_id)
@@ -305,7 +319,7 @@ async def delete_podcast(podcast_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ 删除播客异常: {e}")
+        logger.exception("❌ 删除播客异常")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"删除播客失败: {str(e)}"
@@ -341,7 +355,8 @@ async def download_podcast(podcast_id: str):
         
         # 生成预签名 URL（1小时有效期），强制下载
         filename = f"{podcast.get('title', 'podcast')}.mp3"
-        download_url = s3_storage.generate_presigned_url(
+        download_url = await asyncio.to_thread(
+            s3_storage.generate_presigned_url,
             audio_s3_key,
             expires_in=3600,
             filename=filename,
@@ -364,7 +379,7 @@ async def download_podcast(podcast_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ 获取下载链接异常: {e}")
+        logger.exception("❌ 获取下载链接异常")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"获取下载链接失败: {str(e)}"
@@ -372,13 +387,14 @@ async def download_podcast(podcast_id: str):
 
 
 @router.get("/{podcast_id}/stream")
-async def stream_podcast(podcast_id: str):
+async def stream_podcast(podcast_id: str, request: Request):
     """
     流式播放播客音频
     
     - **podcast_id**: 播客ID
     
-    直接从 S3 流式传输音频数据
+    默认重定向到 S3 预签名 URL，由 S3 直接提供音频（支持 Range）；
+    设置 stream_via_backend 时由后端分块转发 S3 数据（适用于私有桶）
     """
     try:
         # 获取播客信息
@@ -398,38 +414,105 @@ async def stream_podcast(podcast_id: str):
                 detail="播客音频尚未生成，请稍后再试"
             )
         
-        # 从 S3 下载音频数据
-        audio_data = s3_storage.download_file(audio_s3_key)
-        if not audio_data:
+        # 默认直接重定向到 S3，避免后端在整个播放期间代理音频数据
+        if not settings.stream_via_backend:
+            stream_url = await asyncio.to_thread(
+                s3_storage.generate_presigned_url,
+                audio_s3_key,
+                expires_in=settings.stream_url_expires_in,
+                force_download=False
+            )
+            
+            if not stream_url:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="生成播放链接失败"
+                )
+            
+            return RedirectResponse(
+                stream_url,
+                status_code=status.HTTP_307_TEMPORARY_REDIRECT
+            )
+        
+        filename = f"{podcast.get('title', 'podcast')}.mp3"
+        
+        headers = {
+            "Content-Disposition": build_content_disposition(filename, "inline"),
+            "Accept-Ranges": "bytes",
+            "Cache-Control": "public, max-age=3600"
+        }
+        
+        range_header = request.headers.get("range")
+        
+        # 请求整个文件：分段并行下载，经有界队列转发
+        if not range_header:
+            object_size = await asyncio.to_thread(s3_storage.get_object_size, audio_s3_key)
+            if object_size is None:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="音频文件读取失败"
+                )
+            
+            if object_size > STREAM_ONE_SHOT_MAX_SIZE:
+                headers["Content-Length"] = str(object_size)
+                return StreamingResponse(
+                    s3_storage.iter_object_chunks(audio_s3_key),
+                    media_type="audio/mpeg",
+                    headers=headers
+                )
+        
+        # 将客户端的 Range 头转发给 S3，只读取需要的字节范围
+        try:
+            s3_response = await asyncio.to_thread(
+                s3_storage.get_object_stream, audio_s3_key, range_header
+            )
+        except ClientError:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="音频文件下载失败"
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                detail=f"无效的 Range 请求: {range_header}"
             )
         
-        # 对文件名进行URL编码以支持中文
-        from urllib.parse import quote
-        from io import BytesIO
+        if not s3_response:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="音频文件读取失败"
+            )
         
-        filename = podcast.get('title', 'podcast')
-        encoded_filename = quote(filename)
+        headers["Content-Length"] = str(s3_response['ContentLength'])
+        
+        content_range = s3_response.get('ContentRange')
+        if content_range:
+            headers["Content-Range"] = content_range
+        
+        status_code = status.HTTP_206_PARTIAL_CONTENT if content_range else status.HTTP_200_OK
+        body = s3_response['Body']
+        
+        # 小数据一次性读取，作为单个响应体发送
+        if s3_response['ContentLength'] <= STREAM_ONE_SHOT_MAX_SIZE:
+            try:
+                audio_data = await asyncio.to_thread(body.read)
+            finally:
+                body.close()
+            return Response(
+                content=audio_data,
+                status_code=status_code,
+                media_type="audio/mpeg",
+                headers=headers
+            )
         
-        # 使用 BytesIO 包装音频数据，确保可以被多次读取
-        # 并添加 Content-Length 头让浏览器知道音频总长度
+        # 按块转发 S3 数据，发送完毕后关闭 S3 连接
         return StreamingResponse(
-            BytesIO(audio_data),
+            body.iter_chunks(chunk_size=STREAM_CHUNK_SIZE),
+            status_code=status_code,
             media_type="audio/mpeg",
-            headers={
-                "Content-Disposition": f"inline; filename*=UTF-8''{encoded_filename}.mp3",
-                "Content-Length": str(len(audio_data)),
-                "Accept-Ranges": "bytes",
-                "Cache-Control": "public, max-age=3600"
-            }
+            headers=headers,
+            background=BackgroundTask(body.close)
         )
     
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ 流式播放异常: {e}")
+        logger.exception("❌ 流式播放异常")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"流式播放失败: {str(e)}"
@@ -437,7 +520,7 @@ async def stream_podcast(podcast_id: str):
 
 
 @router.post("/generate", response_model=UploadResponse)
-async def generate_podcast(request: GenerateRequest):
+async def generate_podcast(request: GenerateRequest, background_tasks: BackgroundTasks):
     """
     使用 AI 生成播客
     
@@ -450,8 +533,8 @@ async def generate_podcast(request: GenerateRequest):
     """
     try:
         # 1. 创建 podcast 和 job 记录
-        podcast_id = str(uuid.uuid4())
-        job_id = str(uuid.uuid4())
+        podcast_id = uuid.uuid4().hex
+        job_id = uuid.uuid4().hex
         
         # 使用主题作为标题（截取前50字符）
         title = request.topic[:50] + ("..." if len(request.topic) > 50 else "")
@@ -470,13 +553,6 @@ async def generate_podcast(request: GenerateRequest):
             "original_format": "ai_generated"
         }
         
-        success = data_service.save_podcast(podcast_data)
-        if not success:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="保存播客记录失败"
-            )
-        
         # 保存 job 记录（包含 type 和 inputs）
         job_data = {
             "id": job_id,
@@ -492,18 +568,15 @@ async def generate_podcast(request: GenerateRequest):
             "progress": 0
         }
         
-        success = data_service.save_job(job_data)
+        success = data_service.save_podcast_with_job(podcast_data, job_data)
         if not success:
-            # 回滚
-            data_service.delete_podcast(podcast_id)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="保存任务记录失败"
+                detail="保存播客记录失败"
             )
         
         # 2. 启动后台 AI 生成任务
-        from app.tasks.process_podcast import start_processing_task
-        start_processing_task(podcast_id, job_id, None)  # s3_key 为 None（无需下载文件）
+        background_tasks.add_task(start_processing_task, podcast_id, job_id, None)  # s3_key 为 None（无需下载文件）
         
         # 3. 返回响应
         return UploadResponse(
@@ -516,16 +589,45 @@ async def generate_podcast(request: GenerateRequest):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ AI生成播客异常: {e}")
+        logger.exception("❌ AI生成播客异常")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"AI生成播客失败: {str(e)}"
         )
 
 
+@router.post("/tts/stream")
+async def stream_tts(request: TTSStreamRequest):
+    """
+    文本转语音流式试听
+    
+    边合成边返回音频，客户端在第一块音频到达后即可开始播放，无需等待整段音频生成完毕。
+    包含 "Alex：/Emma：" 等说话者标签的稿件使用多声音对话合成。
+    
+    - **text**: 要转换为语音的文本 (1-5000字符)
+    - **language**: 语言 (en/zh)
+    """
+    try:
+        audio_chunks = get_ai_service().iter_dialogue_audio(request.text, request.language)
+        # 先取出第一块，使 API 错误在响应开始前以 HTTP 错误返回
+        first_chunk = await asyncio.to_thread(next, audio_chunks, b"")
+    except Exception as e:
+        logger.exception("❌ 流式语音合成失败")
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"语音合成失败: {str(e)}"
+        )
+    
+    return StreamingResponse(
+        itertools.chain((first_chunk,), audio_chunks),
+        media_type="audio/mpeg",
+        headers=NO_CACHE_HEADERS
+    )
+
 
 @router.post("/analyze-and-generate-direct", response_model=UploadResponse)
 async def analyze_and_generate_direct(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     style: str = Query("Conversation", description="播客风格"),
     duration_minutes: int = Query(5, ge=3, le=15, description="目标时长"),
@@ -552,12 +654,10 @@ async def analyze_and_generate_direct(
                 detail=error_msg
             )
         
-        # 2. 上传文件到 S3（临时存储）
-        file_content = await file.read()
-        file_obj = io.BytesIO(file_content)
-        
-        s3_key = s3_storage.upload_file(
-            file_obj=file_obj,
+        # 2. 流式上传文件到 S3（临时存储）
+        s3_key = await asyncio.to_thread(
+            s3_storage.upload_fileobj,
+            file_obj=file.file,
             original_filename=file.filename,
             prefix="uploads",
             content_type=file.content_type
@@ -573,8 +673,8 @@ async def analyze_and_generate_direct(
         source_type = "video" if file.content_type.startswith("video/") else "audio"
         
         # 4. 创建 podcast 和 job 记录
-        podcast_id = str(uuid.uuid4())
-        job_id = str(uuid.uuid4())
+        podcast_id = uuid.uuid4().hex
+        job_id = uuid.uuid4().hex
         
         # 使用临时标题（会在处理后更新为AI生成的标题）
         title = f"Processing: {file.filename[:40]}..."
@@ -592,14 +692,6 @@ async def analyze_and_generate_direct(
             "original_format": file.filename.split('.')[-1].lower() if '.' in file.filename else None
         }
         
-        success = data_service.save_podcast(podcast_data)
-        if not success:
-            s3_storage.delete_file(s3_key)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="保存播客记录失败"
-            )
-        
         # 5. 创建任务记录
         job_data = {
             "id": job_id,
@@ -617,18 +709,17 @@ async def analyze_and_generate_direct(
             "progress": 0
         }
         
-        success = data_service.save_job(job_data)
+        success = data_service.save_podcast_with_job(podcast_data, job_data)
         if not success:
-            data_service.delete_podcast(podcast_id)
-            s3_storage.delete_file(s3_key)
+            # 回滚 S3 上传
+            await asyncio.to_thread(s3_storage.delete_file, s3_key)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="保存任务记录失败"
+                detail="保存播客记录失败"
             )
         
         # 6. 启动后台分析和生成任务
-        from app.tasks.process_podcast import start_analyze_generate_task
-        start_analyze_generate_task(podcast_id, job_id, s3_key)
+        background_tasks.add_task(start_analyze_generate_task, podcast_id, job_id, s3_key)
         
         return UploadResponse(
             podcast_id=podcast_id,
@@ -640,7 +731,7 @@ async def analyze_and_generate_direct(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ 直接分析生成失败: {e}")
+        logger.exception("❌ 直接分析生成失败")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"处理失败: {str(e)}"
@@ -648,7 +739,7 @@ async def analyze_and_generate_direct(
 
 
 @router.post("/analyze-and-generate", response_model=UploadResponse)
-async def analyze_and_generate_podcast(request: AnalyzeAndGenerateRequest):
+async def analyze_and_generate_podcast(request: AnalyzeAndGenerateRequest, background_tasks: BackgroundTasks):
     """
     从音频/视频文件分析并生成播客（旧接口，需要先上传获取S3 key）
     
@@ -666,9 +757,10 @@ async def analyze_and_generate_podcast(request: AnalyzeAndGenerateRequest):
     """
     try:
         # 1. 验证 S3 key 存在
-        print(f"🎬 开始从文件生成播客...")
-        print(f"   S3 Key: {request.file_s3_key}")
-        print(f"   源类型: {request.source_type}")
+        logger.info(
+            "🎬 开始从文件生成播客: s3_key=%s, source_type=%s",
+            request.file_s3_key, request.source_type
+        )
         
         # 验证源类型
         if request.source_type not in ["audio", "video"]:
@@ -678,8 +770,8 @@ async def analyze_and_generate_podcast(request: AnalyzeAndGenerateRequest):
             )
         
         # 2. 创建 podcast 和 job 记录
-        podcast_id = str(uuid.uuid4())
-        job_id = str(uuid.uuid4())
+        podcast_id = uuid.uuid4().hex
+        job_id = uuid.uuid4().hex
         
         # 从 S3 key 中提取原始文件名
         original_filename = Path(request.file_s3_key).name
@@ -693,13 +785,6 @@ async def analyze_and_generate_podcast(request: AnalyzeAndGenerateRequest):
             "status": "processing"
         }
         
-        success = data_service.save_podcast(podcast_data)
-        if not success:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="保存播客记录失败"
-            )
-        
         # 保存 job 记录（包含 type 和 inputs）
         job_data = {
             "id": job_id,
@@ -717,18 +802,15 @@ async def analyze_and_generate_podcast(request: AnalyzeAndGenerateRequest):
             "progress": 0
         }
         
-        success = data_service.save_job(job_data)
+        success = data_service.save_podcast_with_job(podcast_data, job_data)
         if not success:
-            # 回滚
-            data_service.delete_podcast(podcast_id)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="保存任务记录失败"
+                detail="保存播客记录失败"
             )
         
         # 3. 启动后台分析和生成任务
-        from app.tasks.process_podcast import start_analyze_generate_task
-        start_analyze_generate_task(podcast_id, job_id, request.file_s3_key)
+        background_tasks.add_task(start_analyze_generate_task, podcast_id, job_id, request.file_s3_key)
         
         # 4. 返回响应
         return UploadResponse(
@@ -741,7 +823,7 @@ async def analyze_and_generate_podcast(request: AnalyzeAndGenerateRequest):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ 分析生成播客异常: {e}")
+        logger.exception("❌ 分析生成播客异常")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"分析生成播客失败: {str(e)}"
@@ -749,7 +831,7 @@ async def analyze_and_generate_podcast(request: AnalyzeAndGenerateRequest):
 
 
 @router.post("/generate-from-youtube", response_model=UploadResponse)
-async def generate_from_youtube(request: YouTubeGenerateRequest):
+async def generate_from_youtube(request: YouTubeGenerateRequest, background_tasks: BackgroundTasks):
     """
     从 YouTube 视频生成播客
     
@@ -762,11 +844,9 @@ async def generate_from_youtube(request: YouTubeGenerateRequest):
     - **duration_minutes**: 目标时长（3-15分钟）
     """
     try:
-        # 1. 验证 YouTube URL
-        from app.services.youtube_extractor import youtube_extractor
-        
-        is_valid, error_msg = youtube_extractor.validate_url(request.youtube_url)
-        if not is_valid:
+        # 1. 验证 YouTube URL（在进入线程池之前拒绝无效链接）
+        video_id, error_msg = youtube_extractor.validate_and_extract(request.youtube_url)
+        if video_id is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=error_msg
@@ -774,7 +854,7 @@ async def generate_from_youtube(request: YouTubeGenerateRequest):
         
         # 2. 获取视频元数据
         try:
-            metadata = youtube_extractor.extract_metadata(request.youtube_url)
+            metadata = await youtube_extractor.extract_metadata(request.youtube_url)
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -782,8 +862,8 @@ async def generate_from_youtube(request: YouTubeGenerateRequest):
             )
         
         # 3. 创建 podcast 和 job 记录
-        podcast_id = str(uuid.uuid4())
-        job_id = str(uuid.uuid4())
+        podcast_id = uuid.uuid4().hex
+        job_id = uuid.uuid4().hex
         
         # 使用 YouTube 视频标题作为播客标题
         title = f"Processing: {metadata['title'][:50]}..."
@@ -805,13 +885,6 @@ async def generate_from_youtube(request: YouTubeGenerateRequest):
             "original_format": "youtube"
         }
         
-        success = data_service.save_podcast(podcast_data)
-        if not success:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="保存播客记录失败"
-            )
-        
         # 4. 创建任务记录
         job_data = {
             "id": job_id,
@@ -829,17 +902,15 @@ async def generate_from_youtube(request: YouTubeGenerateRequest):
             "progress": 0
         }
         
-        success = data_service.save_job(job_data)
+        success = data_service.save_podcast_with_job(podcast_data, job_data)
         if not success:
-            data_service.delete_podcast(podcast_id)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="保存任务记录失败"
+                detail="保存播客记录失败"
             )
         
         # 5. 启动后台 YouTube 生成任务
-        from app.tasks.process_podcast import start_youtube_generate_task
-        start_youtube_generate_task(podcast_id, job_id, request.youtube_url)
+        background_tasks.add_task(start_youtube_generate_task, podcast_id, job_id, request.youtube_url)
         
         return UploadResponse(
             podcast_id=podcast_id,
@@ -851,7 +922,7 @@ async def generate_from_youtube(request: YouTubeGenerateRequest):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in generate_from_youtube: {e}")
+        logger.exception("❌ YouTube 生成播客异常")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"生成播客失败: {str(e)}"
@@ -4,6 +4,10 @@
 """
 from pydantic_settings import BaseSettings
 from pathlib import Path
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 
 
 class Settings(BaseSettings):
@@ -14,6 +18,7 @@ class Settings(BaseSettings):
     api_port: int = 18188
     api_domain: str = "https://echocast.genstudy.ai"  # API 域名（用于生成完整 URL）
     debug: bool = True
+    log_level: str = "INFO"
     
     # AWS S3 配置
     aws_access_key_id: str = ""
@@ -25,12 +30,30 @@ class Settings(BaseSettings):
     elevenlabs_api_key: str = ""
     elevenlabs_voice_id: str = "JBFqnCBsd6RMkjVDRZzb"  # 默认语音ID
     elevenlabs_model_id: str = "eleven_v3"  # v3 模型，支持对话功能
+    # 单声音 TTS 使用的低延迟模型（text_to_dialogue 仍使用 elevenlabs_model_id）
+    elevenlabs_tts_model_id: str = "eleven_turbo_v2_5"
+    # 流式延迟优化等级 0-4：越高首字节越快，但文本规范化（数字、日期等的读法）越弱，
+    # 4 会完全关闭文本规范化，3 是延迟与发音稳定性之间的折中
+    elevenlabs_optimize_streaming_latency: int = 3
     elevenlabs_output_format: str = "mp3_44100_128"
     
     # Gemini API 配置
     gemini_api_key: str = ""
     gemini_model: str = "gemini-2.5-pro"  # 升级到 2.5 Pro 以获得更好的内容质量
     gemini_api_url: str = "https://aiplatform.googleapis.com/v1/publishers/google/models"
+    # Gemini File API：大文件先上传再按 URI 引用，避免 base64 内联（体积膨胀 33%）
+    # File API 只存在于 Gemini Developer API（generativelanguage），Vertex 端点不接受其文件 URI，
+    # 因此启用后音频/视频分析改走 gemini_file_api_url
+    gemini_file_api_enabled: bool = False
+    gemini_file_api_url: str = "https://generativelanguage.googleapis.com"
+    # 内联（base64）媒体数据上限：Gemini 单次请求约 20MB，超过时改走 File API（未启用则直接拒绝）
+    gemini_max_inline_bytes: int = 19 * 1024 * 1024
+    
+    # YouTube 配置：优先下载字幕作为转录文本（与元数据提取并发），有字幕时省去一次 Gemini 视频分析；
+    # yt-dlp 可能被 YouTube bot 检测拦截，因此默认关闭
+    youtube_subtitles_first: bool = False
+    # yt-dlp 阻塞调用使用独立线程池，限制并发以免触发 YouTube 限流，也不挤占默认线程池
+    youtube_ytdlp_workers: int = 4
     
     # 数据目录配置
     data_dir: Path = Path(__file__).parent.parent / "data"
@@ -40,6 +63,13 @@ class Settings(BaseSettings):
     max_upload_size: int = 100 * 1024 * 1024  # 100MB
     allowed_extensions: list = [".txt", ".pdf", ".doc", ".docx", ".mp3", ".wav", ".mp4", ".mov"]
     
+    # 后台任务配置：同时运行的提取/生成任务数，超出的任务排队等待
+    max_background_tasks: int = 4
+    
+    # 音频播放配置
+    stream_via_backend: bool = False  # True: 后端代理 S3 数据（私有桶）；False: 重定向到预签名 URL
+    stream_url_expires_in: int = 3600  # 播放用预签名 URL 有效期（秒）
+    
     class Config:
         env_file = Path(__file__).parent.parent.parent / ".env"
         case_sensitive = False
@@ -53,3 +83,32 @@ settings = Settings()
 settings.data_dir.mkdir(parents=True, exist_ok=True)
 settings.temp_dir.mkdir(parents=True, exist_ok=True)
 
+
+def configure_logging():
+    """
+    配置应用日志
+    
+    日志记录只把记录放入队列（QueueHandler），由后台线程（QueueListener）
+    负责格式化并写入 stdout，避免请求处理线程被同步 I/O 阻塞
+    """
+    root_logger = logging.getLogger()
+    if any(isinstance(h, QueueHandler) for h in root_logger.handlers):
+        return  # 已配置（如 reload 时重复导入）
+    
+    log_queue = queue.SimpleQueue()
+    
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    )
+    
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    root_logger.addHandler(QueueHandler(log_queue))
+    root_logger.setLevel(settings.log_level.upper())
+    
+    # httpx/httpcore 的 INFO 日志会输出完整请求 URL，只保留警告及以上级别
+    for name in ("httpx", "httpcore"):
+        logging.getLogger(name).setLevel(logging.WARNING)
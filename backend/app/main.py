@@ -1,23 +1,52 @@
 """
 EchoCast FastAPI 应用入口
 """
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.config import settings
+from app.config import settings, configure_logging
 from app.api import podcasts, jobs
+from app.utils.upload_limit import UploadSizeLimitMiddleware
+from app.utils.http_client import close_async_client
+from app.utils.async_runner import stop_background_loop
+from app.tasks.process_podcast import shutdown_task_executor
+
+configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用生命周期：关闭时停止接收后台任务，释放共享的 HTTP 客户端和后台事件循环
+    
+    先在线程中等待运行中的后台任务结束（有超时），再停止后台事件循环，
+    仍阻塞在 run_sync 中的任务随即被取消，进程不会因等待任务线程而无法退出
+    """
+    yield
+    await asyncio.to_thread(shutdown_task_executor)
+    await close_async_client()
+    stop_background_loop()
+
 
 # 创建 FastAPI 应用实例
 app = FastAPI(
     title=settings.app_name,
     description="AI-powered podcast generation platform",
     version="1.0.0 (Demo)",
-    debug=settings.debug
+    debug=settings.debug,
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # 注册路由
 app.include_router(podcasts.router)
 app.include_router(jobs.router)
 
+# 在解析请求体之前拒绝超大上传
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # 配置 CORS - 明确列出所有允许的域名，避免使用regex和列表混用导致重复
 # 注意：不要同时使用 allow_origins 和 allow_origin_regex，会导致CORS头重复
 app.add_middleware(
@@ -43,6 +72,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count"],
 )
 
 
@@ -1,13 +1,20 @@
 """
 Podcast 相关的 Pydantic 模型
 """
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Annotated, Optional
 from datetime import datetime
 
 
+# 可复用的约束类型
+Topic = Annotated[str, Field(min_length=5, max_length=500)]
+DurationMinutes = Annotated[int, Field(ge=3, le=15)]
+
+
 class PodcastResponse(BaseModel):
     """播客响应模型"""
+    model_config = ConfigDict(frozen=True)
+    
     id: str
     title: str
     original_filename: str
@@ -44,19 +51,25 @@ class PodcastResponse(BaseModel):
 
 class JobResponse(BaseModel):
     """任务响应模型"""
+    model_config = ConfigDict(frozen=True)
+    
     id: str
     podcast_id: str
     type: Optional[str] = Field(default="upload", description="任务类型: upload, generate")
     inputs: Optional[dict] = Field(default=None, description="任务输入参数")
     status: str = Field(description="pending, processing, completed, failed")
     progress: int = Field(default=0, ge=0, le=100, description="处理进度 0-100")
+    status_message: Optional[str] = Field(default=None, description="当前处理步骤的提示信息")
     error_message: Optional[str] = None
     created_at: str
     updated_at: str
+    podcast: Optional[dict] = Field(default=None, description="关联的播客详情（仅请求 include=podcast 时返回）")
 
 
 class UploadResponse(BaseModel):
     """上传响应模型"""
+    model_config = ConfigDict(frozen=True)
+    
     podcast_id: str
     job_id: str
     status: str
@@ -65,15 +78,15 @@ class UploadResponse(BaseModel):
 
 class GenerateRequest(BaseModel):
     """AI 生成播客请求模型"""
-    topic: str = Field(description="播客主题", min_length=5, max_length=500)
+    model_config = ConfigDict(str_strip_whitespace=True)
+    
+    topic: Topic = Field(description="播客主题")
     style: str = Field(
         default="Solo Talk Show",
         description="播客风格：Solo Talk Show/Conversation/Storytelling"
     )
-    duration_minutes: Optional[int] = Field(
+    duration_minutes: Optional[DurationMinutes] = Field(
         default=5,
-        ge=3,
-        le=15,
         description="目标时长（分钟）"
     )
     language: str = Field(
@@ -84,6 +97,8 @@ class GenerateRequest(BaseModel):
 
 class AnalyzeAndGenerateRequest(BaseModel):
     """从音频/视频分析并生成播客请求模型"""
+    model_config = ConfigDict(str_strip_whitespace=True)
+    
     file_s3_key: str = Field(description="已上传文件的 S3 key")
     enhancement_prompt: Optional[str] = Field(
         default=None,
@@ -96,10 +111,8 @@ class AnalyzeAndGenerateRequest(BaseModel):
         default="Conversation",
         description="播客风格：Solo Talk Show/Conversation/Storytelling"
     )
-    duration_minutes: Optional[int] = Field(
+    duration_minutes: Optional[DurationMinutes] = Field(
         default=5,
-        ge=3,
-        le=15,
         description="目标时长（分钟）"
     )
     language: str = Field(
@@ -110,6 +123,8 @@ class AnalyzeAndGenerateRequest(BaseModel):
 
 class YouTubeGenerateRequest(BaseModel):
     """从 YouTube 视频生成播客请求模型"""
+    model_config = ConfigDict(str_strip_whitespace=True)
+    
     youtube_url: str = Field(description="YouTube 视频链接")
     language: str = Field(
         default="en",
@@ -123,14 +138,23 @@ class YouTubeGenerateRequest(BaseModel):
         default="Conversation",
         description="播客风格：Solo Talk Show/Conversation/Storytelling"
     )
-    duration_minutes: Optional[int] = Field(
+    duration_minutes: Optional[DurationMinutes] = Field(
         default=5,
-        ge=3,
-        le=15,
         description="目标时长（分钟）"
     )
 
 
+class TTSStreamRequest(BaseModel):
+    """文本转语音流式试听请求模型"""
+    model_config = ConfigDict(str_strip_whitespace=True)
+    
+    text: str = Field(min_length=1, max_length=5000, description="要转换为语音的文本或对话稿件")
+    language: str = Field(
+        default="en",
+        description="语言：en (English) / zh (Chinese)"
+    )
+
+
 class ApiResponse(BaseModel):
     """统一 API 响应格式"""
     success: bool
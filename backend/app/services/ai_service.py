@@ -3,11 +3,59 @@ AI 服务 - ElevenLabs TTS + Gemini AI
 使用 ElevenLabs API 将文本转换为语音
 使用 Gemini API 生成播客稿件
 """
+from elevenlabs import DialogueInput, VoiceSettings
 from elevenlabs.client import ElevenLabs
 from app.config import settings
-import io
+from app.utils.http_client import get_async_client, get_sync_client
+from app.utils.cache import TTLCache
+from app.utils.async_runner import run_sync
+from app.utils.retry import async_retry, parse_retry_after
+from app.services.prompts import ZH_SCRIPT_TEMPLATE, EN_SCRIPT_TEMPLATE, TITLE_TEMPLATE
+from typing import BinaryIO, Iterator, List, Optional
+import asyncio
+import hashlib
 import httpx
-import json
+import logging
+import orjson
+import re
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+# 稿件缓存：相同（主题、风格、时长、语言）直接复用已生成的稿件，跳过 Gemini 调用
+SCRIPT_CACHE_SIZE = 256
+SCRIPT_CACHE_TTL = 24 * 3600  # 秒
+
+# 对话解析缓存：存储 (文本, voice_id) 段，命中时重新构建 DialogueInput
+DIALOGUE_CACHE_SIZE = 128
+DIALOGUE_CACHE_TTL = 3600  # 秒
+
+# text_to_dialogue 失败时逐段合成所用的 REST 接口及并发上限
+ELEVENLABS_API_URL = "https://api.elevenlabs.io/v1"
+DIALOGUE_SEGMENT_CONCURRENCY = 8
+
+# 视频分析使用的 Gemini 模型（gemini-2.5-flash 或 gemini-2.5-pro 支持视频分析）
+GEMINI_VIDEO_MODEL = "gemini-2.5-pro"
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Gemini 限流/服务端临时错误：指数退避重试，其他错误直接失败
+GEMINI_RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+GEMINI_RETRY_ATTEMPTS = 4
+
+
+class RetryableGeminiError(Exception):
+    """Gemini 返回可重试的 HTTP 状态（限流或服务端临时错误）"""
+    
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        # 服务端通过 Retry-After 要求的最短等待时间（秒）
+        self.retry_after = retry_after
+
+# 对话稿件中的说话者行：任意单词（可能包含空格）后跟冒号
+# 支持: Alex:, Ben:, Host A:, 主持人A：等所有格式
+_SPEAKER_RE = re.compile(r'^([A-Za-z\u4e00-\u9fa5][A-Za-z\u4e00-\u9fa5\s0-9]*?)[:：]\s*(.*)$')
 
 
 class AIService:
@@ -16,11 +64,16 @@ class AIService:
     def __init__(self):
         """初始化 ElevenLabs 和 Gemini 客户端"""
         # ElevenLabs 配置
+        # 使用共享的长连接 httpx.Client（可用时启用 HTTP/2），复用 TLS 连接
         self.client = ElevenLabs(
-            api_key=settings.elevenlabs_api_key
+            api_key=settings.elevenlabs_api_key,
+            httpx_client=get_sync_client()
         )
+        self.elevenlabs_api_key = settings.elevenlabs_api_key
         self.voice_id = settings.elevenlabs_voice_id
         self.model_id = settings.elevenlabs_model_id
+        self.tts_model_id = settings.elevenlabs_tts_model_id
+        self.optimize_streaming_latency = settings.elevenlabs_optimize_streaming_latency
         self.output_format = settings.elevenlabs_output_format
         
         # 多语言语音映射
@@ -35,6 +88,9 @@ class AIService:
                 "secondary": "9BWtsMINqrJLrRacOk9x"  # Aria - 支持多语言的女声
             }
         }
+        # 预先计算常用查找：未知语言回退到英文语音
+        self._default_voices = self.voice_mappings["en"]
+        self._primary_voice = {lang: voices["primary"] for lang, voices in self.voice_mappings.items()}
         
         # 语音质量参数设置 - 针对中文优化
         self.voice_settings = {
@@ -43,11 +99,56 @@ class AIService:
             "style": 0.0,  # 风格强度（如果模型支持）
             "use_speaker_boost": True  # 使用说话者增强
         }
+        self._voice_settings = VoiceSettings(
+            stability=self.voice_settings["stability"],
+            similarity_boost=self.voice_settings["similarity_boost"],
+            use_speaker_boost=self.voice_settings["use_speaker_boost"]
+        )
+        
+        # 稿件缓存及命中统计
+        self._script_cache = TTLCache(maxsize=SCRIPT_CACHE_SIZE, ttl=SCRIPT_CACHE_TTL)
+        self._script_cache_hits = 0
+        self._script_cache_misses = 0
+        
+        # 对话解析缓存：同一稿件重试合成时跳过逐行解析
+        self._dialogue_cache = TTLCache(maxsize=DIALOGUE_CACHE_SIZE, ttl=DIALOGUE_CACHE_TTL)
         
         # Gemini 配置
         self.gemini_api_key = settings.gemini_api_key
         self.gemini_model = settings.gemini_model
         self.gemini_api_url = settings.gemini_api_url
+        # 请求 URL 和请求头只依赖配置，初始化时构建一次 (参考 TypeScript 第68行)；
+        # API key 通过请求头传入，不出现在 URL 中（httpx 等日志会记录完整 URL）
+        self._gemini_text_url = httpx.URL(f"{self.gemini_api_url}/{self.gemini_model}:generateContent")
+        self._gemini_video_url = httpx.URL(f"{self.gemini_api_url}/{GEMINI_VIDEO_MODEL}:generateContent")
+        self._gemini_headers = {**JSON_HEADERS, "x-goog-api-key": self.gemini_api_key}
+    
+    def iter_podcast_audio(self, text: str, language: str = "en") -> Iterator[bytes]:
+        """
+        流式生成播客音频（单声音）
+        
+        使用 ElevenLabs 流式接口，合成过程中逐块返回音频，无需等待整段音频生成完毕
+        
+        Args:
+            text: 要转换为语音的文本
+            language: 语言代码 (en/zh)
+        
+        Returns:
+            音频数据块迭代器（迭代时才发起请求，API 错误在迭代中抛出）
+        """
+        # 根据语言选择语音
+        voice_id = self._primary_voice.get(language, self._default_voices["primary"])
+        logger.debug("TTS 语音ID: %s，模型: %s", voice_id, self.tts_model_id)
+        
+        # 调用 ElevenLabs 流式 API（添加语音质量设置）
+        return self.client.text_to_speech.stream(
+            text=text,
+            voice_id=voice_id,
+            model_id=self.tts_model_id,
+            output_format=self.output_format,
+            optimize_streaming_latency=self.optimize_streaming_latency,
+            voice_settings=self._voice_settings
+        )
     
     def generate_podcast_audio(self, text: str, language: str = "en") -> bytes:
         """
@@ -63,40 +164,16 @@ class AIService:
             Exception: 如果生成失败
         """
         try:
-            print(f"🎙️  开始生成音频...")
-            print(f"   文本长度: {len(text)} 字符")
-            print(f"   语言: {language}")
-            
-            # 根据语言选择语音
-            voice_id = self.voice_mappings.get(language, self.voice_mappings["en"])["primary"]
-            print(f"   语音ID: {voice_id}")
-            print(f"   模型: {self.model_id}")
-            
-            # 调用 ElevenLabs API（添加语音质量设置）
-            from elevenlabs import VoiceSettings
-            
-            audio_generator = self.client.text_to_speech.convert(
-                text=text,
-                voice_id=voice_id,
-                model_id=self.model_id,
-                output_format=self.output_format,
-                voice_settings=VoiceSettings(
-                    stability=self.voice_settings["stability"],
-                    similarity_boost=self.voice_settings["similarity_boost"],
-                    use_speaker_boost=self.voice_settings["use_speaker_boost"]
-                )
-            )
+            logger.info("🎙️  开始生成音频（文本长度: %d 字符，语言: %s）", len(text), language)
             
-            # 收集音频数据
-            audio_data = b''
-            for chunk in audio_generator:
-                audio_data += chunk
+            # 收集音频数据（一次性拼接，避免 += 反复复制整个缓冲区）
+            audio_data = b"".join(self.iter_podcast_audio(text, language))
             
-            print(f"✅ 音频生成成功！大小: {len(audio_data)} bytes")
+            logger.info("✅ 音频生成成功！大小: %d bytes", len(audio_data))
             return audio_data
         
         except Exception as e:
-            print(f"❌ 音频生成失败: {e}")
+            logger.error("❌ 音频生成失败: %s", e, exc_info=True)
             raise Exception(f"ElevenLabs API 调用失败: {str(e)}")
     
     def generate_conversation_audio(
@@ -133,18 +210,37 @@ class AIService:
         Raises:
             Exception: 如果转录失败
         """
+        logger.debug("音频大小: %d bytes", len(audio_content))
+        # 字节直接交给 multipart 编码，不再包一层 BytesIO
+        return self._transcribe((filename, audio_content), filename)
+    
+    def transcribe_audio_stream(self, audio_stream: BinaryIO, filename: str) -> str:
+        """
+        使用 ElevenLabs 将音频流转录为文本
+        
+        音频按块读取并以分块 multipart 上传，无需先把整个文件读入内存
+        （可直接传入 S3 get_object 返回的 Body）
+        
+        Args:
+            audio_stream: 可按块读取的音频文件对象
+            filename: 文件名
+        
+        Returns:
+            转录的文本
+        
+        Raises:
+            Exception: 如果转录失败
+        """
+        return self._transcribe((filename, audio_stream), filename)
+    
+    def _transcribe(self, file: tuple, filename: str) -> str:
+        """调用 ElevenLabs speech-to-text（file 为 (文件名, 字节或文件对象) 元组）"""
         try:
-            print(f"🎤 开始转录音频...")
-            print(f"   文件名: {filename}")
-            print(f"   音频大小: {len(audio_content)} bytes")
-            
-            # 创建文件对象
-            audio_file = io.BytesIO(audio_content)
-            audio_file.name = filename
+            logger.info("🎤 开始转录音频: %s", filename)
             
-            # 调用 ElevenLabs speech-to-text API
+            # 调用 ElevenLabs speech-to-text API（文件名随元组传递，内容本身不需要 name 属性）
             response = self.client.speech_to_text.convert(
-                file=audio_file,
+                file=file,
                 model_id="scribe_v1"  # ElevenLabs 的转录模型（正确的模型ID）
             )
             
@@ -156,14 +252,14 @@ class AIService:
             else:
                 transcript = str(response)
             
-            print(f"✅ 音频转录成功！文本长度: {len(transcript)} 字符")
+            logger.info("✅ 音频转录成功！文本长度: %d 字符", len(transcript))
             return transcript
         
         except Exception as e:
-            print(f"❌ 音频转录失败: {e}")
+            logger.error("❌ 音频转录失败: %s", e, exc_info=True)
             raise Exception(f"ElevenLabs 转录 API 调用失败: {str(e)}")
     
-    def _call_gemini_api_with_video(self, url: str, prompt: str, temperature: float = 0.7, max_tokens: int = 4000) -> str:
+    async def _call_gemini_api_with_video(self, url: str, prompt: str, temperature: float = 0.7, max_tokens: int = 4000) -> str:
         """
         调用 Gemini API 分析视频（支持 YouTube URL）
         
@@ -176,26 +272,41 @@ class AIService:
         Returns:
             生成的文本内容
         
+        Raises:
+            Exception: 如果 API 调用失败
+        """
+        return await self._call_gemini_api_with_videos([url], prompt, temperature, max_tokens)
+    
+    @async_retry(retry_on=(RetryableGeminiError,), attempts=GEMINI_RETRY_ATTEMPTS)
+    async def _call_gemini_api_with_videos(self, urls: List[str], prompt: str, temperature: float = 0.7, max_tokens: int = 4000) -> str:
+        """
+        调用 Gemini API 在一次请求中分析多个视频（支持 YouTube URL）
+        
+        Args:
+            urls: YouTube 视频 URL 列表（按顺序附加在提示词之后）
+            prompt: 输入提示词
+            temperature: 生成温度 (0.0-1.0)
+            max_tokens: 最大输出 token 数
+        
+        Returns:
+            生成的文本内容
+        
         Raises:
             Exception: 如果 API 调用失败
         """
         try:
-            # 使用 gemini-2.5-flash 或 gemini-2.5-pro 支持视频分析
-            model = "gemini-2.5-pro"
-            api_url = f"{self.gemini_api_url}/{model}:generateContent?key={self.gemini_api_key}"
-            
             # 构建请求体（支持视频 URL）
             payload = {
                 "contents": [{
                     "role": "user",  # ← 必须指定 role！
-                    "parts": [
-                        {"text": prompt},
+                    "parts": [{"text": prompt}] + [
                         {
                             "fileData": {
                                 "fileUri": url,
                                 "mimeType": "video/mp4"  # ← 必须指定 mimeType！
                             }
                         }
+                        for url in urls
                     ]
                 }],
                 "generationConfig": {
@@ -206,34 +317,38 @@ class AIService:
                 }
             }
             
-            with httpx.Client(timeout=120.0) as client:
-                response = client.post(
-                    api_url,
-                    json=payload,
-                    headers={"Content-Type": "application/json"}
-                )
-                response.raise_for_status()
+            # 使用共享连接池，复用 TCP/TLS 连接
+            response = await get_async_client().post(
+                self._gemini_video_url,
+                content=orjson.dumps(payload),
+                headers=self._gemini_headers,
+                timeout=120.0
+            )
+            response.raise_for_status()
             
-            result = response.json()
+            result = orjson.loads(response.content)
             
             # 调试日志
-            print(f"📊 Gemini API 响应结构: {list(result.keys())}")
+            logger.debug("📊 Gemini API 响应结构: %s", list(result))
             
             if "candidates" not in result or not result["candidates"]:
                 raise Exception("Gemini API 未返回有效内容")
             
             text = result["candidates"][0]["content"]["parts"][0]["text"]
-            print(f"✅ Gemini 返回文本长度: {len(text)} 字符")
-            print(f"   前100字符: {text[:100]}")
+            logger.info("✅ Gemini 返回文本长度: %d 字符", len(text))
+            logger.debug("前100字符: %s", text[:100])
             return text.strip()
         
         except httpx.HTTPStatusError as e:
-            error_detail = e.response.text
-            raise Exception(f"Gemini API 调用失败 (HTTP {e.response.status_code}): {error_detail}")
+            error_msg = f"Gemini API 调用失败 (HTTP {e.response.status_code}): {e.response.text}"
+            if e.response.status_code in GEMINI_RETRYABLE_STATUS:
+                raise RetryableGeminiError(error_msg, parse_retry_after(e.response.headers.get("Retry-After")))
+            raise Exception(error_msg)
         except Exception as e:
             raise Exception(f"Gemini API 调用异常: {str(e)}")
     
-    def _call_gemini_api(self, prompt: str, temperature: float = 0.7, max_tokens: int = 4000) -> str:
+    @async_retry(retry_on=(RetryableGeminiError,), attempts=GEMINI_RETRY_ATTEMPTS)
+    async def _call_gemini_api(self, prompt: str, temperature: float = 0.7, max_tokens: int = 4000) -> str:
         """
         调用 Gemini API 生成文本
         参考 TypeScript 模式: prepGo_tool/src/lib/ai-service.ts
@@ -250,9 +365,6 @@ class AIService:
             Exception: 如果 API 调用失败
         """
         try:
-            # 构建 API URL (参考 TypeScript 第68行)
-            url = f"{self.gemini_api_url}/{self.gemini_model}:generateContent?key={self.gemini_api_key}"
-            
             # 构建请求体 (参考 TypeScript 第70-76行)
             payload = {
                 "contents": [
@@ -267,19 +379,13 @@ class AIService:
                 }
             }
             
-            headers = {
-                "Content-Type": "application/json"
-            }
+            logger.info("🤖 调用 Gemini API（模型: %s，提示词长度: %d 字符）", self.gemini_model, len(prompt))
             
-            print(f"🤖 调用 Gemini API...")
-            print(f"   模型: {self.gemini_model}")
-            print(f"   提示词长度: {len(prompt)} 字符")
-            
-            # 发送 POST 请求
-            response = httpx.post(
-                url,
-                json=payload,
-                headers=headers,
+            # 发送 POST 请求（共享连接池，复用 TCP/TLS 连接）
+            response = await get_async_client().post(
+                self._gemini_text_url,
+                content=orjson.dumps(payload),
+                headers=self._gemini_headers,
                 timeout=180.0  # 180秒超时（AI生成需要更长时间）
             )
             
@@ -287,27 +393,119 @@ class AIService:
             response.raise_for_status()
             
             # 解析响应 (参考 TypeScript 第83行)
-            data = response.json()
+            data = orjson.loads(response.content)
             content = data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
             
             if not content:
                 raise Exception("Gemini API 返回空响应")
             
-            print(f"✅ Gemini API 调用成功！生成文本长度: {len(content)} 字符")
+            logger.info("✅ Gemini API 调用成功！生成文本长度: %d 字符", len(content))
             return content
         
         except httpx.HTTPStatusError as e:
             error_msg = f"HTTP错误 {e.response.status_code}: {e.response.text}"
-            print(f"❌ Gemini API 调用失败: {error_msg}")
+            logger.error("❌ Gemini API 调用失败: %s", error_msg)
+            if e.response.status_code in GEMINI_RETRYABLE_STATUS:
+                raise RetryableGeminiError(error_msg, parse_retry_after(e.response.headers.get("Retry-After")))
             raise Exception(error_msg)
         except Exception as e:
-            print(f"❌ Gemini API 调用异常: {e}")
+            logger.error("❌ Gemini API 调用异常: %s", e, exc_info=True)
             raise Exception(f"Gemini API 调用失败: {str(e)}")
     
+    def iter_dialogue_audio(self, script: str, language: str = "en") -> Iterator[bytes]:
+        """
+        流式生成对话音频（使用 text_to_dialogue 流式 API）
+        
+        Args:
+            script: 播客稿件（可能包含多个说话者）
+            language: 语言代码 (en/zh)
+        
+        Returns:
+            音频数据块迭代器（单人稿件使用标准 TTS）
+        """
+        # 解析稿件，分离不同说话者
+        dialogue_inputs = self._parse_dialogue_script(script, language)
+        return self._stream_dialogue_inputs(dialogue_inputs, script, language)
+    
+    def _stream_dialogue_inputs(self, dialogue_inputs: list, script: str, language: str) -> Iterator[bytes]:
+        """根据解析后的对话段选择 text_to_dialogue 或标准 TTS 流式接口"""
+        if len(dialogue_inputs) <= 1:
+            # 如果只有一个说话者，使用普通TTS
+            logger.info("检测到单人播客，使用标准TTS")
+            return self.iter_podcast_audio(script, language)
+        
+        logger.info("检测到 %d 段对话", len(dialogue_inputs))
+        
+        # 使用 text_to_dialogue API
+        # 注意：text_to_dialogue 不支持全局 voice_settings 参数
+        # 语音设置需要在创建 DialogueInput 时单独配置
+        return self.client.text_to_dialogue.stream(
+            inputs=dialogue_inputs,
+            model_id=self.model_id,
+            output_format=self.output_format
+        )
+    
+    async def _synth_segment(self, text: str, voice_id: str) -> bytes:
+        """
+        调用 ElevenLabs 流式 TTS 接口合成单个对话段
+        
+        Args:
+            text: 对话段文本
+            voice_id: 该说话者的语音ID
+        
+        Returns:
+            音频数据（字节）
+        """
+        url = f"{ELEVENLABS_API_URL}/text-to-speech/{voice_id}/stream"
+        payload = {
+            "text": text,
+            "model_id": self.tts_model_id,
+            "voice_settings": {
+                "stability": self.voice_settings["stability"],
+                "similarity_boost": self.voice_settings["similarity_boost"],
+                "use_speaker_boost": self.voice_settings["use_speaker_boost"]
+            }
+        }
+        
+        response = await get_async_client().post(
+            url,
+            params={
+                "output_format": self.output_format,
+                "optimize_streaming_latency": self.optimize_streaming_latency
+            },
+            json=payload,
+            headers={"xi-api-key": self.elevenlabs_api_key}
+        )
+        response.raise_for_status()
+        return response.content
+    
+    async def _synth_segments(self, dialogue_inputs: list) -> bytes:
+        """
+        并行合成所有对话段（并发数受限），按原顺序拼接
+        
+        MP3 由独立的帧组成，直接按顺序拼接即可得到连续音频
+        
+        Args:
+            dialogue_inputs: DialogueInput 列表
+        
+        Returns:
+            音频数据（字节）
+        """
+        semaphore = asyncio.Semaphore(DIALOGUE_SEGMENT_CONCURRENCY)
+        
+        async def bounded(dialogue_input) -> bytes:
+            async with semaphore:
+                return await self._synth_segment(dialogue_input.text, dialogue_input.voice_id)
+        
+        chunks = await asyncio.gather(*(bounded(d) for d in dialogue_inputs))
+        return b"".join(chunks)
+    
     def generate_dialogue_audio(self, script: str, language: str = "en") -> bytes:
         """
         为对话生成多声音音频（使用 text_to_dialogue API）
         
+        text_to_dialogue 失败时先回退到逐段并行合成（保留多声音），再回退到单声音 TTS
+        
         Args:
             script: 播客稿件（可能包含多个说话者）
             language: 语言代码 (en/zh)
@@ -315,48 +513,39 @@ class AIService:
         Returns:
             音频数据（字节）
         """
+        dialogue_inputs = []
         try:
-            from elevenlabs import DialogueInput
-            
-            print(f"🎭 开始生成多声音对话音频...")
-            print(f"   语言: {language}")
+            logger.info("🎭 开始生成多声音对话音频（语言: %s）", language)
             
-            # 解析稿件，分离不同说话者
             dialogue_inputs = self._parse_dialogue_script(script, language)
             
-            if len(dialogue_inputs) <= 1:
-                # 如果只有一个说话者，使用普通TTS
-                print("   检测到单人播客，使用标准TTS")
-                return self.generate_podcast_audio(script, language)
-            
-            print(f"   检测到 {len(dialogue_inputs)} 段对话")
-            
-            # 使用 text_to_dialogue API
-            # 注意：text_to_dialogue 不支持全局 voice_settings 参数
-            # 语音设置需要在创建 DialogueInput 时单独配置
-            audio_generator = self.client.text_to_dialogue.convert(
-                inputs=dialogue_inputs,
-                model_id=self.model_id,
-                output_format=self.output_format
-            )
-            
-            # 收集音频数据
-            audio_data = b''
-            for chunk in audio_generator:
-                audio_data += chunk
+            # 收集音频数据（一次性拼接，避免 += 反复复制整个缓冲区）
+            audio_data = b"".join(self._stream_dialogue_inputs(dialogue_inputs, script, language))
             
-            print(f"✅ 多声音音频生成成功！大小: {len(audio_data)} bytes")
+            logger.info("✅ 多声音音频生成成功！大小: %d bytes", len(audio_data))
             return audio_data
         
         except Exception as e:
-            print(f"❌ 多声音音频生成失败: {e}")
-            print("   回退到单声音TTS")
-            return self.generate_podcast_audio(script, language)
+            logger.error("❌ 多声音音频生成失败: %s", e, exc_info=True)
+        
+        if len(dialogue_inputs) > 1:
+            try:
+                logger.info("回退到逐段并行TTS（%d 段，并发 %d）", len(dialogue_inputs), DIALOGUE_SEGMENT_CONCURRENCY)
+                audio_data = run_sync(self._synth_segments(dialogue_inputs))
+                logger.info("✅ 逐段合成成功！大小: %d bytes", len(audio_data))
+                return audio_data
+            except Exception as e:
+                logger.error("❌ 逐段合成失败: %s", e, exc_info=True)
+        
+        logger.info("回退到单声音TTS")
+        return self.generate_podcast_audio(script, language)
     
     def _parse_dialogue_script(self, script: str, language: str) -> list:
         """
         解析对话稿件，分离不同说话者
         
+        解析结果按（稿件摘要, 语言）缓存，重试同一稿件时直接复用
+        
         Args:
             script: 播客稿件
             language: 语言代码
@@ -364,116 +553,101 @@ class AIService:
         Returns:
             DialogueInput 列表
         """
-        from elevenlabs import DialogueInput, VoiceSettings
+        cache_key = (hashlib.blake2b(script.encode("utf-8"), digest_size=8).digest(), language)
+        segments = self._dialogue_cache.get(cache_key)
+        if segments is None:
+            segments = self._split_dialogue_segments(script, language)
+            self._dialogue_cache.set(cache_key, segments)
+        else:
+            logger.debug("⚡ 命中对话解析缓存（%d 段）", len(segments))
         
-        dialogue_inputs = []
-        voices = self.voice_mappings.get(language, self.voice_mappings["en"])
+        # 为每个对话段添加语音设置（所有段共享同一个 VoiceSettings）
+        return [
+            DialogueInput(text=text, voice_id=voice_id, voice_settings=self._voice_settings)
+            for text, voice_id in segments
+        ]
+    
+    def _split_dialogue_segments(self, script: str, language: str) -> tuple:
+        """
+        将对话稿件拆分为 (文本, voice_id) 段
         
-        # 创建语音设置对象
-        voice_settings = VoiceSettings(
-            stability=self.voice_settings["stability"],
-            similarity_boost=self.voice_settings["similarity_boost"],
-            use_speaker_boost=self.voice_settings["use_speaker_boost"]
-        )
+        单次遍历：先按说话者收集行，最后统一拼接文本
         
-        # 分行处理
-        lines = script.strip().split('\n')
-        current_speaker = None
-        current_text = []
+        Args:
+            script: 播客稿件
+            language: 语言代码
         
-        # 识别模式：任何以 "名字:" 或 "名字：" 开头的行
-        # 支持: Alex:, Ben:, Host A:, 主持人A：等所有格式
-        import re
-        # 匹配任意单词（可能包含空格）后跟冒号
-        speaker_pattern = re.compile(r'^([A-Za-z\u4e00-\u9fa5][A-Za-z\u4e00-\u9fa5\s0-9]*?)[:：]\s*(.*)$')
+        Returns:
+            ((文本, voice_id), ...)，未检测到对话格式时整段作为单一输入
+        """
+        voices = self.voice_mappings.get(language, self._default_voices)
         
-        print(f"\n📋 开始解析对话脚本...")
+        logger.debug("📋 开始解析对话脚本...")
         
         # 用于追踪说话者和分配语音
         speaker_voice_map = {}  # 说话者名字 -> voice_id
-        speaker_order = []  # 记录说话者出现顺序
+        speaker_lines: list[tuple[str, list[str]]] = []  # (说话者, 该段的文本行)
+        current_lines = None  # 第一个说话者出现之前的行会被忽略
         
-        for line in lines:
+        for line in script.strip().split('\n'):
             line = line.strip()
             if not line:
                 continue
             
-            match = speaker_pattern.match(line)
+            match = _SPEAKER_RE.match(line)
             if match:
-                # 保存前一个说话者的内容
-                if current_text and current_speaker:
-                    text = ' '.join(current_text).strip()
-                    if text:
-                        voice_id = speaker_voice_map[current_speaker]
-                        print(f"   添加 {current_speaker} 声音: {text[:50]}...")
-                        # 为每个对话段添加语音设置
-                        dialogue_inputs.append(DialogueInput(
-                            text=text, 
-                            voice_id=voice_id,
-                            voice_settings=voice_settings
-                        ))
-                
-                # 开始新说话者，只提取冒号后的实际内容
+                # 开始新说话者，只提取冒号后的实际内容（不包含说话者标签）
                 speaker_label = match.group(1).strip()
-                actual_text = match.group(2).strip()  # 只取冒号后面的内容
+                actual_text = match.group(2).strip()
                 
-                # 动态分配语音：第一个说话者用 primary，第二个用 secondary
+                # 动态分配语音：奇数位出场的说话者用 primary，偶数位用 secondary
                 if speaker_label not in speaker_voice_map:
-                    speaker_order.append(speaker_label)
-                    if len(speaker_order) == 1:
-                        speaker_voice_map[speaker_label] = voices["primary"]
-                        print(f"   🎤 新说话者 '{speaker_label}' -> 使用 primary 声音")
-                    elif len(speaker_order) == 2:
-                        speaker_voice_map[speaker_label] = voices["secondary"]
-                        print(f"   🎤 新说话者 '{speaker_label}' -> 使用 secondary 声音")
-                    else:
-                        # 超过2个说话者，循环使用
-                        speaker_voice_map[speaker_label] = voices["primary"] if len(speaker_order) % 2 == 1 else voices["secondary"]
-                        print(f"   🎤 新说话者 '{speaker_label}' -> 使用 {'primary' if len(speaker_order) % 2 == 1 else 'secondary'} 声音")
-                
-                current_speaker = speaker_label
+                    role = "primary" if len(speaker_voice_map) % 2 == 0 else "secondary"
+                    speaker_voice_map[speaker_label] = voices[role]
+                    logger.debug("🎤 新说话者 '%s' -> 使用 %s 声音", speaker_label, role)
                 
-                # ⚠️ 重要：这里确保不包含说话者标签，只保留实际对话内容
-                if actual_text:
-                    current_text = [actual_text]
-                    print(f"   ✅ 提取内容（不含'{speaker_label}:'标签）: {actual_text[:50]}...")
-                else:
-                    current_text = []
-                
-                print(f"   检测到说话者: {speaker_label}")
-            else:
+                current_lines = [actual_text] if actual_text else []
+                speaker_lines.append((speaker_label, current_lines))
+            elif current_lines is not None:
                 # 继续当前说话者的文本
-                current_text.append(line)
-        
-        # 保存最后一个说话者的内容
-        if current_text and current_speaker:
-            text = ' '.join(current_text).strip()
-            if text:
-                voice_id = speaker_voice_map[current_speaker]
-                print(f"   添加 {current_speaker} 声音: {text[:50]}...")
-                # 为每个对话段添加语音设置
-                dialogue_inputs.append(DialogueInput(
-                    text=text, 
-                    voice_id=voice_id,
-                    voice_settings=voice_settings
-                ))
+                current_lines.append(line)
+        
+        segments = tuple(
+            (text, speaker_voice_map[speaker])
+            for speaker, lines in speaker_lines
+            if (text := ' '.join(lines).strip())
+        )
         
         # 如果没有检测到多个说话者，整段作为单一输入
-        if len(dialogue_inputs) == 0:
+        if not segments:
             # 尝试清除所有标签后再使用
-            cleaned_script = re.sub(speaker_pattern, r'\2', script)
-            dialogue_inputs.append(DialogueInput(
-                text=cleaned_script.strip(),
-                voice_id=voices["primary"],
-                voice_settings=voice_settings
-            ))
-            print(f"   ⚠️  未检测到对话格式，使用单声音")
-        else:
-            print(f"✅ 解析完成，检测到 {len(speaker_order)} 个说话者，共 {len(dialogue_inputs)} 段对话")
+            cleaned_script = _SPEAKER_RE.sub(r'\2', script)
+            logger.info("⚠️  未检测到对话格式，使用单声音")
+            return ((cleaned_script.strip(), voices["primary"]),)
         
-        return dialogue_inputs
+        logger.info("✅ 解析完成，检测到 %d 个说话者，共 %d 段对话", len(speaker_voice_map), len(segments))
+        return segments
     
-    def generate_script_from_topic(
+    @staticmethod
+    def _script_cache_key(topic: str, style: str, duration_minutes: int, language: str) -> str:
+        """
+        生成稿件缓存键
+        
+        主题忽略大小写和多余空白，避免仅格式不同的相同请求重复调用 Gemini
+        
+        Returns:
+            缓存键（blake2b 摘要）
+        """
+        normalized_topic = " ".join(topic.lower().split())
+        raw_key = f"{normalized_topic}|{style}|{duration_minutes}|{language}"
+        return hashlib.blake2b(raw_key.encode("utf-8"), digest_size=16).hexdigest()
+    
+    def _script_cache_hit_rate(self) -> float:
+        """稿件缓存命中率"""
+        total = self._script_cache_hits + self._script_cache_misses
+        return self._script_cache_hits / total if total else 0.0
+    
+    async def generate_script_from_topic(
         self, 
         topic: str, 
         style: str = "Solo Talk Show",
@@ -481,7 +655,7 @@ class AIService:
         language: str = "en"
     ) -> str:
         """
-        根据主题生成播客稿件（两步法：大纲 → 完整稿件）
+        根据主题生成播客稿件（单次调用：模型先规划大纲再输出完整稿件）
         
         Args:
             topic: 播客主题
@@ -494,291 +668,126 @@ class AIService:
         Raises:
             Exception: 如果生成失败
         """
-        print(f"\n📝 开始生成播客稿件...")
-        print(f"   主题: {topic}")
-        print(f"   风格: {style}")
-        print(f"   语言: {language}")
-        print(f"   目标时长: {duration_minutes} 分钟")
+        logger.info(
+            "📝 开始生成播客稿件（风格: %s，语言: %s，目标时长: %d 分钟）",
+            style, language, duration_minutes
+        )
+        logger.debug("主题: %s", topic)
+        
+        cache_key = self._script_cache_key(topic, style, duration_minutes, language)
+        cached_script = self._script_cache.get(cache_key)
+        if cached_script is not None:
+            self._script_cache_hits += 1
+            logger.info("⚡ 命中稿件缓存（命中率: %.0f%%）", self._script_cache_hit_rate() * 100)
+            return cached_script
+        self._script_cache_misses += 1
         
         try:
-            # 语言配置
+            # 语言配置：中文对话式播客约140-170字/分钟，英文约120-150词/分钟
             if language == "zh":
-                outline_prompt = f"""你是一位专业的播客编剧。请为以下主题生成一个播客大纲。
-
-主题：{topic}
-风格：{style}
-目标时长：{duration_minutes} 分钟
-
-请生成一个包含以下部分的大纲：
-1. 开场白（引人入胜的开场）
-2. 主要内容点（3-5个核心要点）
-3. 结尾（总结）
-
-要求：
-- 内容要有趣、引人入胜
-- 适合{style}的表达方式
-- 语言自然流畅、口语化
-- 适合{duration_minutes}分钟的播客长度
-
-请直接输出大纲内容，不要额外的解释。"""
-
-                # 根据语速计算合适的字数（中文对话式播客约140-170字/分钟）
-                min_chars = duration_minutes * 140
-                max_chars = duration_minutes * 170
-                
-                script_prompt_base = f"""你是一位专业的播客编剧。根据以下大纲，生成一份完整、专业的播客稿件。
-
-主题：{topic}
-风格：{style}
-
-⚠️ **严格时长要求**：
-- 目标时长：**必须严格控制在 {duration_minutes} 分钟**
-- 字数要求：**{min_chars}-{max_chars} 字**（对话式播客约140-170字/分钟）
-- 这是硬性要求，必须遵守！
-
-大纲：
-{{outline}}
-
-请按以下结构生成完整的播客稿件：
-
-**稿件结构：**
-1. 开场引子（占10%时长，约{int(min_chars * 0.1)}-{int(max_chars * 0.1)}字）
-   - 以吸引人的问题或陈述开场
-   - 自然地介绍主持人
-   - 预告将要讨论的内容
-
-2. 主体内容（占80%时长，约{int(min_chars * 0.8)}-{int(max_chars * 0.8)}字）
-   - 根据大纲逐一展开要点
-   - 使用对话式来回交流
-   - 包含具体例子和深入见解
-   - 保持自然节奏，流畅过渡
-
-3. 结尾总结（占10%时长，约{int(min_chars * 0.1)}-{int(max_chars * 0.1)}字）
-   - 总结核心要点
-   - 以令人印象深刻的语句结束
-   - 感谢听众
-
-**核心要求：**
-
-{style}风格指南：
-- 使用自然、口语化的语言（避免书面或正式用语）
-- 包含反问句以吸引听众
-- 使用具体案例和故事
-- 保持适当的节奏感
-- 展现对话题的真诚热情
-
-主持人配置：
-- 固定使用这两个名字："Alex"（主持人，男声）和 "Emma"（搭档主持，女声）
-- Alex先开场："大家好，我是Alex..."
-- Emma紧接着介绍："我是Emma..."
-- 介绍后在对话中自然使用名字
-- 绝不使用"主持人A"、"主持人B"、"嘉宾1"等泛称
-
-对话质量标准：
-- 每次发言控制在1-3句话（避免长篇独白）
-- 包含自然反应和回应（"太有意思了"、"确实"、"说得好"）
-- 基于前面的发言继续讨论，形成流畅对话
-- 用问题来过渡话题
-- 两位主持人发言时间要均衡
-
-**绝对禁止：**
-❌ 任何括号标注：(**音乐**) (**轻笑**) (**停顿**) （音乐起） [音效] [任何内容]
-❌ 任何Markdown格式：**粗体** *斜体* _下划线_
-❌ 任何占位符：[你的名字] [主持人名] [播客名称] [节目名] [话题] [嘉宾姓名]
-❌ 舞台指示、音效或场景描述
-❌ 泛称式的说话者标签或编号
-
-**正确示例：**
-
-Alex：大家好，我是Alex，今天我们要聊一个特别有意思的话题。
-Emma：我是Emma。Alex，这个话题确实太及时了，我都等不及要和你讨论了。
-Alex：那我们就直接进入正题吧。最有意思的是，这其实和我们每个人都息息相关。
-Emma：完全同意。而且我觉得最让人意外的是它的影响范围。
-Alex：对，我举个具体的例子...
-
-**错误示例 - 绝对不要这样：**
-
-Alex：欢迎来到[播客名称]。今天我们要讨论[话题]。
-Emma：没错，[主持人名]。让我们深入了解[主题]。
-(**音乐渐弱**)
-Alex：**这很重要**。我们的[嘉宾]会解释...
-
-输出格式：
-- 直接输出对话内容
-- 只使用"Alex："和"Emma："作为标签
-- 不要标题、不要元数据、不要舞台指示
-- 只输出纯对话稿件
-
-⚠️ **再次强调时长控制**：
-生成的稿件必须严格控制在 **{min_chars}-{max_chars} 字**，确保朗读时长正好是 **{duration_minutes} 分钟**。
-如果内容过多，请精简；如果内容过少，请适当扩展。时长精确度是评价稿件质量的关键指标！
-
-现在请根据上述大纲生成完整的播客稿件。"""
+                template = ZH_SCRIPT_TEMPLATE
+                min_length, max_length = duration_minutes * 140, duration_minutes * 170
             else:  # English
-                outline_prompt = f"""You are a professional podcast scriptwriter. Generate a podcast outline for the following topic.
-
-Topic: {topic}
-Style: {style}
-Target Duration: {duration_minutes} minutes
-
-Generate an outline including:
-1. Opening (captivating introduction)
-2. Main content points (3-5 key points)
-3. Closing (summary)
-
-Requirements:
-- Content should be interesting and engaging
-- Match the {style} expression style
-- Natural and conversational language
-- Suitable for {duration_minutes} minutes podcast length
-
-Output the outline directly without extra explanations."""
-
-                # Calculate appropriate word count (conversational English podcast: ~120-150 words/minute)
-                min_words = duration_minutes * 120
-                max_words = duration_minutes * 150
-                
-                script_prompt_base = f"""You are a professional podcast scriptwriter. Based on the following outline, generate a complete, professional podcast script.
-
-Topic: {topic}
-Style: {style}
-
-⚠️ **STRICT DURATION REQUIREMENT**:
-- Target Duration: **MUST be strictly {duration_minutes} minutes**
-- Word Count: **{min_words}-{max_words} words** (conversational podcast: ~120-150 words/minute)
-- This is a HARD requirement - you MUST comply!
-
-Outline:
-{{outline}}
-
-Generate a complete podcast script with the following structure:
-
-**Script Structure:**
-1. Opening hook (10% of duration, ~{int(min_words * 0.1)}-{int(max_words * 0.1)} words)
-   - Start with an engaging question or statement
-   - Introduce the hosts naturally
-   - Preview what will be covered
-
-2. Main content (80% of duration, ~{int(min_words * 0.8)}-{int(max_words * 0.8)} words)
-   - Develop each point from the outline
-   - Use conversational back-and-forth dialogue
-   - Include specific examples and insights
-   - Maintain natural pacing with smooth transitions
-
-3. Closing (10% of duration, ~{int(min_words * 0.1)}-{int(max_words * 0.1)} words)
-   - Summarize key takeaways
-   - End with a memorable statement
-   - Thank the audience
-
-**CRITICAL REQUIREMENTS:**
-
-Style Guidelines for {style}:
-- Use natural, conversational language (avoid formal or written style)
-- Include rhetorical questions to engage listeners
-- Use specific examples and anecdotes
-- Maintain appropriate pacing and rhythm
-- Show genuine enthusiasm for the topic
-
-Host Configuration:
-- ALWAYS use these EXACT names: "Alex" (primary host, male voice) and "Emma" (co-host, female voice)
-- Alex introduces first: "Hi everyone, I'm Alex..."
-- Emma introduces immediately after: "And I'm Emma..."
-- After introductions, use names naturally in conversation
-- Never use generic labels like "Host A", "Host B", or "Speaker 1"
-
-Dialogue Quality Standards:
-- Each speaker turn should be 1-3 sentences (avoid long monologues)
-- Include natural reactions and acknowledgments ("That's fascinating", "Exactly", "Great point")
-- Build on previous statements to create flow
-- Use questions to transition between topics
-- Maintain balanced speaking time between hosts
-
-**ABSOLUTELY FORBIDDEN:**
-❌ ANY bracketed annotations: (**music**) (**laughs**) (**pause**) (music starts) [sound effect] [anything]
-❌ ANY Markdown formatting: **bold** *italic* _underline_
-❌ ANY placeholders: [your name] [host name] [Podcast Name] [show name] [topic] [guest name]
-❌ Stage directions, sound effects, or scene descriptions
-❌ Generic speaker labels or numbered speakers
-
-**CORRECT Example:**
-
-Alex: Hi everyone, I'm Alex, and today we're diving into something I've been curious about for ages.
-Emma: And I'm Emma. This is such a timely topic, Alex. I can't wait to unpack it with you.
-Alex: So let's jump right in. What makes this so interesting is how it affects all of us daily.
-Emma: Absolutely. And I think what surprises most people is the scale of it.
-Alex: Right. Let me give you a concrete example...
-
-**WRONG Example - Never Do This:**
-
-Alex: Welcome to [Podcast Name]. Today we'll discuss [topic].
-Emma: That's right, [Host Name]. Let's dive into [subject].
-(**music fades**)
-Alex: **This is important**. Our [guest] will explain...
-
-Output Format:
-- Start directly with the dialogue
-- Use "Alex:" and "Emma:" as the only labels
-- No title, no metadata, no stage directions
-- Pure conversational script only
-
-⚠️ **FINAL REMINDER - DURATION CONTROL**:
-The script MUST be strictly **{min_words}-{max_words} words** to ensure it takes exactly **{duration_minutes} minutes** to read.
-If content is too long, condense it; if too short, expand appropriately. Duration accuracy is KEY to script quality!
-
-Now generate the complete podcast script based on the outline above."""
-            
-            print("\n📋 步骤1: 生成大纲...")
-            outline = self._call_gemini_api(outline_prompt, temperature=0.8, max_tokens=2000)
-            print(f"✅ 大纲生成完成")
-            
-            # 步骤2: 根据大纲扩展为完整稿件
-            script_prompt = script_prompt_base.replace("{outline}", outline)
+                template = EN_SCRIPT_TEMPLATE
+                min_length, max_length = duration_minutes * 120, duration_minutes * 150
+            
+            script_prompt = template.format(
+                topic=topic,
+                style=style,
+                duration_minutes=duration_minutes,
+                min_length=min_length,
+                max_length=max_length,
+                opening_min=int(min_length * 0.1),
+                opening_max=int(max_length * 0.1),
+                body_min=int(min_length * 0.8),
+                body_max=int(max_length * 0.8)
+            )
             
-            print("\n✍️  步骤2: 扩展为完整稿件...")
-            script = self._call_gemini_api(script_prompt, temperature=0.7, max_tokens=4000)
-            print(f"✅ 完整稿件生成完成")
+            # 单次调用：大纲由模型在生成稿件前自行规划，不再单独请求一轮
+            logger.info("✍️  生成完整稿件...")
+            script = await self._call_gemini_api(script_prompt, temperature=0.7, max_tokens=6000)
+            logger.info("✅ 完整稿件生成完成")
             
             # 验证字数/单词数
             if language == "zh":
                 actual_length = len(script)
                 target_min = duration_minutes * 140
                 target_max = duration_minutes * 170
-                print(f"\n📊 时长验证:")
-                print(f"   目标时长: {duration_minutes} 分钟")
-                print(f"   目标字数: {target_min}-{target_max} 字")
-                print(f"   实际字数: {actual_length} 字")
+                logger.info(
+                    "📊 时长验证: 目标 %d 分钟，目标字数 %d-%d 字，实际字数 %d 字",
+                    duration_minutes, target_min, target_max, actual_length
+                )
                 
                 # 估算实际时长（按155字/分钟计算）
                 estimated_minutes = actual_length / 155
-                print(f"   预估时长: {estimated_minutes:.1f} 分钟")
+                logger.info("预估时长: %.1f 分钟", estimated_minutes)
                 
                 if actual_length < target_min * 0.9 or actual_length > target_max * 1.1:
-                    print(f"   ⚠️  警告: 字数偏离目标较多，实际播放时长可能不准确")
+                    logger.warning("⚠️  字数偏离目标较多，实际播放时长可能不准确")
             else:
                 word_count = len(script.split())
                 target_min = duration_minutes * 120
                 target_max = duration_minutes * 150
-                print(f"\n📊 Duration Verification:")
-                print(f"   Target Duration: {duration_minutes} minutes")
-                print(f"   Target Word Count: {target_min}-{target_max} words")
-                print(f"   Actual Word Count: {word_count} words")
+                logger.info(
+                    "📊 Duration verification: target %d minutes, target words %d-%d, actual words %d",
+                    duration_minutes, target_min, target_max, word_count
+                )
                 
                 # 估算实际时长（按135词/分钟计算）
                 estimated_minutes = word_count / 135
-                print(f"   Estimated Duration: {estimated_minutes:.1f} minutes")
+                logger.info("Estimated duration: %.1f minutes", estimated_minutes)
                 
                 if word_count < target_min * 0.9 or word_count > target_max * 1.1:
-                    print(f"   ⚠️  Warning: Word count deviates significantly, actual duration may be inaccurate")
+                    logger.warning("⚠️  Word count deviates significantly, actual duration may be inaccurate")
+            
+            logger.info("🎉 播客稿件生成成功！")
             
-            print(f"\n🎉 播客稿件生成成功！")
+            self._script_cache.set(cache_key, script)
+            logger.debug("稿件缓存命中率: %.0f%%", self._script_cache_hit_rate() * 100)
             
             return script
         
         except Exception as e:
-            print(f"❌ 播客稿件生成失败: {e}")
+            logger.error("❌ 播客稿件生成失败: %s", e, exc_info=True)
             raise Exception(f"播客稿件生成失败: {str(e)}")
 
-
-# 创建全局实例
-ai_service = AIService()
+    
+    async def generate_title(self, kind: str, context: str) -> Optional[str]:
+        """
+        生成播客标题
+        
+        Args:
+            kind: 内容类型描述（如 "podcast script"、"podcast summary"）
+            context: 用于生成标题的内容摘录
+        
+        Returns:
+            清理后的标题（最多60字符），模型返回空内容时为 None
+        
+        Raises:
+            Exception: 如果 API 调用失败
+        """
+        prompt = TITLE_TEMPLATE.format(kind=kind, context=context)
+        title = await self._call_gemini_api(prompt, temperature=0.7, max_tokens=50)
+        # 清理标题（去除引号、换行等）
+        title = title.strip().strip('"').strip("'").replace('\n', ' ')
+        if not title:
+            return None
+        # 限制长度
+        if len(title) > 60:
+            title = title[:57] + "..."
+        return title
+
+# 全局实例（首次使用时创建，导入本模块不会初始化 ElevenLabs 客户端）
+_instance: Optional[AIService] = None
+_instance_lock = threading.Lock()
+
+
+def get_ai_service() -> AIService:
+    """获取全局 AIService 实例（线程安全的延迟初始化）"""
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                _instance = AIService()
+    return _instance
 
@@ -2,43 +2,189 @@
 内容提取服务 - 从音频/视频中提取和分析内容
 使用 Gemini API 分析音频/视频内容并生成结构化数据
 """
+import asyncio
+import base64
+import functools
+import hashlib
 import httpx
 import io
-from pathlib import Path
-from typing import Dict, Any, Optional
+import logging
+import orjson
+import re
+import uuid
+from pydantic import BaseModel
+from typing import Dict, Any, List, Optional, Tuple
 from app.config import settings
+from app.services.ai_service import GEMINI_RETRY_ATTEMPTS, GEMINI_RETRYABLE_STATUS, RetryableGeminiError
+from app.utils.cache import TTLCache
+from app.utils.http_client import get_async_client
+from app.utils.retry import async_retry, parse_retry_after
+
+
+logger = logging.getLogger(__name__)
+
+# 音频/视频分析耗时较长，单独放宽共享客户端的默认超时
+GEMINI_ANALYSIS_TIMEOUT = httpx.Timeout(300.0, connect=10.0)
+
+# 分析结果缓存：同一文件（按内容摘要）重复提交时跳过 Gemini 调用
+ANALYSIS_CACHE_SIZE = 64
+ANALYSIS_CACHE_TTL = 86400  # 秒
+
+# JSON 解析失败时返回的占位摘要（此类结果不写入缓存）
+ANALYSIS_FAILED_SUMMARY = '内容分析失败'
+
+# 日志中的媒体类型名称
+MEDIA_LABELS = {'audio': '音频', 'video': '视频'}
+
+# Gemini 结构化输出 schema（音频/视频分析结果）
+ANALYSIS_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "transcript": {"type": "STRING", "description": "完整的语音转录文字"},
+        "summary": {"type": "STRING", "description": "内容摘要（100-200字）"},
+        "topics": {"type": "ARRAY", "items": {"type": "STRING"}, "description": "3-5个核心主题"},
+        "insights": {"type": "ARRAY", "items": {"type": "STRING"}, "description": "3-5个关键观点"},
+        "duration": {"type": "NUMBER", "description": "估算的时长（秒）"}
+    },
+    "required": ["transcript", "summary", "topics", "insights", "duration"]
+}
+
+# 扩展名 -> (文件类型, MIME 类型)，一次查找同时得到两者
+_EXT_TO_TYPE: Dict[str, Tuple[str, str]] = {
+    '.mp3': ('audio', 'audio/mpeg'),
+    '.wav': ('audio', 'audio/wav'),
+    '.m4a': ('audio', 'audio/mp4'),
+    '.ogg': ('audio', 'audio/ogg'),
+    '.flac': ('audio', 'audio/flac'),
+    '.mp4': ('video', 'video/mp4'),
+    '.mov': ('video', 'video/quicktime'),
+    '.avi': ('video', 'video/x-msvideo'),
+    '.mkv': ('video', 'video/x-matroska'),
+    '.webm': ('video', 'video/webm')
+}
+
+# inline_data 分块编码：占位符在序列化后替换为流式 base64 数据，块大小须为 3 的整数倍
+INLINE_DATA_PLACEHOLDER = "__INLINE_MEDIA_DATA__"
+BASE64_CHUNK_SIZE = 3 * 1024 * 1024
+
+# File API 文件处理状态轮询（视频上传后需要等待处理完成）
+FILE_API_POLL_INTERVAL = 2  # 秒
+FILE_API_MAX_POLLS = 90
+
+
+# 首尾的 markdown 代码块标记（```json ... ```），一次扫描去掉
+_FENCE_RE = re.compile(r'\A\s*```(?:json)?[ \t]*\n?|\n?[ \t]*```\s*\Z')
+
+
+def strip_code_fences(text: str) -> str:
+    """
+    去掉文本首尾的 markdown 代码块标记
+    
+    Args:
+        text: 模型输出文本
+    
+    Returns:
+        去掉代码块标记和首尾空白后的文本
+    """
+    return _FENCE_RE.sub('', text).strip()
+
+
+class GeminiPart(BaseModel):
+    """Gemini 响应中的内容片段（只解析需要的字段，其余字段忽略）"""
+    text: str = ""
+
+
+class GeminiContent(BaseModel):
+    """Gemini 候选结果的内容"""
+    parts: List[GeminiPart] = []
+
+
+class GeminiCandidate(BaseModel):
+    """Gemini 候选结果"""
+    content: GeminiContent = GeminiContent()
+
+
+class GeminiStreamChunk(BaseModel):
+    """streamGenerateContent 的单个 SSE 事件（GenerateContentResponse）"""
+    candidates: List[GeminiCandidate] = []
+
+
+def _suffix_lower(filename: str) -> str:
+    """
+    获取小写的文件扩展名（含点号），如 "Talk.MP3" -> ".mp3"
+    
+    与 Path(filename).suffix.lower() 结果一致，但只做字符串操作，不构造 Path 对象
+    """
+    name, dot, ext = filename.rpartition('.')
+    if not dot or not name or not ext or name.endswith('/') or '/' in ext:
+        return ''
+    return f".{ext.lower()}"
 
 
 class ContentExtractor:
     """音频/视频内容提取和分析服务"""
     
     # 支持的音频格式
-    AUDIO_FORMATS = {'.mp3', '.wav', '.m4a', '.ogg', '.flac'}
+    AUDIO_FORMATS = frozenset({'.mp3', '.wav', '.m4a', '.ogg', '.flac'})
     
     # 支持的视频格式
-    VIDEO_FORMATS = {'.mp4', '.mov', '.avi', '.mkv', '.webm'}
+    VIDEO_FORMATS = frozenset({'.mp4', '.mov', '.avi', '.mkv', '.webm'})
+    
+    # 分析提示词（按媒体类型）
+    _PROMPT_TEMPLATES = {
+        'audio': """请分析这个音频文件的内容，并提供以下信息：
+
+1. **完整转录**：将音频内容转录为文字
+2. **内容摘要**：简要概括主要内容（100-200字）
+3. **关键主题**：列出3-5个核心主题（每个主题5-10字）
+4. **核心观点**：提取3-5个关键观点或要点（每个观点10-30字）
+
+""",
+        'video': """请分析这个视频文件的内容，并提供以下信息：
+
+1. **完整转录**：将视频中的语音内容转录为文字
+2. **内容摘要**：简要概括主要内容（100-200字）
+3. **关键主题**：列出3-5个核心主题（每个主题5-10字）
+4. **核心观点**：提取3-5个关键观点或要点（每个观点10-30字）
+
+"""
+    }
     
     def __init__(self):
         """初始化 ContentExtractor"""
         self.gemini_api_key = settings.gemini_api_key
         self.gemini_model = settings.gemini_model
         self.gemini_api_url = settings.gemini_api_url
-        self.temp_dir = settings.temp_dir
+        self.use_file_api = settings.gemini_file_api_enabled
+        self.max_inline_bytes = settings.gemini_max_inline_bytes
+        self.gemini_file_api_url = settings.gemini_file_api_url.rstrip('/')
         
-        # 确保临时目录存在
-        self.temp_dir.mkdir(parents=True, exist_ok=True)
+        # 请求地址只解析一次；API key 通过请求头传入，不出现在 URL 中（httpx 等日志会记录完整 URL）
+        self._vertex_stream_url = httpx.URL(f"{self.gemini_api_url}/{self.gemini_model}:streamGenerateContent")
+        self._file_api_stream_url = httpx.URL(
+            f"{self.gemini_file_api_url}/v1beta/models/{self.gemini_model}:streamGenerateContent"
+        )
+        self._stream_params = {"alt": "sse"}
+        self._key_headers = {"x-goog-api-key": self.gemini_api_key}
+        # 临时目录在 app.config 导入时已创建，这里无需再检查
+        self.temp_dir = settings.temp_dir
+        self._analysis_cache = TTLCache(maxsize=ANALYSIS_CACHE_SIZE, ttl=ANALYSIS_CACHE_TTL)
     
-    def is_audio_file(self, filename: str) -> bool:
+    @staticmethod
+    def is_audio_file(filename: str) -> bool:
         """检查是否为音频文件"""
-        return Path(filename).suffix.lower() in self.AUDIO_FORMATS
+        return ContentExtractor.validate_file_format(filename)[1] == 'audio'
     
-    def is_video_file(self, filename: str) -> bool:
+    @staticmethod
+    def is_video_file(filename: str) -> bool:
         """检查是否为视频文件"""
-        return Path(filename).suffix.lower() in self.VIDEO_FORMATS
+        return ContentExtractor.validate_file_format(filename)[1] == 'video'
     
-    def validate_file_format(self, filename: str) -> tuple[bool, str]:
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def validate_file_format(filename: str) -> tuple[bool, str]:
         """
-        验证文件格式
+        验证文件格式（纯函数，按文件名缓存结果）
         
         Args:
             filename: 文件名
@@ -46,12 +192,10 @@ class ContentExtractor:
         Returns:
             (is_valid, file_type) - (是否有效, 文件类型: 'audio'/'video'/None)
         """
-        if self.is_audio_file(filename):
-            return True, 'audio'
-        elif self.is_video_file(filename):
-            return True, 'video'
-        else:
+        file_info = _EXT_TO_TYPE.get(_suffix_lower(filename))
+        if file_info is None:
             return False, None
+        return True, file_info[0]
     
     async def extract_from_audio(
         self, 
@@ -82,24 +226,26 @@ class ContentExtractor:
             Exception: 如果提取失败
         """
         try:
-            print(f"🎵 开始提取音频内容...")
-            print(f"   文件名: {filename}")
-            print(f"   音频大小: {len(audio_content)} bytes")
+            logger.info("🎵 开始提取音频内容: %s（%d bytes）", filename, len(audio_content))
             
             # 验证格式
             is_valid, file_type = self.validate_file_format(filename)
             if not is_valid or file_type != 'audio':
                 raise ValueError(f"不支持的音频格式: {filename}")
             
-            # 使用 Gemini API 分析音频
-            analysis_result = await self._analyze_audio_with_gemini(
-                audio_content, 
+            # 在哈希/编码/上传之前检查大小
+            self._check_media_size(audio_content, filename)
+            
+            # 使用 Gemini API 分析音频（相同内容命中缓存时跳过）
+            analysis_result = await self._cached_analysis(
+                audio_content,
                 filename,
+                'audio',
                 enhancement_prompt
             )
             
             # 提取元数据
-            file_format = Path(filename).suffix.lower().lstrip('.')
+            file_format = _suffix_lower(filename).lstrip('.')
             
             result = {
                 'transcript': analysis_result.get('transcript', ''),
@@ -112,14 +258,15 @@ class ContentExtractor:
                 'original_filename': filename
             }
             
-            print(f"✅ 音频内容提取成功！")
-            print(f"   转录长度: {len(result['transcript'])} 字符")
-            print(f"   主题数: {len(result['topics'])}")
+            logger.info(
+                "✅ 音频内容提取成功！转录长度: %d 字符，主题数: %d",
+                len(result['transcript']), len(result['topics'])
+            )
             
             return result
         
         except Exception as e:
-            print(f"❌ 音频内容提取失败: {e}")
+            logger.error("❌ 音频内容提取失败: %s", e, exc_info=True)
             raise Exception(f"音频内容提取失败: {str(e)}")
     
     async def extract_from_video(
@@ -143,24 +290,26 @@ class ContentExtractor:
             Exception: 如果提取失败
         """
         try:
-            print(f"🎬 开始提取视频内容...")
-            print(f"   文件名: {filename}")
-            print(f"   视频大小: {len(video_content)} bytes")
+            logger.info("🎬 开始提取视频内容: %s（%d bytes）", filename, len(video_content))
             
             # 验证格式
             is_valid, file_type = self.validate_file_format(filename)
             if not is_valid or file_type != 'video':
                 raise ValueError(f"不支持的视频格式: {filename}")
             
-            # 使用 Gemini API 分析视频
-            analysis_result = await self._analyze_video_with_gemini(
-                video_content, 
+            # 在哈希/编码/上传之前检查大小
+            self._check_media_size(video_content, filename)
+            
+            # 使用 Gemini API 分析视频（相同内容命中缓存时跳过）
+            analysis_result = await self._cached_analysis(
+                video_content,
                 filename,
+                'video',
                 enhancement_prompt
             )
             
             # 提取元数据
-            file_format = Path(filename).suffix.lower().lstrip('.')
+            file_format = _suffix_lower(filename).lstrip('.')
             
             result = {
                 'transcript': analysis_result.get('transcript', ''),
@@ -173,199 +322,102 @@ class ContentExtractor:
                 'original_filename': filename
             }
             
-            print(f"✅ 视频内容提取成功！")
-            print(f"   转录长度: {len(result['transcript'])} 字符")
-            print(f"   主题数: {len(result['topics'])}")
+            logger.info(
+                "✅ 视频内容提取成功！转录长度: %d 字符，主题数: %d",
+                len(result['transcript']), len(result['topics'])
+            )
             
             return result
         
         except Exception as e:
-            print(f"❌ 视频内容提取失败: {e}")
+            logger.error("❌ 视频内容提取失败: %s", e, exc_info=True)
             raise Exception(f"视频内容提取失败: {str(e)}")
     
-    async def _analyze_audio_with_gemini(
-        self, 
-        audio_content: bytes, 
+    async def _analysis_cache_key(
+        self,
+        content: bytes,
         filename: str,
-        enhancement_prompt: Optional[str] = None
+        enhancement_prompt: Optional[str]
+    ) -> str:
+        """
+        生成分析结果缓存键
+        
+        由文件内容摘要、MIME 类型、增强提示和模型组成；
+        大文件的摘要计算放到线程中执行（hashlib 计算时释放 GIL），避免阻塞事件循环
+        
+        Returns:
+            缓存键
+        """
+        digest = await asyncio.to_thread(
+            lambda: hashlib.blake2b(content, digest_size=32).hexdigest()
+        )
+        return f"{digest}|{self._get_mime_type(filename)}|{enhancement_prompt or ''}|{self.gemini_model}"
+    
+    async def _cached_analysis(
+        self,
+        content: bytes,
+        filename: str,
+        media_kind: str,
+        enhancement_prompt: Optional[str]
     ) -> Dict[str, Any]:
         """
-        使用 Gemini API 分析音频内容
+        带缓存的 Gemini 分析
         
         Args:
-            audio_content: 音频内容
+            content: 文件内容
             filename: 文件名
-            enhancement_prompt: 增强提示
+            media_kind: 媒体类型：'audio' / 'video'
+            enhancement_prompt: 可选的增强提示
         
         Returns:
             分析结果
         """
-        try:
-            import base64
-            
-            print(f"🤖 使用 Gemini API 分析音频...")
-            
-            # 将音频编码为 base64
-            audio_base64 = base64.b64encode(audio_content).decode('utf-8')
-            
-            # 构建分析提示词
-            analysis_prompt = """请分析这个音频文件的内容，并提供以下信息：
-
-1. **完整转录**：将音频内容转录为文字
-2. **内容摘要**：简要概括主要内容（100-200字）
-3. **关键主题**：列出3-5个核心主题（每个主题5-10字）
-4. **核心观点**：提取3-5个关键观点或要点（每个观点10-30字）
-
-"""
-            
-            if enhancement_prompt:
-                analysis_prompt += f"\n特别关注：{enhancement_prompt}\n"
-            
-            analysis_prompt += """
-请以 JSON 格式返回结果：
-{
-  "transcript": "完整的音频转录文字...",
-  "summary": "内容摘要...",
-  "topics": ["主题1", "主题2", "主题3"],
-  "insights": ["观点1", "观点2", "观点3"],
-  "duration": 估算的音频时长（秒）
-}
-
-CRITICAL: 
-- 直接返回 JSON，不要包含任何 markdown 代码块标记（```json 或 ```）
-- 不要添加任何额外的解释文字
-- 确保 JSON 格式完全正确
-"""
-            
-            # 构建 Gemini API 请求
-            # 注意：Gemini 支持音频输入
-            url = f"{self.gemini_api_url}/{self.gemini_model}:generateContent?key={self.gemini_api_key}"
-            
-            payload = {
-                "contents": [
-                    {
-                        "role": "user",
-                        "parts": [
-                            {
-                                "text": analysis_prompt
-                            },
-                            {
-                                "inline_data": {
-                                    "mime_type": self._get_mime_type(filename),
-                                    "data": audio_base64
-                                }
-                            }
-                        ]
-                    }
-                ],
-                "generationConfig": {
-                    "temperature": 0.3,  # 较低温度以保证准确性
-                    "maxOutputTokens": 4000
-                }
-            }
-            
-            headers = {
-                "Content-Type": "application/json"
-            }
-            
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                response = await client.post(url, json=payload, headers=headers)
-                response.raise_for_status()
-                
-                data = response.json()
-                content = data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
-                
-                if not content:
-                    raise Exception("Gemini API 返回空响应")
-                
-                # 解析 JSON 响应
-                import json
-                # 清理可能的 markdown 代码块标记
-                content = content.strip()
-                if content.startswith("```json"):
-                    content = content[7:]
-                if content.startswith("```"):
-                    content = content[3:]
-                if content.endswith("```"):
-                    content = content[:-3]
-                content = content.strip()
-                
-                result = json.loads(content)
-                
-                print(f"✅ Gemini 音频分析成功")
-                return result
-        
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON 解析失败: {e}")
-            print(f"原始响应: {content[:500]}...")
-            # 返回基本结构
-            return {
-                'transcript': content,
-                'summary': '内容分析失败',
-                'topics': [],
-                'insights': [],
-                'duration': 0.0
-            }
-        except Exception as e:
-            print(f"❌ Gemini 音频分析失败: {e}")
-            raise
+        cache_key = await self._analysis_cache_key(content, filename, enhancement_prompt)
+        cached_result = self._analysis_cache.get(cache_key)
+        if cached_result is not None:
+            logger.info("⚡ 命中分析缓存，跳过 Gemini 调用: %s", filename)
+            return dict(cached_result)
+        
+        analysis_result = await self._analyze_media_with_gemini(content, filename, media_kind, enhancement_prompt)
+        if analysis_result.get('summary') != ANALYSIS_FAILED_SUMMARY:
+            self._analysis_cache.set(cache_key, dict(analysis_result))
+        return analysis_result
     
-    async def _analyze_video_with_gemini(
-        self, 
-        video_content: bytes, 
+    async def _analyze_media_with_gemini(
+        self,
+        media_content: bytes,
         filename: str,
+        media_kind: str,
         enhancement_prompt: Optional[str] = None
     ) -> Dict[str, Any]:
         """
-        使用 Gemini API 分析视频内容
+        使用 Gemini API 分析音频/视频内容
         
         Args:
-            video_content: 视频内容
+            media_content: 音频/视频内容
             filename: 文件名
+            media_kind: 媒体类型：'audio' / 'video'（决定提示词）
             enhancement_prompt: 增强提示
         
         Returns:
             分析结果
         """
+        label = MEDIA_LABELS[media_kind]
+        content = ""
+        
         try:
-            import base64
-            
-            print(f"🤖 使用 Gemini API 分析视频...")
-            
-            # 将视频编码为 base64
-            video_base64 = base64.b64encode(video_content).decode('utf-8')
-            
-            # 构建分析提示词
-            analysis_prompt = """请分析这个视频文件的内容，并提供以下信息：
-
-1. **完整转录**：将视频中的语音内容转录为文字
-2. **内容摘要**：简要概括主要内容（100-200字）
-3. **关键主题**：列出3-5个核心主题（每个主题5-10字）
-4. **核心观点**：提取3-5个关键观点或要点（每个观点10-30字）
-
-"""
+            logger.info("🤖 使用 Gemini API 分析%s...", label)
             
+            # 构建分析提示词（无增强提示时直接复用类级别的静态提示词）
+            analysis_prompt = self._PROMPT_TEMPLATES[media_kind]
             if enhancement_prompt:
-                analysis_prompt += f"\n特别关注：{enhancement_prompt}\n"
+                analysis_prompt = f"{analysis_prompt}\n特别关注：{enhancement_prompt}\n"
             
-            analysis_prompt += """
-请以 JSON 格式返回结果：
-{
-  "transcript": "完整的视频语音转录文字...",
-  "summary": "内容摘要...",
-  "topics": ["主题1", "主题2", "主题3"],
-  "insights": ["观点1", "观点2", "观点3"],
-  "duration": 估算的视频时长（秒）
-}
-
-CRITICAL: 
-- 直接返回 JSON，不要包含任何 markdown 代码块标记（```json 或 ```）
-- 不要添加任何额外的解释文字
-- 确保 JSON 格式完全正确
-"""
+            # 使用共享连接池，复用 TCP/TLS 连接
+            client = get_async_client()
             
-            # 构建 Gemini API 请求
-            url = f"{self.gemini_api_url}/{self.gemini_model}:generateContent?key={self.gemini_api_key}"
+            # 构建 Gemini API 请求（媒体以 File API URI 引用或 base64 内联）
+            media_part = await self._build_media_part(client, media_content, filename)
             
             payload = {
                 "contents": [
@@ -375,92 +427,276 @@ CRITICAL:
                             {
                                 "text": analysis_prompt
                             },
-                            {
-                                "inline_data": {
-                                    "mime_type": self._get_mime_type(filename),
-                                    "data": video_base64
-                                }
-                            }
+                            media_part
                         ]
                     }
                 ],
                 "generationConfig": {
-                    "temperature": 0.3,
-                    "maxOutputTokens": 4000
+                    "temperature": 0.3,  # 较低温度以保证准确性
+                    "maxOutputTokens": 4000,
+                    # 结构化输出：直接返回符合 schema 的 JSON
+                    "responseMimeType": "application/json",
+                    "responseSchema": ANALYSIS_RESPONSE_SCHEMA
                 }
             }
             
-            headers = {
-                "Content-Type": "application/json"
-            }
+            content = await self._generate_content(client, payload, media_content)
             
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                response = await client.post(url, json=payload, headers=headers)
-                response.raise_for_status()
-                
-                data = response.json()
-                content = data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
-                
-                if not content:
-                    raise Exception("Gemini API 返回空响应")
-                
-                # 解析 JSON 响应
-                import json
-                # 清理可能的 markdown 代码块标记
-                content = content.strip()
-                if content.startswith("```json"):
-                    content = content[7:]
-                if content.startswith("```"):
-                    content = content[3:]
-                if content.endswith("```"):
-                    content = content[:-3]
-                content = content.strip()
-                
-                result = json.loads(content)
-                
-                print(f"✅ Gemini 视频分析成功")
-                return result
-        
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON 解析失败: {e}")
-            print(f"原始响应: {content[:500]}...")
+            if not content:
+                raise Exception("Gemini API 返回空响应")
+            
+            # responseSchema 下通常直接返回纯 JSON；偶尔仍被 markdown 代码块包裹时去掉后再解析
+            try:
+                result = orjson.loads(content)
+            except orjson.JSONDecodeError:
+                result = orjson.loads(strip_code_fences(content))
+            
+            logger.info("✅ Gemini %s分析成功", label)
+            return result
+        
+        except orjson.JSONDecodeError as e:
+            logger.warning("❌ JSON 解析失败: %s，原始响应: %s...", e, content[:500])
             # 返回基本结构
             return {
                 'transcript': content,
-                'summary': '内容分析失败',
+                'summary': ANALYSIS_FAILED_SUMMARY,
                 'topics': [],
                 'insights': [],
                 'duration': 0.0
             }
         except Exception as e:
-            print(f"❌ Gemini 视频分析失败: {e}")
+            logger.error("❌ Gemini %s分析失败: %s", label, e)
             raise
     
-    def _get_mime_type(self, filename: str) -> str:
+    def _generate_url(self) -> httpx.URL:
+        """streamGenerateContent 请求地址（SSE 流式返回；启用 File API 时使用 Gemini Developer API）"""
+        return self._file_api_stream_url if self.use_file_api else self._vertex_stream_url
+    
+    def _check_media_size(self, content: bytes, filename: str):
+        """
+        检查媒体文件能否发送给 Gemini
+        
+        超过内联上限的文件只能通过 File API 发送；未启用 File API 时直接拒绝，
+        避免先编码、发送数十 MB 数据后才被 Gemini 拒绝
+        
+        Raises:
+            ValueError: 文件超过内联上限且未启用 File API
+        """
+        if len(content) > self.max_inline_bytes and not self.use_file_api:
+            raise ValueError(
+                f"文件过大: {filename} ({len(content) / (1024 * 1024):.2f}MB)，"
+                f"Gemini 内联数据最大 {self.max_inline_bytes / (1024 * 1024):.0f}MB"
+            )
+    
+    async def _build_media_part(self, client: httpx.AsyncClient, content: bytes, filename: str) -> Dict[str, Any]:
         """
-        根据文件名获取 MIME 类型
+        构建请求中的媒体部分
         
         Args:
+            client: httpx 客户端
+            content: 媒体文件内容
             filename: 文件名
         
         Returns:
-            MIME 类型字符串
+            超过内联上限（且启用 File API）时为 file_data（按 URI 引用），否则为 base64 inline_data
         """
-        mime_types = {
-            '.mp3': 'audio/mpeg',
-            '.wav': 'audio/wav',
-            '.m4a': 'audio/mp4',
-            '.ogg': 'audio/ogg',
-            '.flac': 'audio/flac',
-            '.mp4': 'video/mp4',
-            '.mov': 'video/quicktime',
-            '.avi': 'video/x-msvideo',
-            '.mkv': 'video/x-matroska',
-            '.webm': 'video/webm'
+        mime_type = self._get_mime_type(filename)
+        
+        # 小文件直接内联，省去上传和等待处理的往返
+        if self.use_file_api and len(content) > self.max_inline_bytes:
+            file_uri = await self._upload_to_gemini(client, content, mime_type, filename)
+            return {"file_data": {"mime_type": mime_type, "file_uri": file_uri}}
+        
+        return {
+            "inline_data": {
+                "mime_type": mime_type,
+                "data": INLINE_DATA_PLACEHOLDER
+            }
         }
+    
+    @async_retry(retry_on=(RetryableGeminiError,), attempts=GEMINI_RETRY_ATTEMPTS)
+    async def _generate_content(
+        self,
+        client: httpx.AsyncClient,
+        payload: Dict[str, Any],
+        media_content: bytes
+    ) -> str:
+        """
+        发送 streamGenerateContent 请求并拼接流式返回的文本
+        
+        响应以 SSE 逐段返回，边接收边解析各段的文本增量，
+        不必等待完整响应体生成后再一次性解析
+        
+        inline_data 的 base64 数据不在内存中整体生成：请求体拆成 JSON 前缀、
+        分块编码的 base64 数据流和 JSON 后缀依次发送，峰值内存约为文件大小本身
+        
+        限流（429）或服务端临时错误（5xx）时按指数退避重试（遵循 Retry-After），
+        只重发本次请求，不会重新上传 File API 文件
+        
+        Args:
+            client: httpx 客户端
+            payload: 请求体（inline_data 的 data 为 INLINE_DATA_PLACEHOLDER）
+            media_content: 媒体文件内容
+        
+        Returns:
+            模型输出的完整文本
+        
+        Raises:
+            RetryableGeminiError: 限流或服务端临时错误（重试次数用完后）
+            httpx.HTTPStatusError: 其他 HTTP 错误
+        """
+        body = orjson.dumps(payload)
+        prefix, placeholder, suffix = body.partition(INLINE_DATA_PLACEHOLDER.encode('utf-8'))
+        
+        if placeholder:
+            encoded_length = 4 * ((len(media_content) + 2) // 3)
+            content = self._iter_inline_body(prefix, media_content, suffix)
+            content_length = len(prefix) + encoded_length + len(suffix)
+        else:
+            # File API 引用，没有内联数据
+            content = body
+            content_length = len(body)
+        
+        text_parts = []
+        async with client.stream(
+            "POST",
+            self._generate_url(),
+            params=self._stream_params,
+            content=content,
+            headers={
+                **self._key_headers,
+                "Content-Type": "application/json",
+                "Content-Length": str(content_length)
+            },
+            timeout=GEMINI_ANALYSIS_TIMEOUT
+        ) as response:
+            if response.status_code in GEMINI_RETRYABLE_STATUS:
+                raise RetryableGeminiError(
+                    f"Gemini API 请求失败 (HTTP {response.status_code})",
+                    parse_retry_after(response.headers.get("Retry-After"))
+                )
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+            
+            # 每个 SSE 事件为 "data: {GenerateContentResponse JSON}"
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                chunk = GeminiStreamChunk.model_validate_json(line[5:])
+                if chunk.candidates:
+                    text_parts.extend(part.text for part in chunk.candidates[0].content.parts)
+        
+        return "".join(text_parts)
+    
+    @staticmethod
+    async def _iter_multipart_body(head: bytes, media_content: bytes, tail: bytes):
+        """逐段生成 multipart/related 请求体，媒体字节原样发送，不与前后分隔符拼接成副本"""
+        yield head
+        yield media_content
+        yield tail
+    
+    @staticmethod
+    async def _iter_inline_body(prefix: bytes, media_content: bytes, suffix: bytes):
+        """
+        逐块生成请求体：JSON 前缀 + base64 数据 + JSON 后缀
+        
+        每块为 3 的整数倍字节，拼接结果与整体编码一致；
+        编码在线程中执行，避免大文件编码占用事件循环、阻塞其他并发请求
+        """
+        yield prefix
+        view = memoryview(media_content)
+        for start in range(0, len(view), BASE64_CHUNK_SIZE):
+            yield await asyncio.to_thread(base64.b64encode, view[start:start + BASE64_CHUNK_SIZE])
+        yield suffix
+    
+    async def _upload_to_gemini(
+        self,
+        client: httpx.AsyncClient,
+        content: bytes,
+        mime_type: str,
+        filename: str
+    ) -> str:
+        """
+        通过 Gemini File API 上传媒体文件（multipart/related 单次请求）
+        
+        元数据（JSON）和原始字节放在同一个 multipart/related 请求体中，
+        无需 base64 编码，也省去可续传上传 start 请求的一次往返；
+        视频上传后需要服务端处理，等待状态变为 ACTIVE 后才能引用
+        
+        Args:
+            client: httpx 客户端
+            content: 媒体文件内容
+            mime_type: MIME 类型
+            filename: 文件名（作为 display_name）
+        
+        Returns:
+            文件 URI
+        
+        Raises:
+            Exception: 如果上传或处理失败
+        """
+        logger.info("📤 上传文件到 Gemini File API: %s（%d bytes）", filename, len(content))
+        
+        # 1. 上传元数据和原始字节
+        boundary = f"echocast-{uuid.uuid4().hex}"
+        head = (
+            f"--{boundary}\r\n"
+            "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+        ).encode('utf-8') + orjson.dumps({"file": {"display_name": filename}}) + (
+            f"\r\n--{boundary}\r\n"
+            f"Content-Type: {mime_type}\r\n\r\n"
+        ).encode('utf-8')
+        tail = f"\r\n--{boundary}--\r\n".encode('utf-8')
+        
+        upload_response = await client.post(
+            f"{self.gemini_file_api_url}/upload/v1beta/files",
+            params={"uploadType": "multipart"},
+            headers={
+                **self._key_headers,
+                "X-Goog-Upload-Protocol": "multipart",
+                "Content-Type": f"multipart/related; boundary={boundary}",
+                "Content-Length": str(len(head) + len(content) + len(tail))
+            },
+            content=self._iter_multipart_body(head, content, tail),
+            timeout=GEMINI_ANALYSIS_TIMEOUT
+        )
+        upload_response.raise_for_status()
+        file_info = orjson.loads(upload_response.content)["file"]
         
-        suffix = Path(filename).suffix.lower()
-        return mime_types.get(suffix, 'application/octet-stream')
+        # 2. 等待服务端处理完成（音频通常立即可用，视频需要处理）
+        for _ in range(FILE_API_MAX_POLLS):
+            state = file_info.get("state", "ACTIVE")
+            if state == "ACTIVE":
+                logger.info("✅ 文件上传完成: %s", file_info['uri'])
+                return file_info["uri"]
+            if state == "FAILED":
+                raise Exception(f"Gemini File API 文件处理失败: {file_info.get('error')}")
+            
+            await asyncio.sleep(FILE_API_POLL_INTERVAL)
+            status_response = await client.get(
+                f"{self.gemini_file_api_url}/v1beta/{file_info['name']}",
+                headers=self._key_headers
+            )
+            status_response.raise_for_status()
+            file_info = orjson.loads(status_response.content)
+        
+        raise Exception("Gemini File API 文件处理超时")
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _get_mime_type(filename: str) -> str:
+        """
+        根据文件名获取 MIME 类型（纯函数，按文件名缓存结果）
+        
+        Args:
+            filename: 文件名
+        
+        Returns:
+            MIME 类型字符串
+        """
+        file_info = _EXT_TO_TYPE.get(_suffix_lower(filename))
+        return file_info[1] if file_info else 'application/octet-stream'
     
     async def extract_from_file(
         self, 
@@ -1,120 +1,329 @@
 """
-JSON 数据服务
-提供线程安全的 JSON 文件读写操作
+数据服务
+使用 SQLite（WAL 模式）存储播客和任务记录，提供线程安全的读写操作
 """
 import json
+import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-from filelock import FileLock
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 from app.config import settings
+from app.utils.cache import TTLCache
+
+
+# get_podcast 缓存：详情页轮询和播放时会反复查询同一个播客
+PODCAST_CACHE_SIZE = 2048
+PODCAST_CACHE_TTL = 10  # 秒
+
+# 数据库结构版本（PRAGMA user_version）
+SCHEMA_VERSION = 1
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS podcasts (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL DEFAULT '',
+    status TEXT,
+    created_at TEXT NOT NULL DEFAULT '',
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_podcasts_created_at ON podcasts (created_at DESC);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    podcast_id TEXT,
+    status TEXT,
+    created_at TEXT NOT NULL DEFAULT '',
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_podcast_id ON jobs (podcast_id);
+"""
 
 
 class DataService:
-    """JSON 数据服务类"""
+    """数据服务类"""
     
     def __init__(self):
+        self.db_file = settings.data_dir / "echocast.db"
+        # 旧版 JSON 数据文件，首次初始化数据库时导入
         self.podcasts_file = settings.data_dir / "podcasts.json"
         self.jobs_file = settings.data_dir / "jobs.json"
-        self.podcasts_lock = FileLock(str(self.podcasts_file) + ".lock")
-        self.jobs_lock = FileLock(str(self.jobs_file) + ".lock")
         
-        # 确保文件存在
-        self._ensure_file_exists(self.podcasts_file, {"podcasts": []})
-        self._ensure_file_exists(self.jobs_file, {"jobs": []})
-    
-    def _ensure_file_exists(self, file_path: Path, default_data: dict):
-        """确保 JSON 文件存在"""
-        if not file_path.exists():
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(default_data, f, ensure_ascii=False, indent=2)
-    
-    def _read_json(self, file_path: Path, lock: FileLock) -> dict:
-        """读取 JSON 文件（带锁）"""
-        with lock:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (FileNotFoundError, json.JSONDecodeError):
-                # 文件不存在或损坏，返回默认结构
-                default_data = {"podcasts": []} if "podcasts" in str(file_path) else {"jobs": []}
-                self._ensure_file_exists(file_path, default_data)
-                return default_data
-    
-    def _write_json(self, file_path: Path, lock: FileLock, data: dict):
-        """写入 JSON 文件（带锁）"""
-        with lock:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+        # 每个线程使用独立的连接（后台任务运行在独立线程中）
+        self._local = threading.local()
+        
+        # 播客详情缓存（更新/删除时失效）
+        self._podcast_cache = TTLCache(maxsize=PODCAST_CACHE_SIZE, ttl=PODCAST_CACHE_TTL)
+        # 写入代数：每次更新/删除时递增全局序号，并记录每个播客最近一次失效时的序号；
+        # 读取方在写入缓存前检查，防止写入前读到的旧数据在失效之后被写回缓存。
+        # 删除播客时移除其记录，记录数不超过现存的播客数
+        self._podcast_write_seq = 0
+        self._podcast_generations: Dict[str, int] = {}
+        self._podcast_cache_lock = threading.Lock()
+        
+        self._init_db()
+    
+    def _get_connection(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_file.parent.mkdir(parents=True, exist_ok=True)
+            # isolation_level=None：由 _transaction 显式控制事务
+            conn = sqlite3.connect(str(self.db_file), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    @contextmanager
+    def _transaction(self):
+        """写事务（BEGIN IMMEDIATE，避免读-改-写之间被其他写入插入）"""
+        conn = self._get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+    
+    def _init_db(self):
+        """创建表结构，并在首次初始化时导入旧版 JSON 数据"""
+        with self._transaction() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= SCHEMA_VERSION:
+                return
+            
+            for statement in SCHEMA_SQL.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            
+            podcasts = self._load_legacy_json(self.podcasts_file, "podcasts")
+            jobs = self._load_legacy_json(self.jobs_file, "jobs")
+            for podcast in podcasts:
+                self._insert_podcast(conn, podcast)
+            for job in jobs:
+                self._insert_job(conn, job)
+            
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            
+            if podcasts or jobs:
+                print(f"✅ 已从 JSON 导入 {len(podcasts)} 个播客、{len(jobs)} 个任务")
+    
+    def _load_legacy_json(self, file_path: Path, key: str) -> List[Dict[str, Any]]:
+        """读取旧版 JSON 数据文件（不存在或损坏时返回空列表）"""
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get(key, [])
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+    
+    def _add_timestamps(self, record: Dict[str, Any]):
+        """为新记录添加创建/更新时间戳"""
+        now = datetime.now().isoformat()
+        if "created_at" not in record:
+            record["created_at"] = now
+        record["updated_at"] = now
+    
+    def _insert_podcast(self, conn: sqlite3.Connection, podcast_data: Dict[str, Any]):
+        """插入播客记录（常用查询字段单独成列，完整记录存为 JSON）"""
+        conn.execute(
+            "INSERT INTO podcasts (id, title, status, created_at, updated_at, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                podcast_data["id"],
+                podcast_data.get("title") or "",
+                podcast_data.get("status"),
+                podcast_data.get("created_at") or "",
+                podcast_data.get("updated_at"),
+                json.dumps(podcast_data, ensure_ascii=False)
+            )
+        )
+    
+    def _insert_job(self, conn: sqlite3.Connection, job_data: Dict[str, Any]):
+        """插入任务记录"""
+        conn.execute(
+            "INSERT INTO jobs (id, podcast_id, status, created_at, updated_at, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                job_data["id"],
+                job_data.get("podcast_id"),
+                job_data.get("status"),
+                job_data.get("created_at") or "",
+                job_data.get("updated_at"),
+                json.dumps(job_data, ensure_ascii=False)
+            )
+        )
+    
+    def _update_record(self, table: str, record_id: str, updates: Dict[str, Any]) -> bool:
+        """读取-合并-写回单条记录，返回是否找到该记录"""
+        with self._transaction() as conn:
+            row = conn.execute(f"SELECT data FROM {table} WHERE id = ?", (record_id,)).fetchone()
+            if row is None:
+                return False
+            
+            record = json.loads(row["data"])
+            record.update(updates)
+            record["updated_at"] = datetime.now().isoformat()
+            
+            # 用 UPDATE 而不是 REPLACE，保留 rowid（插入顺序）
+            conn.execute(
+                f"UPDATE {table} SET status = ?, updated_at = ?, data = ? WHERE id = ?",
+                (
+                    record.get("status"),
+                    record["updated_at"],
+                    json.dumps(record, ensure_ascii=False),
+                    record_id
+                )
+            )
+            if table == "podcasts":
+                conn.execute(
+                    "UPDATE podcasts SET title = ? WHERE id = ?",
+                    (record.get("title") or "", record_id)
+                )
+            return True
     
     # ========== Podcast 相关操作 ==========
     
     def read_podcasts(self) -> List[Dict[str, Any]]:
         """读取所有播客"""
-        data = self._read_json(self.podcasts_file, self.podcasts_lock)
-        return data.get("podcasts", [])
+        rows = self._get_connection().execute("SELECT data FROM podcasts ORDER BY rowid").fetchall()
+        return [json.loads(row["data"]) for row in rows]
+    
+    def list_podcasts(
+        self,
+        page: int = 1,
+        limit: int = 20,
+        search: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        分页查询播客（按创建时间降序）
+        
+        Args:
+            page: 页码（从1开始）
+            limit: 每页数量
+            search: 标题搜索关键词（不区分大小写）
+        
+        Returns:
+            (当前页播客列表, 符合条件的总数)
+        """
+        where = ""
+        params: list = []
+        if search:
+            # 转义 LIKE 通配符，按字面量做子串匹配
+            escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            where = "WHERE title LIKE ? ESCAPE '\\'"
+            params.append(f"%{escaped}%")
+        
+        conn = self._get_connection()
+        rows = conn.execute(
+            f"SELECT data, COUNT(*) OVER () AS total FROM podcasts {where} "
+            "ORDER BY created_at DESC, rowid LIMIT ? OFFSET ?",
+            (*params, limit, (page - 1) * limit)
+        ).fetchall()
+        
+        if rows:
+            total = rows[0]["total"]
+        else:
+            # 超出最后一页时没有行可携带总数，单独统计
+            total = conn.execute(f"SELECT COUNT(*) FROM podcasts {where}", params).fetchone()[0]
+        
+        return [json.loads(row["data"]) for row in rows], total
     
     def get_podcast(self, podcast_id: str) -> Optional[Dict[str, Any]]:
         """获取单个播客"""
-        podcasts = self.read_podcasts()
-        for podcast in podcasts:
-            if podcast.get("id") == podcast_id:
-                return podcast
-        return None
+        cached = self._podcast_cache.get(podcast_id)
+        if cached is None:
+            seq = self._podcast_write_seq
+            row = self._get_connection().execute(
+                "SELECT data FROM podcasts WHERE id = ?", (podcast_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            cached = json.loads(row["data"])
+            # 读取期间该播客有写入提交时，读到的可能是旧数据，不写入缓存；
+            # 没有失效记录（从未更新或已被删除）时无法区分，只在期间没有任何写入时才写入缓存
+            with self._podcast_cache_lock:
+                if (self._podcast_write_seq == seq
+                        or self._podcast_generations.get(podcast_id, seq + 1) <= seq):
+                    self._podcast_cache.set(podcast_id, cached)
+        
+        # 返回副本，调用方修改返回值（如设置 audio_url）不会污染缓存
+        return dict(cached)
     
     def save_podcast(self, podcast_data: Dict[str, Any]) -> bool:
         """保存新播客"""
         try:
-            data = self._read_json(self.podcasts_file, self.podcasts_lock)
-            podcasts = data.get("podcasts", [])
-            
-            # 添加时间戳
-            if "created_at" not in podcast_data:
-                podcast_data["created_at"] = datetime.now().isoformat()
-            podcast_data["updated_at"] = datetime.now().isoformat()
-            
-            podcasts.append(podcast_data)
-            data["podcasts"] = podcasts
-            
-            self._write_json(self.podcasts_file, self.podcasts_lock, data)
+            self._add_timestamps(podcast_data)
+            with self._transaction() as conn:
+                self._insert_podcast(conn, podcast_data)
             return True
         except Exception as e:
             print(f"Error saving podcast: {e}")
             return False
     
+    def save_podcast_with_job(self, podcast_data: Dict[str, Any], job_data: Dict[str, Any]) -> bool:
+        """
+        同时保存新播客及其任务（同一事务，两者都写入或都不写入）
+        
+        Args:
+            podcast_data: 播客记录
+            job_data: 任务记录
+        
+        Returns:
+            是否保存成功
+        """
+        try:
+            self._add_timestamps(podcast_data)
+            self._add_timestamps(job_data)
+            with self._transaction() as conn:
+                self._insert_podcast(conn, podcast_data)
+                self._insert_job(conn, job_data)
+            return True
+        except Exception as e:
+            print(f"Error saving podcast with job: {e}")
+            return False
+    
     def update_podcast(self, podcast_id: str, updates: Dict[str, Any]) -> bool:
         """更新播客信息"""
         try:
-            data = self._read_json(self.podcasts_file, self.podcasts_lock)
-            podcasts = data.get("podcasts", [])
-            
-            for i, podcast in enumerate(podcasts):
-                if podcast.get("id") == podcast_id:
-                    # 更新字段
-                    podcasts[i].update(updates)
-                    podcasts[i]["updated_at"] = datetime.now().isoformat()
-                    
-                    data["podcasts"] = podcasts
-                    self._write_json(self.podcasts_file, self.podcasts_lock, data)
-                    return True
-            
-            return False  # 未找到
+            return self._update_record("podcasts", podcast_id, updates)
         except Exception as e:
             print(f"Error updating podcast: {e}")
             return False
+        finally:
+            self._invalidate_podcast_cache(podcast_id)
+    
+    def _invalidate_podcast_cache(self, podcast_id: str, deleted: bool = False):
+        """
+        写入提交后使播客缓存失效
+        
+        递增写入代数与删除缓存在同一把锁内完成：提交前开始的读取要么在失效前写入缓存（随即被删除），
+        要么在失效后发现代数已变而放弃写入，旧数据不会留在缓存中
+        
+        Args:
+            podcast_id: 播客ID
+            deleted: 播客已被删除时移除其失效记录（之后的并发读取因没有记录而不写入缓存）
+        """
+        with self._podcast_cache_lock:
+            self._podcast_write_seq += 1
+            if deleted:
+                self._podcast_generations.pop(podcast_id, None)
+            else:
+                self._podcast_generations[podcast_id] = self._podcast_write_seq
+            self._podcast_cache.pop(podcast_id)
     
     def delete_podcast(self, podcast_id: str) -> bool:
         """删除播客"""
         try:
-            data = self._read_json(self.podcasts_file, self.podcasts_lock)
-            podcasts = data.get("podcasts", [])
-            
-            # 过滤掉要删除的播客
-            podcasts = [p for p in podcasts if p.get("id") != podcast_id]
-            
-            data["podcasts"] = podcasts
-            self._write_json(self.podcasts_file, self.podcasts_lock, data)
+            with self._transaction() as conn:
+                conn.execute("DELETE FROM podcasts WHERE id = ?", (podcast_id,))
+            self._invalidate_podcast_cache(podcast_id, deleted=True)
             return True
         except Exception as e:
             print(f"Error deleting podcast: {e}")
@@ -124,32 +333,22 @@ class DataService:
     
     def read_jobs(self) -> List[Dict[str, Any]]:
         """读取所有任务"""
-        data = self._read_json(self.jobs_file, self.jobs_lock)
-        return data.get("jobs", [])
+        rows = self._get_connection().execute("SELECT data FROM jobs ORDER BY rowid").fetchall()
+        return [json.loads(row["data"]) for row in rows]
     
     def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
         """获取单个任务"""
-        jobs = self.read_jobs()
-        for job in jobs:
-            if job.get("id") == job_id:
-                return job
-        return None
+        row = self._get_connection().execute(
+            "SELECT data FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return json.loads(row["data"]) if row else None
     
     def save_job(self, job_data: Dict[str, Any]) -> bool:
         """保存新任务"""
         try:
-            data = self._read_json(self.jobs_file, self.jobs_lock)
-            jobs = data.get("jobs", [])
-            
-            # 添加时间戳
-            if "created_at" not in job_data:
-                job_data["created_at"] = datetime.now().isoformat()
-            job_data["updated_at"] = datetime.now().isoformat()
-            
-            jobs.append(job_data)
-            data["jobs"] = jobs
-            
-            self._write_json(self.jobs_file, self.jobs_lock, data)
+            self._add_timestamps(job_data)
+            with self._transaction() as conn:
+                self._insert_job(conn, job_data)
             return True
         except Exception as e:
             print(f"Error saving job: {e}")
@@ -158,20 +357,7 @@ class DataService:
     def update_job(self, job_id: str, updates: Dict[str, Any]) -> bool:
         """更新任务状态"""
         try:
-            data = self._read_json(self.jobs_file, self.jobs_lock)
-            jobs = data.get("jobs", [])
-            
-            for i, job in enumerate(jobs):
-                if job.get("id") == job_id:
-                    # 更新字段
-                    jobs[i].update(updates)
-                    jobs[i]["updated_at"] = datetime.now().isoformat()
-                    
-                    data["jobs"] = jobs
-                    self._write_json(self.jobs_file, self.jobs_lock, data)
-                    return True
-            
-            return False  # 未找到
+            return self._update_record("jobs", job_id, updates)
         except Exception as e:
             print(f"Error updating job: {e}")
             return False
@@ -179,14 +365,8 @@ class DataService:
     def delete_job(self, job_id: str) -> bool:
         """删除任务"""
         try:
-            data = self._read_json(self.jobs_file, self.jobs_lock)
-            jobs = data.get("jobs", [])
-            
-            # 过滤掉要删除的任务
-            jobs = [j for j in jobs if j.get("id") != job_id]
-            
-            data["jobs"] = jobs
-            self._write_json(self.jobs_file, self.jobs_lock, data)
+            with self._transaction() as conn:
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
             return True
         except Exception as e:
             print(f"Error deleting job: {e}")
@@ -195,4 +375,3 @@ class DataService:
 
 # 创建全局实例
 data_service = DataService()
-
@@ -0,0 +1,207 @@
+"""
+播客稿件提示词模板
+模板在模块加载时定义一次，调用时只用 str.format 填入主题、风格和长度等字段
+
+可用字段：topic, style, duration_minutes, min_length, max_length,
+opening_min, opening_max（开场/结尾各约10%）, body_min, body_max（主体约80%）
+
+标题模板可用字段：kind（内容类型描述）, context（内容摘录）
+"""
+
+
+# 中文稿件模板（长度单位：字）
+ZH_SCRIPT_TEMPLATE = """你是一位专业的播客编剧。请为以下主题生成一份完整、专业的播客稿件。
+
+主题：{topic}
+风格：{style}
+
+⚠️ **严格时长要求**：
+- 目标时长：**必须严格控制在 {duration_minutes} 分钟**
+- 字数要求：**{min_length}-{max_length} 字**（对话式播客约140-170字/分钟）
+- 这是硬性要求，必须遵守！
+
+**写作步骤：**
+先在心里规划大纲（开场白、3-5个核心要点、结尾总结），内容要有趣、适合{style}的表达方式、适合{duration_minutes}分钟的播客长度。
+大纲只用于构思，不要输出大纲，直接输出最终稿件。
+
+请按以下结构生成完整的播客稿件：
+
+**稿件结构：**
+1. 开场引子（占10%时长，约{opening_min}-{opening_max}字）
+   - 以吸引人的问题或陈述开场
+   - 自然地介绍主持人
+   - 预告将要讨论的内容
+
+2. 主体内容（占80%时长，约{body_min}-{body_max}字）
+   - 按规划的要点逐一展开
+   - 使用对话式来回交流
+   - 包含具体例子和深入见解
+   - 保持自然节奏，流畅过渡
+
+3. 结尾总结（占10%时长，约{opening_min}-{opening_max}字）
+   - 总结核心要点
+   - 以令人印象深刻的语句结束
+   - 感谢听众
+
+**核心要求：**
+
+{style}风格指南：
+- 使用自然、口语化的语言（避免书面或正式用语）
+- 包含反问句以吸引听众
+- 使用具体案例和故事
+- 保持适当的节奏感
+- 展现对话题的真诚热情
+
+主持人配置：
+- 固定使用这两个名字："Alex"（主持人，男声）和 "Emma"（搭档主持，女声）
+- Alex先开场："大家好，我是Alex..."
+- Emma紧接着介绍："我是Emma..."
+- 介绍后在对话中自然使用名字
+- 绝不使用"主持人A"、"主持人B"、"嘉宾1"等泛称
+
+对话质量标准：
+- 每次发言控制在1-3句话（避免长篇独白）
+- 包含自然反应和回应（"太有意思了"、"确实"、"说得好"）
+- 基于前面的发言继续讨论，形成流畅对话
+- 用问题来过渡话题
+- 两位主持人发言时间要均衡
+
+**绝对禁止：**
+❌ 任何括号标注：(**音乐**) (**轻笑**) (**停顿**) （音乐起） [音效] [任何内容]
+❌ 任何Markdown格式：**粗体** *斜体* _下划线_
+❌ 任何占位符：[你的名字] [主持人名] [播客名称] [节目名] [话题] [嘉宾姓名]
+❌ 舞台指示、音效或场景描述
+❌ 泛称式的说话者标签或编号
+
+**正确示例：**
+
+Alex：大家好，我是Alex，今天我们要聊一个特别有意思的话题。
+Emma：我是Emma。Alex，这个话题确实太及时了，我都等不及要和你讨论了。
+Alex：那我们就直接进入正题吧。最有意思的是，这其实和我们每个人都息息相关。
+Emma：完全同意。而且我觉得最让人意外的是它的影响范围。
+Alex：对，我举个具体的例子...
+
+**错误示例 - 绝对不要这样：**
+
+Alex：欢迎来到[播客名称]。今天我们要讨论[话题]。
+Emma：没错，[主持人名]。让我们深入了解[主题]。
+(**音乐渐弱**)
+Alex：**这很重要**。我们的[嘉宾]会解释...
+
+输出格式：
+- 直接输出对话内容
+- 只使用"Alex："和"Emma："作为标签
+- 不要标题、不要元数据、不要舞台指示
+- 只输出纯对话稿件
+
+⚠️ **再次强调时长控制**：
+生成的稿件必须严格控制在 **{min_length}-{max_length} 字**，确保朗读时长正好是 **{duration_minutes} 分钟**。
+如果内容过多，请精简；如果内容过少，请适当扩展。时长精确度是评价稿件质量的关键指标！
+
+现在请生成完整的播客稿件。"""
+
+
+# 英文稿件模板（长度单位：单词）
+EN_SCRIPT_TEMPLATE = """You are a professional podcast scriptwriter. Generate a complete, professional podcast script for the following topic.
+
+Topic: {topic}
+Style: {style}
+
+⚠️ **STRICT DURATION REQUIREMENT**:
+- Target Duration: **MUST be strictly {duration_minutes} minutes**
+- Word Count: **{min_length}-{max_length} words** (conversational podcast: ~120-150 words/minute)
+- This is a HARD requirement - you MUST comply!
+
+**Writing Process:**
+First plan an outline in your head (opening, 3-5 key points, closing) that is engaging, matches the {style} expression style, and fits a {duration_minutes}-minute podcast.
+The outline is for planning only - do NOT output it. Output only the final script.
+
+Generate a complete podcast script with the following structure:
+
+**Script Structure:**
+1. Opening hook (10% of duration, ~{opening_min}-{opening_max} words)
+   - Start with an engaging question or statement
+   - Introduce the hosts naturally
+   - Preview what will be covered
+
+2. Main content (80% of duration, ~{body_min}-{body_max} words)
+   - Develop each planned point in turn
+   - Use conversational back-and-forth dialogue
+   - Include specific examples and insights
+   - Maintain natural pacing with smooth transitions
+
+3. Closing (10% of duration, ~{opening_min}-{opening_max} words)
+   - Summarize key takeaways
+   - End with a memorable statement
+   - Thank the audience
+
+**CRITICAL REQUIREMENTS:**
+
+Style Guidelines for {style}:
+- Use natural, conversational language (avoid formal or written style)
+- Include rhetorical questions to engage listeners
+- Use specific examples and anecdotes
+- Maintain appropriate pacing and rhythm
+- Show genuine enthusiasm for the topic
+
+Host Configuration:
+- ALWAYS use these EXACT names: "Alex" (primary host, male voice) and "Emma" (co-host, female voice)
+- Alex introduces first: "Hi everyone, I'm Alex..."
+- Emma introduces immediately after: "And I'm Emma..."
+- After introductions, use names naturally in conversation
+- Never use generic labels like "Host A", "Host B", or "Speaker 1"
+
+Dialogue Quality Standards:
+- Each speaker turn should be 1-3 sentences (avoid long monologues)
+- Include natural reactions and acknowledgments ("That's fascinating", "Exactly", "Great point")
+- Build on previous statements to create flow
+- Use questions to transition between topics
+- Maintain balanced speaking time between hosts
+
+**ABSOLUTELY FORBIDDEN:**
+❌ ANY bracketed annotations: (**music**) (**laughs**) (**pause**) (music starts) [sound effect] [anything]
+❌ ANY Markdown formatting: **bold** *italic* _underline_
+❌ ANY placeholders: [your name] [host name] [Podcast Name] [show name] [topic] [guest name]
+❌ Stage directions, sound effects, or scene descriptions
+❌ Generic speaker labels or numbered speakers
+
+**CORRECT Example:**
+
+Alex: Hi everyone, I'm Alex, and today we're diving into something I've been curious about for ages.
+Emma: And I'm Emma. This is such a timely topic, Alex. I can't wait to unpack it with you.
+Alex: So let's jump right in. What makes this so interesting is how it affects all of us daily.
+Emma: Absolutely. And I think what surprises most people is the scale of it.
+Alex: Right. Let me give you a concrete example...
+
+**WRONG Example - Never Do This:**
+
+Alex: Welcome to [Podcast Name]. Today we'll discuss [topic].
+Emma: That's right, [Host Name]. Let's dive into [subject].
+(**music fades**)
+Alex: **This is important**. Our [guest] will explain...
+
+Output Format:
+- Start directly with the dialogue
+- Use "Alex:" and "Emma:" as the only labels
+- No title, no metadata, no stage directions
+- Pure conversational script only
+
+⚠️ **FINAL REMINDER - DURATION CONTROL**:
+The script MUST be strictly **{min_length}-{max_length} words** to ensure it takes exactly **{duration_minutes} minutes** to read.
+If content is too long, condense it; if too short, expand appropriately. Duration accuracy is KEY to script quality!
+
+Now generate the complete podcast script."""
+
+
+# 播客标题模板
+TITLE_TEMPLATE = """Based on this {kind}, create a concise, engaging title (max 60 characters):
+
+{context}
+
+Title should be:
+- Clear and descriptive
+- Professional and engaging
+- Maximum 60 characters
+- No quotes or special formatting
+
+Title:"""
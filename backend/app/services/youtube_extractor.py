@@ -2,15 +2,285 @@
 YouTube 内容提取服务
 使用 Gemini API 从 YouTube 视频提取内容（绕过 bot 检测）
 """
+import asyncio
+import copy
+import functools
+import hashlib
+import logging
 import tempfile
+import threading
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Optional, Tuple
 import re
-import json
+import orjson
+import yt_dlp
+from pydantic import BaseModel, ValidationError
 from app.config import settings
+from app.services.content_extractor import strip_code_fences
+from app.utils.http_client import get_async_client
+from app.utils.cache import TTLCache
 
 
+logger = logging.getLogger(__name__)
+
+# 视频元数据缓存（按视频 ID），重复提交同一视频时不再调用 Gemini
+METADATA_CACHE_SIZE = 1024
+METADATA_CACHE_TTL = 24 * 3600  # 秒（标题、作者等元数据基本不会变化）
+
+# yt-dlp 视频信息缓存（按视频 ID），字幕和音频下载共用一次 extract_info；
+# 信息中的媒体/字幕 URL 数小时后失效，因此 TTL 远短于元数据缓存
+INFO_CACHE_SIZE = 64
+INFO_CACHE_TTL = 3600  # 秒
+
+# 字幕格式偏好（YouTube 通常只提供 vtt/srv/json3 等格式，没有 srt）
+SUBTITLE_FORMATS = ('srt', 'vtt')
+
+# 音频提取产物的扩展名偏好（转码成功时为 mp3，否则保留原始格式）
+AUDIO_EXTENSIONS = ('.mp3', '.m4a', '.webm')
+
+# yt-dlp 配置（模块加载时构建一次，只读）：绕过 YouTube bot 检测的公共选项，音频提取在此基础上增加格式和转码
+YTDLP_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+YTDLP_BASE_OPTS = MappingProxyType({
+    'quiet': True,
+    'no_warnings': True,
+    # 强力绕过 YouTube 的 bot 检测
+    'nocheckcertificate': True,
+    'user_agent': YTDLP_USER_AGENT,
+    'extractor_args': {
+        'youtube': {
+            'player_client': ['android', 'ios', 'web'],
+            'player_skip': ['webpage', 'configs'],
+            'skip': ['hls', 'dash'],
+        }
+    },
+    # 额外的绕过选项
+    'age_limit': None,
+    'no_check_certificate': True,
+    'youtube_include_dash_manifest': False,
+    'youtube_include_hls_manifest': False,
+})
+YTDLP_AUDIO_OPTS = MappingProxyType({
+    **YTDLP_BASE_OPTS,
+    'format': 'bestaudio/best',
+    'postprocessors': [{
+        'key': 'FFmpegExtractAudio',
+        'preferredcodec': 'mp3',
+        'preferredquality': '192',
+    }],
+})
+
+# 视频内容分析缓存（按视频 ID + 语言 + 增强提示）
+ANALYSIS_CACHE_SIZE = 256
+ANALYSIS_CACHE_TTL = 3600  # 秒
+
+# 批量提取时单次 Gemini 调用最多分析的视频数（受输出 token 上限约束）
+BATCH_MAX_VIDEOS = 4
+
+# 元数据 + 内容合并提取的要求及 JSON 结构（单个视频与批量提取共用）
+COMBINED_ANALYSIS_ITEMS = """1. **Metadata**: Video title, brief description (1-2 sentences), estimated duration in seconds (rough estimate from content), and channel/uploader name
+2. **Transcript**: A detailed transcript or summary of the key content discussed in the video (focus on main points, insights, and information - at least 500 words)
+3. **Summary**: A concise summary of the video (100-200 words)
+4. **Topics**: List 3-5 main topics or themes discussed
+5. **Insights**: List 3-5 key insights, takeaways, or important points"""
+
+COMBINED_JSON_STRUCTURE = """{
+  "metadata": {
+    "title": "video title here",
+    "description": "brief description",
+    "duration": 300,
+    "uploader": "channel name"
+  },
+  "transcript": "detailed content transcript or summary here...",
+  "summary": "concise summary here...",
+  "topics": ["topic1", "topic2", "topic3"],
+  "insights": ["insight1", "insight2", "insight3"]
+}"""
+
+# Gemini 提示词模板（模块加载时定义一次，按请求用 format_map 填充；{focus} 为可选的增强提示段落）
+METADATA_PROMPT_TEMPLATE = """Analyze this YouTube video and extract metadata in JSON format:
+
+Video URL: {url}
+
+Please provide:
+1. Video title
+2. Brief description (1-2 sentences)
+3. Estimated duration in seconds (rough estimate from content)
+4. Channel/uploader name
+
+Return ONLY valid JSON with this exact structure:
+{{
+  "title": "video title here",
+  "description": "brief description",
+  "duration": 300,
+  "uploader": "channel name"
+}}
+
+CRITICAL: Return ONLY the JSON, no markdown code blocks, no extra text."""
+
+ANALYSIS_PROMPT_TEMPLATE = """Analyze this YouTube video and provide comprehensive content extraction in JSON format.
+
+Please provide:
+1. **Transcript**: A detailed transcript or summary of the key content discussed in the video (focus on main points, insights, and information - at least 500 words)
+2. **Summary**: A concise summary of the video (100-200 words)
+3. **Topics**: List 3-5 main topics or themes discussed
+4. **Insights**: List 3-5 key insights, takeaways, or important points
+
+{focus}
+Return ONLY valid JSON with this exact structure:
+{{
+  "transcript": "detailed content transcript or summary here...",
+  "summary": "concise summary here...",
+  "topics": ["topic1", "topic2", "topic3"],
+  "insights": ["insight1", "insight2", "insight3"]
+}}
+
+CRITICAL: Return ONLY the JSON, no markdown code blocks, no extra text."""
+
+COMBINED_PROMPT_TEMPLATE = """Analyze this YouTube video and provide its metadata and comprehensive content extraction in JSON format.
+
+Video URL: {url}
+
+Please provide:
+{items}
+
+{focus}
+Return ONLY valid JSON with this exact structure:
+{structure}
+
+CRITICAL: Return ONLY the JSON, no markdown code blocks, no extra text."""
+
+BATCH_PROMPT_TEMPLATE = """Analyze each of the following {count} YouTube videos (attached in the same order) and provide their metadata and comprehensive content extraction in JSON format.
+
+Videos:
+{video_list}
+
+For each video, please provide:
+{items}
+
+{focus}
+Return ONLY a valid JSON array with exactly {count} objects, in the same order as the videos, each with this exact structure:
+{structure}
+
+CRITICAL: Return ONLY the JSON array, no markdown code blocks, no extra text."""
+
+# YouTube URL 正则（模块加载时编译一次）
+# 支持 youtube.com/watch?v=、youtube.com/embed/、youtube.com/v/、youtu.be/ 四种格式，一次匹配
+_YOUTUBE_URL_RE = re.compile(
+    r'(?:https?://)?(?:www\.)?(?:youtube\.com/(?:watch\?v=|embed/|v/)|youtu\.be/)[\w-]+'
+)
+
+# 校验 URL 的同时捕获紧随其后的 11 位视频 ID（validate_and_extract 一次匹配完成两步）
+_YOUTUBE_VIDEO_RE = re.compile(
+    r'(?:https?://)?(?:www\.)?(?:youtube\.com/(?:watch\?v=|embed/|v/)|youtu\.be/)(?P<id>[0-9A-Za-z_-]{11})'
+)
+
+# 批量校验：多个 URL 以换行拼接后一次 finditer 扫描，每行行首匹配一个 URL
+_YOUTUBE_VIDEO_LINE_RE = re.compile(r'^' + _YOUTUBE_VIDEO_RE.pattern, re.MULTILINE)
+
+
+# SRT 中的非文本行：序号行、时间戳行（含 -->）及空行，整行（含换行符）匹配
+_SRT_NOISE_RE = re.compile(r'^[^\S\n]*(?:\d+|[^\n]*-->[^\n]*)?[^\S\n]*(?:\n|\Z)', re.MULTILINE)
+
+# WebVTT 文件头（WEBVTT 行及其后直到第一个空行的 Kind/Language 等行）和行内标签（<c>、<00:00:01.000> 等）
+_VTT_HEADER_RE = re.compile(r'\AWEBVTT[^\n]*\n(?:[^\n]+\n)*')
+_VTT_TAG_RE = re.compile(r'<[^>\n]*>')
+
+# yt-dlp 阻塞调用（解析视频页面、下载）专用线程池：限制同时访问 YouTube 的数量，
+# 也不占用 asyncio.to_thread 的默认线程池；线程数固定，线程内复用的 YoutubeDL 实例数随之有界
+_ytdlp_executor = ThreadPoolExecutor(
+    max_workers=settings.youtube_ytdlp_workers,
+    thread_name_prefix="ytdlp"
+)
+
+
+class VideoMetadataJSON(BaseModel):
+    """Gemini 返回的视频元数据（校验结构，缺少必需字段或类型不符时视为解析失败）"""
+    title: str
+    description: str = ""
+    duration: float
+    uploader: str
+
+
+def _validate_metadata(metadata_json: Any) -> Optional[Dict[str, Any]]:
+    """
+    校验 Gemini 返回的元数据结构
+    
+    Args:
+        metadata_json: 解析出的 JSON（可能为 None 或任意类型）
+    
+    Returns:
+        校验通过的元数据字典；结构不符时返回 None
+    """
+    if metadata_json is None:
+        return None
+    
+    try:
+        return VideoMetadataJSON.model_validate(metadata_json).model_dump()
+    except ValidationError as e:
+        logger.warning("❌ 元数据结构无效: %d 个字段错误，原始数据: %.200s...", e.error_count(), metadata_json)
+        return None
+
+
+def _focus_section(enhancement_prompt: Optional[str]) -> str:
+    """
+    生成提示词中的增强提示段落（对应模板中的 {focus}）
+    
+    Args:
+        enhancement_prompt: 可选的增强提示
+    
+    Returns:
+        增强提示段落；未提供时为空字符串
+    """
+    return f"\nSpecial focus: {enhancement_prompt}\n" if enhancement_prompt else ""
+
+
+def _parse_json_response(response_text: str) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    解析 Gemini 返回的 JSON（增强容错性）
+    
+    截取首个 { 到最后一个 } 之间的内容（代码块标记在花括号之外，一并去除）；
+    响应本身就是纯 JSON 时不做切片，避免为长转录文本再复制一份字符串
+    
+    Args:
+        response_text: Gemini 原始响应文本
+    
+    Returns:
+        (解析结果, 清理后的文本)；解析失败时解析结果为 None
+    """
+    start = response_text.find('{')
+    end = response_text.rfind('}') + 1
+    if start != -1 and end > start:
+        # 尝试提取 JSON 对象（如果有额外文本）
+        if start > 0 or end < len(response_text):
+            response_text = response_text[start:end]
+    else:
+        # 没有 JSON 对象：移除 markdown 代码块标记，保留文本用于降级结果
+        response_text = strip_code_fences(response_text)
+    
+    try:
+        return orjson.loads(response_text), response_text
+    except orjson.JSONDecodeError as e:
+        logger.warning("❌ JSON 解析失败: %s，原始响应: %s...", e, response_text[:200])
+        return None, response_text
+
+
+
+async def _run_ytdlp(func, *args):
+    """
+    在 yt-dlp 专用线程池中执行阻塞调用，超出并发上限的调用排队等待
+    
+    Args:
+        func: 同步函数
+        *args: 函数参数
+    
+    Returns:
+        函数返回值
+    """
+    return await asyncio.get_running_loop().run_in_executor(_ytdlp_executor, func, *args)
+
 class YouTubeExtractor:
     """YouTube 视频内容提取服务"""
     
@@ -18,10 +288,16 @@ class YouTubeExtractor:
         """初始化 YouTubeExtractor"""
         self.temp_dir = settings.temp_dir
         self.temp_dir.mkdir(parents=True, exist_ok=True)
+        self._metadata_cache = TTLCache(maxsize=METADATA_CACHE_SIZE, ttl=METADATA_CACHE_TTL)
+        self._analysis_cache = TTLCache(maxsize=ANALYSIS_CACHE_SIZE, ttl=ANALYSIS_CACHE_TTL)
+        self._info_cache = TTLCache(maxsize=INFO_CACHE_SIZE, ttl=INFO_CACHE_TTL)
+        # 每个线程各自复用 YoutubeDL 实例（同一实例不能跨线程并发使用）
+        self._ydl_local = threading.local()
     
-    def validate_url(self, url: str) -> tuple[bool, Optional[str]]:
+    @staticmethod
+    def validate_url(url: str) -> tuple[bool, Optional[str]]:
         """
-        验证 YouTube URL
+        验证 YouTube URL（与 validate_and_extract 同一规则）
         
         Args:
             url: YouTube 视频链接
@@ -29,26 +305,13 @@ class YouTubeExtractor:
         Returns:
             (is_valid, error_message)
         """
-        if not url or not url.strip():
-            return False, "URL 不能为空"
-        
-        # YouTube URL 正则匹配
-        youtube_patterns = [
-            r'(https?://)?(www\.)?youtube\.com/watch\?v=[\w-]+',
-            r'(https?://)?(www\.)?youtu\.be/[\w-]+',
-            r'(https?://)?(www\.)?youtube\.com/embed/[\w-]+',
-            r'(https?://)?(www\.)?youtube\.com/v/[\w-]+',
-        ]
-        
-        for pattern in youtube_patterns:
-            if re.match(pattern, url.strip()):
-                return True, None
-        
-        return False, "无效的 YouTube URL"
+        video_id, error_msg = YouTubeExtractor.validate_and_extract(url)
+        return video_id is not None, error_msg
     
-    def extract_video_id(self, url: str) -> Optional[str]:
+    @staticmethod
+    def extract_video_id(url: str) -> Optional[str]:
         """
-        从 YouTube URL 提取视频 ID
+        从 YouTube URL 提取视频 ID（与 validate_and_extract 同一规则）
         
         Args:
             url: YouTube 视频链接
@@ -56,19 +319,9 @@ class YouTubeExtractor:
         Returns:
             视频 ID 或 None
         """
-        patterns = [
-            r'(?:v=|/)([0-9A-Za-z_-]{11}).*',
-            r'youtu\.be/([0-9A-Za-z_-]{11})',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
-        
-        return None
+        return YouTubeExtractor.validate_and_extract(url)[0]
     
-    def extract_metadata(self, url: str) -> Dict[str, Any]:
+    async def extract_metadata(self, url: str) -> Dict[str, Any]:
         """
         使用 Gemini API 获取 YouTube 视频元数据
         
@@ -86,105 +339,198 @@ class YouTubeExtractor:
             }
         
         Raises:
+            ValueError: 如果 URL 无效
             Exception: 如果提取失败
         """
+        video_id = self._require_valid(url)
+        cache_key = self._metadata_cache_key(url)
+        
+        cached = self._metadata_cache.get(cache_key)
+        if cached is not None:
+            logger.info("✅ 使用缓存的元数据: %s", cached['title'])
+            return dict(cached)
+        
         try:
-            print(f"📹 使用 Gemini API 提取 YouTube 视频元数据...")
-            print(f"   URL: {url}")
+            logger.info("📹 使用 Gemini API 提取 YouTube 视频元数据: %s", url)
             
             # 使用 Gemini API 获取视频基本信息
-            from app.services.ai_service import ai_service
+            from app.services.ai_service import get_ai_service
             
-            metadata_prompt = f"""Analyze this YouTube video and extract metadata in JSON format:
-
-Video URL: {url}
-
-Please provide:
-1. Video title
-2. Brief description (1-2 sentences)
-3. Estimated duration in seconds (rough estimate from content)
-4. Channel/uploader name
-
-Return ONLY valid JSON with this exact structure:
-{{
-  "title": "video title here",
-  "description": "brief description",
-  "duration": 300,
-  "uploader": "channel name"
-}}
-
-CRITICAL: Return ONLY the JSON, no markdown code blocks, no extra text."""
+            metadata_prompt = METADATA_PROMPT_TEMPLATE.format_map({'url': url})
 
             # 调用 Gemini API（带视频 URL）
-            response_text = ai_service._call_gemini_api_with_video(
+            response_text = await get_ai_service()._call_gemini_api_with_video(
                 url=url,
                 prompt=metadata_prompt,
                 temperature=0.3,
                 max_tokens=500
             )
             
-            # 解析 JSON（增强容错性）
-            response_text = response_text.strip()
-            
-            # 移除 markdown 代码块标记
-            if response_text.startswith("```json"):
-                response_text = response_text[7:]
-            elif response_text.startswith("```"):
-                response_text = response_text[3:]
-            if response_text.endswith("```"):
-                response_text = response_text[:-3]
-            
-            response_text = response_text.strip()
-            
-            # 尝试提取 JSON 对象（如果有额外文本）
-            if '{' in response_text and '}' in response_text:
-                start = response_text.find('{')
-                end = response_text.rfind('}') + 1
-                response_text = response_text[start:end]
-            
-            try:
-                metadata_json = json.loads(response_text)
-            except json.JSONDecodeError as e:
-                print(f"❌ JSON 解析失败: {e}")
-                print(f"   原始响应: {response_text[:200]}...")
-                # 如果解析失败，使用默认值
-                video_id = self.extract_video_id(url) or "unknown"
-                metadata_json = {
-                    "title": f"YouTube Video {video_id}",
-                    "description": "Failed to extract metadata",
-                    "duration": 300,
-                    "uploader": "Unknown"
-                }
-            
-            # 提取视频 ID
-            video_id = self.extract_video_id(url) or "unknown"
+            metadata_json, _ = _parse_json_response(response_text)
+            metadata_json = _validate_metadata(metadata_json)
             
-            metadata = {
-                'title': metadata_json.get('title', 'Unknown Title'),
-                'description': metadata_json.get('description', ''),
-                'duration': int(metadata_json.get('duration', 300)),  # 默认 5 分钟
-                'uploader': metadata_json.get('uploader', 'Unknown'),
-                'video_id': video_id,
-                'upload_date': '',
-                'view_count': 0,
-                'thumbnail': f'https://img.youtube.com/vi/{video_id}/maxresdefault.jpg',
-                'channel': metadata_json.get('uploader', 'Unknown'),
-                'channel_id': ''
-            }
+            # 如果解析或校验失败，使用默认值（不缓存，下次重新提取）
+            cacheable = metadata_json is not None
+            metadata = self._build_metadata(metadata_json, video_id)
             
-            print(f"✅ 元数据提取成功（通过 Gemini API）")
-            print(f"   标题: {metadata['title']}")
-            print(f"   时长: {metadata['duration']} 秒（估计）")
-            print(f"   作者: {metadata['uploader']}")
+            logger.info(
+                "✅ 元数据提取成功（通过 Gemini API）: %s，时长 %d 秒（估计），作者: %s",
+                metadata['title'], metadata['duration'], metadata['uploader']
+            )
             
+            if cacheable:
+                self._metadata_cache.set(cache_key, metadata)
+                return dict(metadata)
             return metadata
         
         except Exception as e:
             error_msg = str(e)
-            print(f"❌ 元数据提取失败: {error_msg}")
+            logger.error("❌ 元数据提取失败: %s", error_msg)
             raise Exception(f"无法提取 YouTube 视频元数据: {error_msg}")
     
-    def _extract_with_gemini(self, url: str, language: str = 'en', enhancement_prompt: Optional[str] = None) -> Dict[str, Any]:
+    @staticmethod
+    def _build_metadata(metadata_json: Optional[Dict[str, Any]], video_id: str) -> Dict[str, Any]:
+        """
+        由 Gemini 返回的元数据 JSON 构建元数据字典
+        
+        Args:
+            metadata_json: 校验通过的元数据；None 表示解析或校验失败，使用默认值
+            video_id: 视频 ID
+        
+        Returns:
+            视频元数据字典
+        """
+        if metadata_json is None:
+            metadata_json = {
+                "title": f"YouTube Video {video_id}",
+                "description": "Failed to extract metadata",
+                "duration": 300,
+                "uploader": "Unknown"
+            }
+        
+        return {
+            'title': metadata_json.get('title', 'Unknown Title'),
+            'description': metadata_json.get('description', ''),
+            'duration': int(metadata_json.get('duration', 300)),  # 默认 5 分钟
+            'uploader': metadata_json.get('uploader', 'Unknown'),
+            'video_id': video_id,
+            'upload_date': '',
+            'view_count': 0,
+            'thumbnail': f'https://img.youtube.com/vi/{video_id}/maxresdefault.jpg',
+            'channel': metadata_json.get('uploader', 'Unknown'),
+            'channel_id': ''
+        }
+    
+    @staticmethod
+    def _analysis_fallback(response_text: str) -> Dict[str, Any]:
+        """
+        内容分析 JSON 解析失败时返回的默认结构
+        
+        Args:
+            response_text: 清理后的响应文本
+        
+        Returns:
+            默认内容分析结果
+        """
+        return {
+            "transcript": response_text[:1000] if len(response_text) > 100 else "Content extraction failed",
+            "summary": "Failed to parse video content",
+            "topics": ["video analysis"],
+            "insights": ["Unable to extract insights"]
+        }
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def validate_and_extract(url: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        一次正则匹配同时校验 YouTube URL 并提取视频 ID（纯函数，按 URL 缓存结果）
+        
+        Args:
+            url: YouTube 视频链接
+        
+        Returns:
+            (video_id, error_message)；校验失败时 video_id 为 None
+        """
+        if not url or not url.strip():
+            return None, "URL 不能为空"
+        
+        match = _YOUTUBE_VIDEO_RE.match(url.strip())
+        if match:
+            return match.group('id'), None
+        
+        if _YOUTUBE_URL_RE.match(url.strip()):
+            return None, "无法从 URL 中提取 YouTube 视频 ID"
+        return None, "无效的 YouTube URL"
+    
+    @staticmethod
+    def validate_urls_bulk(urls: List[str]) -> List[Tuple[bool, Optional[str]]]:
+        """
+        批量校验 YouTube URL 并提取视频 ID（如播放列表）
+        
+        各 URL 以换行拼接后一次正则扫描，按匹配起始位置映射回原下标；
+        结果与逐个调用 validate_and_extract 一致
+        
+        Args:
+            urls: YouTube 视频链接列表
+        
+        Returns:
+            [(is_valid, video_id), ...]，与输入顺序一致；无效时 video_id 为 None
+        """
+        # 含换行的 URL 本身无效，置空以免拼接后被拆成多行误匹配
+        lines = [url.strip() if url and '\n' not in url.strip() else '' for url in urls]
+        
+        line_starts = {}
+        offset = 0
+        for index, line in enumerate(lines):
+            line_starts[offset] = index
+            offset += len(line) + 1
+        
+        results: List[Tuple[bool, Optional[str]]] = [(False, None)] * len(lines)
+        for match in _YOUTUBE_VIDEO_LINE_RE.finditer('\n'.join(lines)):
+            results[line_starts[match.start()]] = (True, match.group('id'))
+        return results
+    
+    def _require_valid(self, url: str) -> str:
+        """
+        在调用 Gemini 之前校验 URL，无效链接直接拒绝
+        
+        Args:
+            url: YouTube 视频链接
+        
+        Returns:
+            视频 ID
+        
+        Raises:
+            ValueError: URL 无效或无法提取视频 ID
+        """
+        video_id, error_msg = self.validate_and_extract(url)
+        if video_id is None:
+            raise ValueError(error_msg)
+        return video_id
+    
+    def _metadata_cache_key(self, url: str) -> str:
+        """
+        生成元数据缓存键（视频 ID；无法提取时使用 URL）
+        
+        Returns:
+            缓存键
+        """
+        return self.extract_video_id(url) or url.strip()
+    
+    def _analysis_cache_key(self, url: str, language: str, enhancement_prompt: Optional[str]) -> str:
+        """
+        生成内容分析缓存键
+        
+        同一视频的不同 URL 写法（youtu.be / watch?v=）按视频 ID 归一
+        
+        Returns:
+            缓存键（blake2b 摘要）
+        """
+        video_key = self.extract_video_id(url) or url.strip()
+        raw_key = f"{video_key}|{language}|{enhancement_prompt or ''}"
+        return hashlib.blake2b(raw_key.encode("utf-8"), digest_size=16).hexdigest()
+    
+    async def _extract_with_gemini(self, url: str, language: str = 'en', enhancement_prompt: Optional[str] = None) -> Dict[str, Any]:
         """
         使用 Gemini API 直接分析 YouTube 视频内容
         
@@ -196,79 +542,182 @@ CRITICAL: Return ONLY the JSON, no markdown code blocks, no extra text."""
         Returns:
             提取的内容和元数据
         """
-        from app.services.ai_service import ai_service
+        from app.services.ai_service import get_ai_service
+        
+        cache_key = self._analysis_cache_key(url, language, enhancement_prompt)
+        cached = self._analysis_cache.get(cache_key)
+        if cached is not None:
+            logger.info("✅ 使用缓存的视频内容分析")
+            return dict(cached)
         
-        print(f"🤖 使用 Gemini API 分析视频内容...")
+        logger.info("🤖 使用 Gemini API 分析视频内容...")
         
         # 构建分析提示
-        analysis_prompt = f"""Analyze this YouTube video and provide comprehensive content extraction in JSON format.
+        analysis_prompt = ANALYSIS_PROMPT_TEMPLATE.format_map({'focus': _focus_section(enhancement_prompt)})
 
-Please provide:
-1. **Transcript**: A detailed transcript or summary of the key content discussed in the video (focus on main points, insights, and information - at least 500 words)
-2. **Summary**: A concise summary of the video (100-200 words)
-3. **Topics**: List 3-5 main topics or themes discussed
-4. **Insights**: List 3-5 key insights, takeaways, or important points
-
-"""
+        # 调用 Gemini API（带视频 URL）
+        response_text = await get_ai_service()._call_gemini_api_with_video(
+            url=url,
+            prompt=analysis_prompt,
+            temperature=0.3,
+            max_tokens=3000
+        )
         
-        if enhancement_prompt:
-            analysis_prompt += f"\nSpecial focus: {enhancement_prompt}\n"
+        analysis, response_text = _parse_json_response(response_text)
+        if not isinstance(analysis, dict):
+            return self._analysis_fallback(response_text)
         
-        analysis_prompt += """
-Return ONLY valid JSON with this exact structure:
-{
-  "transcript": "detailed content transcript or summary here...",
-  "summary": "concise summary here...",
-  "topics": ["topic1", "topic2", "topic3"],
-  "insights": ["insight1", "insight2", "insight3"]
-}
-
-CRITICAL: Return ONLY the JSON, no markdown code blocks, no extra text."""
+        # 只缓存解析成功的结果，解析失败时下次重新分析
+        self._analysis_cache.set(cache_key, analysis)
+        return dict(analysis)
+    
+    async def _extract_combined(
+        self,
+        url: str,
+        language: str = 'en',
+        enhancement_prompt: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        一次 Gemini 调用同时提取视频元数据和内容分析
+        
+        元数据已缓存时（如接口提交任务前已调用 extract_metadata）只分析内容；
+        解析成功的结果分别写入元数据缓存和内容分析缓存
+        
+        Args:
+            url: YouTube 视频链接
+            language: 目标语言
+            enhancement_prompt: 可选的增强提示
+        
+        Returns:
+            (元数据, 内容分析)
+        """
+        video_id = self.extract_video_id(url) or "unknown"
+        metadata_key = self._metadata_cache_key(url)
+        
+        analysis_key = self._analysis_cache_key(url, language, enhancement_prompt)
+        if self._metadata_cache.get(metadata_key) is not None or self._analysis_cache.get(analysis_key) is not None:
+            # 已有一半结果在缓存中，只需单独请求另一半
+            metadata = await self.extract_metadata(url)
+            return metadata, await self._extract_with_gemini(url, language, enhancement_prompt)
+        
+        from app.services.ai_service import get_ai_service
+        
+        logger.info("🤖 使用 Gemini API 一次性提取视频元数据和内容: %s", url)
+        
+        combined_prompt = COMBINED_PROMPT_TEMPLATE.format_map({
+            'url': url,
+            'items': COMBINED_ANALYSIS_ITEMS,
+            'focus': _focus_section(enhancement_prompt),
+            'structure': COMBINED_JSON_STRUCTURE
+        })
 
         # 调用 Gemini API（带视频 URL）
-        response_text = ai_service._call_gemini_api_with_video(
+        response_text = await get_ai_service()._call_gemini_api_with_video(
             url=url,
-            prompt=analysis_prompt,
+            prompt=combined_prompt,
             temperature=0.3,
-            max_tokens=3000
+            max_tokens=3500
         )
         
-        # 解析 JSON（增强容错性）
-        response_text = response_text.strip()
+        result, response_text = _parse_json_response(response_text)
+        if not isinstance(result, dict):
+            return self._build_metadata(None, video_id), self._analysis_fallback(response_text)
         
-        # 移除 markdown 代码块标记
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        elif response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
+        metadata_json = _validate_metadata(result.pop('metadata', None))
+        if metadata_json is not None:
+            metadata = self._build_metadata(metadata_json, video_id)
+            self._metadata_cache.set(metadata_key, metadata)
+            metadata = dict(metadata)
+        else:
+            metadata = self._build_metadata(None, video_id)
         
-        response_text = response_text.strip()
+        logger.info(
+            "✅ 元数据提取成功（通过 Gemini API）: %s，时长 %d 秒（估计），作者: %s",
+            metadata['title'], metadata['duration'], metadata['uploader']
+        )
         
-        # 尝试提取 JSON 对象（如果有额外文本）
-        if '{' in response_text and '}' in response_text:
-            start = response_text.find('{')
-            end = response_text.rfind('}') + 1
-            response_text = response_text[start:end]
+        # 只缓存解析成功的结果，解析失败时下次重新分析
+        self._analysis_cache.set(analysis_key, result)
+        return metadata, dict(result)
+    
+    def _get_ydl(self, ydl_opts: Mapping[str, Any], outtmpl: Optional[str] = None) -> yt_dlp.YoutubeDL:
+        """
+        获取当前线程中按配置复用的 YoutubeDL 实例
         
-        try:
-            return json.loads(response_text)
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON 解析失败: {e}")
-            print(f"   原始响应: {response_text[:200]}...")
-            # 返回默认结构
-            return {
-                "transcript": response_text[:1000] if len(response_text) > 100 else "Content extraction failed",
-                "summary": "Failed to parse video content",
-                "topics": ["video analysis"],
-                "insights": ["Unable to extract insights"]
-            }
+        复用实例可保留提取器注册表、HTTP 连接和 Cookie，
+        输出路径每次调用都不同，因此不参与配置比较，取出实例后再设置
+        
+        Args:
+            ydl_opts: yt-dlp 配置（不含 outtmpl）
+            outtmpl: 本次下载的输出路径模板（只提取信息时为 None）
+        
+        Returns:
+            YoutubeDL 实例
+        """
+        key = hash(orjson.dumps(dict(ydl_opts), option=orjson.OPT_SORT_KEYS))
+        pool = getattr(self._ydl_local, 'pool', None)
+        if pool is None:
+            pool = self._ydl_local.pool = {}
+        
+        ydl = pool.get(key)
+        if ydl is None:
+            # YoutubeDL 会直接修改传入的配置字典，传入副本以保持模块级配置常量不变
+            ydl = pool[key] = yt_dlp.YoutubeDL(copy.deepcopy(dict(ydl_opts)))
+        if outtmpl is not None:
+            ydl.params['outtmpl']['default'] = outtmpl
+        return ydl
+    
+    def _extract_info(self, url: str) -> Dict[str, Any]:
+        """
+        获取 yt-dlp 视频信息（按视频 ID 缓存）
+        
+        字幕和音频下载共用同一份信息，同一视频在缓存有效期内只解析一次页面
+        
+        Args:
+            url: YouTube 视频链接
+        
+        Returns:
+            可 JSON 序列化的视频信息字典
+        """
+        cache_key = self._metadata_cache_key(url)
+        info = self._info_cache.get(cache_key)
+        if info is not None:
+            return info
+        
+        ydl = self._get_ydl(YTDLP_BASE_OPTS)
+        info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+        self._info_cache.set(cache_key, info)
+        return info
+    
+    @staticmethod
+    def _select_subtitle_url(info: Dict[str, Any], language: str) -> Optional[str]:
+        """
+        从视频信息中选择字幕文件 URL
+        
+        优先请求的语言，其次英文；同一语言优先人工字幕，其次自动生成的字幕
+        
+        Args:
+            info: yt-dlp 视频信息
+            language: 字幕语言代码
+        
+        Returns:
+            字幕文件 URL，没有可用字幕时返回 None
+        """
+        for lang in dict.fromkeys([language, 'en']):
+            for key in ('subtitles', 'automatic_captions'):
+                tracks = (info.get(key) or {}).get(lang) or []
+                for fmt in SUBTITLE_FORMATS:
+                    for track in tracks:
+                        if track.get('ext') == fmt and track.get('url'):
+                            return track['url']
+        return None
     
-    def download_subtitles(self, url: str, language: str = 'en') -> Optional[str]:
+    async def download_subtitles(self, url: str, language: str = 'en') -> Optional[str]:
         """
         下载 YouTube 视频字幕
         
+        yt-dlp 解析视频信息（阻塞）在线程中执行，字幕文件通过共享的 AsyncClient 直接请求
+        
         Args:
             url: YouTube 视频链接
             language: 字幕语言代码（'en', 'zh-Hans', 'zh-Hant' 等）
@@ -280,211 +729,87 @@ CRITICAL: Return ONLY the JSON, no markdown code blocks, no extra text."""
             Exception: 如果下载失败
         """
         try:
-            print(f"📝 尝试下载字幕...")
-            print(f"   语言: {language}")
-            
-            # 创建临时文件
-            temp_file = tempfile.NamedTemporaryFile(
-                mode='w',
-                suffix='.txt',
-                dir=self.temp_dir,
-                delete=False
-            )
-            temp_path = temp_file.name
-            temp_file.close()
-            
-            # 配置 yt-dlp 下载字幕
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'skip_download': True,
-                'writesubtitles': True,
-                'writeautomaticsub': True,  # 也尝试自动生成的字幕
-                'subtitleslangs': [language, 'en'],  # 优先请求的语言，回退到英文
-                'subtitlesformat': 'srt',
-                'outtmpl': temp_path.replace('.txt', ''),
-                # 强力绕过 YouTube 的 bot 检测
-                'nocheckcertificate': True,
-                'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'extractor_args': {
-                    'youtube': {
-                        'player_client': ['android', 'ios', 'web'],
-                        'player_skip': ['webpage', 'configs'],
-                        'skip': ['hls', 'dash'],
-                    }
-                },
-                # 额外的绕过选项
-                'age_limit': None,
-                'no_check_certificate': True,
-                'youtube_include_dash_manifest': False,
-                'youtube_include_hls_manifest': False,
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+            logger.info("📝 尝试下载字幕，语言: %s", language)
             
-            # 查找下载的字幕文件
-            subtitle_file = None
-            for ext in ['.en.srt', f'.{language}.srt', '.srt']:
-                potential_file = temp_path.replace('.txt', ext)
-                if os.path.exists(potential_file):
-                    subtitle_file = potential_file
-                    break
-            
-            if not subtitle_file:
-                print(f"⚠️  没有找到可用的字幕")
-                # 清理临时文件
-                try:
-                    os.remove(temp_path)
-                except:
-                    pass
+            # 复用缓存的视频信息，直接请求字幕文件 URL，不再让 yt-dlp 重新解析页面和写临时文件
+            info = await _run_ytdlp(self._extract_info, url)
+            subtitle_url = self._select_subtitle_url(info, language)
+            if subtitle_url is None:
+                logger.warning("⚠️  没有找到可用的字幕")
                 return None
             
-            # 读取字幕内容
-            with open(subtitle_file, 'r', encoding='utf-8') as f:
-                subtitles = f.read()
-            
-            # 清理 SRT 格式，只保留文本
-            cleaned_text = self._clean_srt_format(subtitles)
+            response = await get_async_client().get(subtitle_url)
+            response.raise_for_status()
             
-            # 清理临时文件
-            try:
-                os.remove(temp_path)
-                os.remove(subtitle_file)
-            except:
-                pass
+            # 清理字幕格式，只保留文本
+            cleaned_text = self._clean_srt_format(response.text)
             
-            print(f"✅ 字幕下载成功")
-            print(f"   长度: {len(cleaned_text)} 字符")
+            logger.info("✅ 字幕下载成功，长度: %d 字符", len(cleaned_text))
             
             return cleaned_text
         
         except Exception as e:
-            print(f"⚠️  字幕下载失败: {e}")
-            # 清理临时文件
-            try:
-                if 'temp_path' in locals():
-                    os.remove(temp_path)
-            except:
-                pass
+            logger.warning("⚠️  字幕下载失败: %s", e)
             return None
     
     def _clean_srt_format(self, srt_content: str) -> str:
         """
-        清理 SRT 字幕格式，只保留文本
+        清理 SRT / WebVTT 字幕格式，只保留文本
         
         Args:
-            srt_content: SRT 格式字幕
+            srt_content: SRT 或 WebVTT 格式字幕
         
         Returns:
             纯文本内容
         """
-        lines = srt_content.split('\n')
-        text_lines = []
-        
-        for line in lines:
-            line = line.strip()
-            # 跳过序号、时间戳和空行
-            if not line:
-                continue
-            if line.isdigit():
-                continue
-            if '-->' in line:
-                continue
-            # 保留文本行
-            text_lines.append(line)
+        if srt_content.startswith('WEBVTT'):
+            srt_content = _VTT_TAG_RE.sub('', _VTT_HEADER_RE.sub('', srt_content, count=1))
         
-        # 合并文本，去除重复
-        text = ' '.join(text_lines)
-        return text
+        # 一次正则替换去掉序号、时间戳和空行，再把剩余文本行合并为一行
+        return ' '.join(_SRT_NOISE_RE.sub('', srt_content).split())
     
-    def extract_audio(self, url: str) -> tuple[bytes, str]:
+    def extract_audio(self, url: str) -> tuple[Path, str]:
         """
         从 YouTube 视频提取音频（备用方案）
         
+        返回音频文件路径而不是字节内容，调用方可按需分块读取，避免整个文件驻留内存；
+        调用方使用完毕后负责删除该文件
+        
         Args:
             url: YouTube 视频链接
         
         Returns:
-            (audio_content, format) - 音频字节内容和格式
+            (audio_path, format) - 音频文件路径和格式
         
         Raises:
             Exception: 如果提取失败
         """
         try:
-            print(f"🎵 从 YouTube 提取音频...")
-            
-            # 创建临时文件
-            temp_file = tempfile.NamedTemporaryFile(
-                mode='wb',
-                suffix='.mp3',
-                dir=self.temp_dir,
-                delete=False
-            )
-            temp_path = temp_file.name
-            temp_file.close()
+            logger.info("🎵 从 YouTube 提取音频...")
             
-            # 配置 yt-dlp 提取音频
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
-                'outtmpl': temp_path.replace('.mp3', ''),
-                'quiet': True,
-                'no_warnings': True,
-                # 强力绕过 YouTube 的 bot 检测
-                'nocheckcertificate': True,
-                'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'extractor_args': {
-                    'youtube': {
-                        'player_client': ['android', 'ios', 'web'],
-                        'player_skip': ['webpage', 'configs'],
-                        'skip': ['hls', 'dash'],
-                    }
-                },
-                # 额外的绕过选项
-                'age_limit': None,
-                'no_check_certificate': True,
-                'youtube_include_dash_manifest': False,
-                'youtube_include_hls_manifest': False,
-            }
+            # 所有下载产物放在独立的临时目录中，退出 with 时整个目录自动删除
+            with tempfile.TemporaryDirectory(dir=self.temp_dir, prefix='yt_') as work_dir:
+                base_path = os.path.join(work_dir, 'out')
+                # 复用缓存的视频信息，跳过重新解析视频页面（处理过程会修改信息字典，因此传入副本）
+                self._get_ydl(YTDLP_AUDIO_OPTS, base_path).process_ie_result(copy.deepcopy(self._extract_info(url)), download=True)
+                
+                # 查找生成的音频文件（yt-dlp 会自动添加扩展名）：一次读取目录，按优先级选取
+                outputs = {path.suffix: path for path in Path(work_dir).glob('out.*')}
+                audio_path = next((outputs[ext] for ext in AUDIO_EXTENSIONS if ext in outputs), None)
+                
+                if audio_path is None:
+                    raise Exception("音频文件未生成")
+                
+                # 音频文件移出临时目录交给调用方（同一文件系统内重命名，不复制数据）
+                result_path = self.temp_dir / f"{os.path.basename(work_dir)}{audio_path.suffix}"
+                os.replace(audio_path, result_path)
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+            logger.info("✅ 音频提取成功，大小: %d bytes", result_path.stat().st_size)
             
-            # 读取音频文件
-            audio_path = temp_path.replace('.mp3', '.mp3')  # yt-dlp 会自动添加扩展名
-            if not os.path.exists(audio_path):
-                # 尝试找到生成的文件
-                base_path = temp_path.replace('.mp3', '')
-                for ext in ['.mp3', '.m4a', '.webm']:
-                    if os.path.exists(base_path + ext):
-                        audio_path = base_path + ext
-                        break
-            
-            if not os.path.exists(audio_path):
-                raise Exception("音频文件未生成")
-            
-            with open(audio_path, 'rb') as f:
-                audio_content = f.read()
-            
-            # 清理临时文件
-            try:
-                os.remove(audio_path)
-                os.remove(temp_path)
-            except:
-                pass
-            
-            print(f"✅ 音频提取成功")
-            print(f"   大小: {len(audio_content)} bytes")
-            
-            return audio_content, 'mp3'
+            return result_path, 'mp3'
         
         except Exception as e:
-            print(f"❌ 音频提取失败: {e}")
+            logger.error("❌ 音频提取失败: %s", e, exc_info=True)
             raise Exception(f"无法从 YouTube 提取音频: {str(e)}")
     
     async def extract_content(
@@ -497,6 +822,7 @@ CRITICAL: Return ONLY the JSON, no markdown code blocks, no extra text."""
         从 YouTube 视频提取内容（使用 Gemini API 直接分析）
         
         完全使用 Gemini 2.5 Pro/Flash 的视频分析能力，绕过 YouTube bot 检测
+        启用 youtube_subtitles_first 时优先使用字幕作为转录文本，没有字幕再由 Gemini 分析
         
         Args:
             url: YouTube 视频链接
@@ -511,39 +837,199 @@ CRITICAL: Return ONLY the JSON, no markdown code blocks, no extra text."""
                 'topics': list,
                 'insights': list,
                 'metadata': dict,  # YouTube 元数据
-                'source': str,     # 'gemini_video_analysis'
+                'source': str,     # 'gemini_video_analysis' 或 'subtitles'
                 'duration': int
             }
         
         Raises:
+            ValueError: 如果 URL 无效
             Exception: 如果提取失败
         """
+        self._require_valid(url)
+        
         try:
-            print(f"\n🎬 使用 Gemini API 分析 YouTube 视频...")
+            logger.info("🎬 使用 Gemini API 分析 YouTube 视频...")
             
-            # 1. 获取视频元数据（使用 Gemini）
-            metadata = self.extract_metadata(url)
-            
-            # 2. 使用 Gemini API 直接分析视频内容
-            content_analysis = self._extract_with_gemini(url, language, enhancement_prompt)
+            source = 'gemini_video_analysis'
+            if settings.youtube_subtitles_first:
+                # 元数据提取（Gemini）与字幕下载互不依赖，并发执行
+                metadata, subtitles = await asyncio.gather(
+                    self.extract_metadata(url),
+                    self.download_subtitles(url, language)
+                )
+                if subtitles:
+                    # 有字幕时直接作为转录文本，省去一次 Gemini 视频分析
+                    source = 'subtitles'
+                    content_analysis = {
+                        'transcript': subtitles,
+                        'summary': subtitles[:500],
+                        'topics': [],
+                        'insights': []
+                    }
+                else:
+                    content_analysis = await self._extract_with_gemini(url, language, enhancement_prompt)
+            else:
+                # 元数据和内容分析合并为一次 Gemini 调用
+                metadata, content_analysis = await self._extract_combined(url, language, enhancement_prompt)
             
-            print(f"✅ 视频内容分析完成！")
-            print(f"   转录长度: {len(content_analysis.get('transcript', ''))} 字符")
-            print(f"   主题数: {len(content_analysis.get('topics', []))} 个")
+            logger.info(
+                "✅ 视频内容分析完成！转录长度: %d 字符，主题数: %d",
+                len(content_analysis.get('transcript', '')), len(content_analysis.get('topics', []))
+            )
             
-            return {
-                'transcript': content_analysis.get('transcript', ''),
-                'summary': content_analysis.get('summary', ''),
-                'topics': content_analysis.get('topics', []),
-                'insights': content_analysis.get('insights', []),
-                'metadata': metadata,
-                'source': 'gemini_video_analysis',
-                'duration': metadata['duration']
-            }
+            return self._build_result(metadata, content_analysis, source)
         
         except Exception as e:
-            print(f"❌ YouTube 内容提取失败: {e}")
+            logger.error("❌ YouTube 内容提取失败: %s", e, exc_info=True)
             raise Exception(f"无法从 YouTube 提取内容: {str(e)}")
+    
+    @staticmethod
+    def _build_result(metadata: Dict[str, Any], content_analysis: Dict[str, Any], source: str) -> Dict[str, Any]:
+        """
+        组装 extract_content 的返回结果
+        
+        Args:
+            metadata: 视频元数据
+            content_analysis: 内容分析结果
+            source: 内容来源（'gemini_video_analysis' 或 'subtitles'）
+        
+        Returns:
+            提取结果字典
+        """
+        return {
+            'transcript': content_analysis.get('transcript', ''),
+            'summary': content_analysis.get('summary', ''),
+            'topics': content_analysis.get('topics', []),
+            'insights': content_analysis.get('insights', []),
+            'metadata': metadata,
+            'source': source,
+            'duration': metadata['duration']
+        }
+    
+    async def extract_content_batch(
+        self,
+        urls: List[str],
+        language: str = 'en',
+        enhancement_prompt: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        批量从多个 YouTube 视频提取内容
+        
+        未缓存的视频每 BATCH_MAX_VIDEOS 个合并为一次 Gemini 调用；
+        已缓存的视频、只剩单个视频的批次、合并响应无法拆分时，逐个走 extract_content
+        
+        Args:
+            urls: YouTube 视频链接列表
+            language: 目标语言
+            enhancement_prompt: 可选的增强提示
+        
+        Returns:
+            与 urls 顺序一致的提取结果列表（格式同 extract_content）
+        
+        Raises:
+            ValueError: 如果任一 URL 无效（此时不会调用 Gemini）
+            Exception: 如果任一视频提取失败
+        """
+        for url in urls:
+            self._require_valid(url)
+        
+        if settings.youtube_subtitles_first:
+            return list(await asyncio.gather(
+                *(self.extract_content(url, language, enhancement_prompt) for url in urls)
+            ))
+        
+        pending = [
+            url for url in urls
+            if self._metadata_cache.get(self._metadata_cache_key(url)) is None
+            or self._analysis_cache.get(self._analysis_cache_key(url, language, enhancement_prompt)) is None
+        ]
+        # 同一视频只分析一次
+        pending = list(dict.fromkeys(pending))
+        groups = [pending[i:i + BATCH_MAX_VIDEOS] for i in range(0, len(pending), BATCH_MAX_VIDEOS)]
+        
+        async def run_group(group: List[str]):
+            if len(group) > 1:
+                results = await self._extract_batch_group(group, language, enhancement_prompt)
+                if results is not None:
+                    return results
+            return await asyncio.gather(
+                *(self.extract_content(url, language, enhancement_prompt) for url in group)
+            )
+        
+        extracted = {}
+        for group, results in zip(groups, await asyncio.gather(*(run_group(group) for group in groups))):
+            extracted.update(zip(group, results))
+        
+        # 其余视频（分析前已缓存）逐个取出，不会再调用 Gemini
+        remaining = [url for url in dict.fromkeys(urls) if url not in extracted]
+        results = await asyncio.gather(
+            *(self.extract_content(url, language, enhancement_prompt) for url in remaining)
+        )
+        extracted.update(zip(remaining, results))
+        
+        return [dict(extracted[url]) for url in urls]
+    
+    async def _extract_batch_group(
+        self,
+        urls: List[str],
+        language: str,
+        enhancement_prompt: Optional[str]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        一次 Gemini 调用分析一组视频
+        
+        Args:
+            urls: 同一批次的 YouTube 视频链接
+            language: 目标语言
+            enhancement_prompt: 可选的增强提示
+        
+        Returns:
+            与 urls 顺序一致的提取结果列表；调用失败或响应无法按视频拆分时返回 None
+        """
+        from app.services.ai_service import get_ai_service
+        
+        logger.info("🤖 使用 Gemini API 一次分析 %d 个 YouTube 视频...", len(urls))
+        
+        batch_prompt = BATCH_PROMPT_TEMPLATE.format_map({
+            'count': len(urls),
+            'video_list': "\n".join(f"{index}. {url}" for index, url in enumerate(urls, start=1)),
+            'items': COMBINED_ANALYSIS_ITEMS,
+            'focus': _focus_section(enhancement_prompt),
+            'structure': COMBINED_JSON_STRUCTURE
+        })
+
+        try:
+            response_text = await get_ai_service()._call_gemini_api_with_videos(
+                urls=urls,
+                prompt=batch_prompt,
+                temperature=0.3,
+                max_tokens=3500 * len(urls)
+            )
+            
+            response_text = strip_code_fences(response_text)
+            start = response_text.find('[')
+            end = response_text.rfind(']') + 1
+            items = orjson.loads(response_text[start:end] if start != -1 and end > start else response_text)
+            if not isinstance(items, list) or len(items) != len(urls) or not all(isinstance(item, dict) for item in items):
+                raise ValueError(f"期望 {len(urls)} 个视频的分析结果，实际解析出 {len(items) if isinstance(items, list) else 0} 个")
+        except Exception as e:
+            logger.warning("⚠️  批量分析失败，改为逐个分析: %s", e)
+            return None
+        
+        results = []
+        for url, analysis in zip(urls, items):
+            video_id = self.extract_video_id(url) or "unknown"
+            metadata_json = _validate_metadata(analysis.pop('metadata', None))
+            metadata = self._build_metadata(metadata_json, video_id)
+            if metadata_json is not None:
+                self._metadata_cache.set(self._metadata_cache_key(url), metadata)
+                metadata = dict(metadata)
+            
+            self._analysis_cache.set(self._analysis_cache_key(url, language, enhancement_prompt), analysis)
+            results.append(self._build_result(metadata, dict(analysis), 'gemini_video_analysis'))
+        
+        logger.info("✅ 批量分析完成: %d 个视频", len(results))
+        return results
 
 
 # 创建全局实例
@@ -3,14 +3,106 @@
 提取文本 → 生成音频 → 上传到 S3
 """
 import io
-import threading
 import struct
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, Tuple
 from PyPDF2 import PdfReader
 from docx import Document
 
+from app.config import settings
 from app.services.data_service import data_service
-from app.services.ai_service import ai_service
+from app.services.ai_service import GEMINI_RETRY_ATTEMPTS, get_ai_service
+from app.services.content_extractor import GEMINI_ANALYSIS_TIMEOUT
 from app.utils.s3_storage import s3_storage
+from app.utils.async_runner import run_sync
+
+
+# 后台任务线程池：限制同时运行的任务数，超出的任务排队等待（任务状态保持 pending）
+_task_executor = ThreadPoolExecutor(
+    max_workers=settings.max_background_tasks,
+    thread_name_prefix="podcast-task"
+)
+
+# 尚未结束的后台任务：Future -> (podcast_id, job_id)，关闭时据此把被取消的任务标记为失败
+_pending_tasks: Dict[Future, Tuple[str, str]] = {}
+_pending_tasks_lock = threading.Lock()
+
+SHUTDOWN_ERROR_MESSAGE = "服务重启，任务未能执行，请重新提交"
+SHUTDOWN_INTERRUPTED_MESSAGE = "服务重启，任务被中断，请重新提交"
+
+# 关闭时等待运行中任务结束的最长时间（秒），超时后不再等待，由停止后台事件循环中断它们
+TASK_SHUTDOWN_TIMEOUT = 20
+
+# run_sync 等待 AI 调用的上限：Gemini 请求最多尝试 GEMINI_RETRY_ATTEMPTS 次，每次按分析超时计，
+# 另留出重试退避和文件上传/处理的时间；超时后协程被取消，任务标记为失败
+AI_CALL_TIMEOUT = GEMINI_ANALYSIS_TIMEOUT.read * GEMINI_RETRY_ATTEMPTS + 300
+
+
+def submit_background_task(target, podcast_id: str, job_id: str, *args):
+    """
+    提交后台任务到线程池
+    
+    请求处理只负责创建任务记录并入队，耗时的提取/生成在线程池中执行，
+    客户端通过任务接口轮询进度
+    
+    Args:
+        target: 任务函数，签名为 (podcast_id, job_id, *args)
+        podcast_id: 播客ID
+        job_id: 任务ID
+        *args: 其余任务参数
+    """
+    future = _task_executor.submit(target, podcast_id, job_id, *args)
+    with _pending_tasks_lock:
+        _pending_tasks[future] = (podcast_id, job_id)
+    # 先登记再注册回调：任务已结束时回调立即执行，登记项随即移除
+    future.add_done_callback(_forget_task)
+
+
+def _forget_task(future: Future):
+    """任务结束（完成、失败或被取消）后移除登记"""
+    with _pending_tasks_lock:
+        _pending_tasks.pop(future, None)
+
+
+def _mark_task_failed(podcast_id: str, job_id: str, message: str):
+    """把因服务关闭而未完成的任务及对应播客标记为失败"""
+    data_service.update_podcast(podcast_id, {"status": "failed"})
+    data_service.update_job(job_id, {
+        "status": "failed",
+        "error_message": message,
+        "status_message": f"❌ {message}"
+    })
+
+
+def shutdown_task_executor(timeout: float = TASK_SHUTDOWN_TIMEOUT):
+    """
+    关闭后台任务线程池（阻塞调用，需在停止后台事件循环之前执行）
+    
+    尚未开始的任务被取消；运行中的任务最多等待 timeout 秒，到时仍未结束的任务不再等待。
+    两者都把对应的播客和任务标记为失败，避免记录永远停留在 pending/processing，
+    轮询或订阅任务状态的客户端一直等待
+    
+    Args:
+        timeout: 等待运行中任务结束的最长时间（秒）
+    """
+    with _pending_tasks_lock:
+        pending = list(_pending_tasks.items())
+    
+    running = {}
+    for future, ids in pending:
+        # cancel() 只对尚未开始执行的任务成功
+        if future.cancel():
+            _mark_task_failed(*ids, SHUTDOWN_ERROR_MESSAGE)
+        else:
+            running[future] = ids
+    
+    _task_executor.shutdown(wait=False, cancel_futures=True)
+    
+    if running:
+        _, not_done = wait(running, timeout=timeout)
+        for future in not_done:
+            _mark_task_failed(*running[future], SHUTDOWN_INTERRUPTED_MESSAGE)
 
 
 def get_mp3_duration(audio_data: bytes) -> int:
@@ -75,7 +167,7 @@ def extract_text_from_file(file_content: bytes, filename: str) -> str:
             # 音频/视频文件 - 使用 ElevenLabs 转录
             print(f"🎤 检测到音频文件，使用 ElevenLabs 进行转录...")
             try:
-                transcript = ai_service.transcribe_audio(file_content, filename)
+                transcript = get_ai_service().transcribe_audio(file_content, filename)
                 return transcript
             except Exception as e:
                 print(f"❌ 音频转录失败: {e}")
@@ -89,6 +181,27 @@ def extract_text_from_file(file_content: bytes, filename: str) -> str:
         return f"文本提取失败: {str(e)}"
 
 
+def transcribe_audio_stream(audio_stream, filename: str) -> str:
+    """
+    流式转录音频（读取完毕后关闭流）
+    
+    Args:
+        audio_stream: 可按块读取的音频流（如 S3 get_object 的 Body）
+        filename: 文件名
+    
+    Returns:
+        转录的文本
+    """
+    print(f"🎤 检测到音频文件，使用 ElevenLabs 进行转录...")
+    try:
+        return get_ai_service().transcribe_audio_stream(audio_stream, filename)
+    except Exception as e:
+        print(f"❌ 音频转录失败: {e}")
+        return f"音频转录失败: {str(e)}"
+    finally:
+        audio_stream.close()
+
+
 def process_podcast_background(podcast_id: str, job_id: str, s3_key: str):
     """
     后台处理播客生成
@@ -112,12 +225,19 @@ def process_podcast_background(podcast_id: str, job_id: str, s3_key: str):
             "progress": 10
         })
         
-        # 1. 从 S3 下载文件
-        print("📥 步骤 1/5: 从 S3 下载文件...")
-        file_content = s3_storage.download_file(s3_key)
+        podcast = data_service.get_podcast(podcast_id)
+        filename = podcast.get('original_filename', 'unknown.txt')
+        file_ext = filename.lower().split('.')[-1]
         
-        if not file_content:
-            raise Exception("无法从 S3 下载文件")
+        # 判断是否为音频文件
+        is_audio_file = file_ext in ['mp3', 'wav', 'mp4', 'mov']
+        
+        # 1. 从 S3 下载文件（音频文件在转录时才打开流，边读边上传，不在内存中缓存整个文件）
+        print("📥 步骤 1/5: 从 S3 下载文件...")
+        if not is_audio_file:
+            file_content = s3_storage.download_file(s3_key)
+            if not file_content:
+                raise Exception("无法从 S3 下载文件")
         
         data_service.update_job(job_id, {
             "progress": 20,
@@ -130,14 +250,16 @@ def process_podcast_background(podcast_id: str, job_id: str, s3_key: str):
             "progress": 25,
             "status_message": "📝 提取文本内容..."
         })
-        podcast = data_service.get_podcast(podcast_id)
-        filename = podcast.get('original_filename', 'unknown.txt')
-        file_ext = filename.lower().split('.')[-1]
-        
-        # 判断是否为音频文件
-        is_audio_file = file_ext in ['mp3', 'wav', 'mp4', 'mov']
         
-        text = extract_text_from_file(file_content, filename)
+        if is_audio_file:
+            # 紧挨着转录打开流，由 transcribe_audio_stream 负责关闭，
+            # 中间没有可能抛出异常的步骤，不会泄漏连接池中的连接
+            s3_object = s3_storage.get_object_stream(s3_key)
+            if not s3_object:
+                raise Exception("无法从 S3 下载文件")
+            text = transcribe_audio_stream(s3_object['Body'], filename)
+        else:
+            text = extract_text_from_file(file_content, filename)
         print(f"   提取文本长度: {len(text)} 字符")
         print(f"   前100字符: {text[:100]}...")
         
@@ -207,7 +329,7 @@ def process_podcast_background(podcast_id: str, job_id: str, s3_key: str):
                     print(f"   ✂️  在空格处截断，最终长度: {len(text)} 字符")
             
             # 使用多声音对话API（自动检测是否为对话，如果不是对话则回退到单声音）
-            audio_data = ai_service.generate_dialogue_audio(text, detected_language)
+            audio_data = get_ai_service().generate_dialogue_audio(text, detected_language)
             
             if not audio_data:
                 raise Exception("音频生成失败")
@@ -338,12 +460,12 @@ def generate_podcast_background(podcast_id: str, job_id: str):
         
         # 1. 使用 Gemini 生成播客稿件
         print("🤖 步骤 1/5: 使用 Gemini AI 生成播客稿件...")
-        script = ai_service.generate_script_from_topic(
+        script = run_sync(get_ai_service().generate_script_from_topic(
             topic=topic,
             style=style,
             duration_minutes=duration_minutes,
             language=language
-        )
+        ), timeout=AI_CALL_TIMEOUT)
         
         if not script or len(script) < 50:
             raise Exception("生成的稿件太短或为空")
@@ -390,7 +512,7 @@ def generate_podcast_background(podcast_id: str, job_id: str):
                 print(f"   ✂️  在空格处截断，最终长度: {len(script)} 字符")
         
         # 使用多声音对话API（自动检测是否为对话，如果不是对话则回退到单声音）
-        audio_data = ai_service.generate_dialogue_audio(script, language)
+        audio_data = get_ai_service().generate_dialogue_audio(script, language)
         
         if not audio_data:
             raise Exception("音频生成失败")
@@ -430,25 +552,11 @@ def generate_podcast_background(podcast_id: str, job_id: str):
         generated_title = None
         try:
             # 使用脚本内容生成简洁的标题
-            title_prompt = f"""Based on this podcast script, create a concise, engaging title (max 60 characters):
-
-Script excerpt: {script[:500]}
-
-Title should be:
-- Clear and descriptive
-- Professional and engaging
-- Maximum 60 characters
-- No quotes or special formatting
-
-Title:"""
-            
-            generated_title = ai_service._call_gemini_api(title_prompt, temperature=0.7, max_tokens=50)
+            generated_title = run_sync(get_ai_service().generate_title(
+                "podcast script",
+                f"Script excerpt: {script[:500]}"
+            ), timeout=AI_CALL_TIMEOUT)
             if generated_title:
-                # 清理标题（去除引号、换行等）
-                generated_title = generated_title.strip().strip('"').strip("'").replace('\n', ' ')
-                # 限制长度
-                if len(generated_title) > 60:
-                    generated_title = generated_title[:57] + "..."
                 print(f"✅ 标题生成成功: {generated_title}")
         except Exception as e:
             print(f"⚠️  标题生成失败，使用原标题: {e}")
@@ -513,7 +621,7 @@ Title:"""
 
 def start_processing_task(podcast_id: str, job_id: str, s3_key: str):
     """
-    启动后台处理任务（在新线程中）
+    启动后台处理任务（提交到后台任务线程池）
     根据任务类型路由到不同的处理函数
     
     Args:
@@ -533,22 +641,13 @@ def start_processing_task(podcast_id: str, job_id: str, s3_key: str):
     if job_type == "generate":
         # AI 生成播客
         print(f"🤖 启动 AI 生成任务...")
-        thread = threading.Thread(
-            target=generate_podcast_background,
-            args=(podcast_id, job_id)
-        )
+        submit_background_task(generate_podcast_background, podcast_id, job_id)
     else:
         # 文件上传处理
         print(f"📁 启动文件处理任务...")
-        thread = threading.Thread(
-            target=process_podcast_background,
-            args=(podcast_id, job_id, s3_key)
-        )
-    
-    thread.daemon = True
-    thread.start()
+        submit_background_task(process_podcast_background, podcast_id, job_id, s3_key)
     
-    print(f"✅ 后台任务已启动 (Thread ID: {thread.ident}, Type: {job_type})")
+    print(f"✅ 后台任务已提交 (Type: {job_type})")
 
 
 
@@ -617,27 +716,20 @@ def analyze_generate_podcast_background(podcast_id: str, job_id: str, s3_key: st
         
         # 导入 ContentExtractor
         from app.services.content_extractor import content_extractor
-        import asyncio
         
-        # 在后台线程中运行异步函数
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        try:
-            # 获取原始文件名
-            from pathlib import Path
-            filename = Path(s3_key).name
-            
-            # 提取内容
-            extraction_result = loop.run_until_complete(
-                content_extractor.extract_from_file(
-                    file_content=file_content,
-                    filename=filename,
-                    enhancement_prompt=enhancement_prompt
-                )
-            )
-        finally:
-            loop.close()
+        # 获取原始文件名
+        from pathlib import Path
+        filename = Path(s3_key).name
+        
+        # 提取内容（在共享的后台事件循环中运行异步函数）
+        extraction_result = run_sync(
+            content_extractor.extract_from_file(
+                file_content=file_content,
+                filename=filename,
+                enhancement_prompt=enhancement_prompt
+            ),
+            timeout=AI_CALL_TIMEOUT
+        )
         
         transcript = extraction_result.get('transcript', '')
         summary = extraction_result.get('summary', '')
@@ -682,12 +774,12 @@ def analyze_generate_podcast_background(podcast_id: str, job_id: str, s3_key: st
             topic_prompt += f"\n特别关注：{enhancement_prompt}\n"
         
         # 使用 AI 服务生成播客脚本
-        script = ai_service.generate_script_from_topic(
+        script = run_sync(get_ai_service().generate_script_from_topic(
             topic=topic_prompt,
             style=style,
             duration_minutes=duration_minutes,
             language=language
-        )
+        ), timeout=AI_CALL_TIMEOUT)
         
         if not script or len(script) < 50:
             raise Exception("生成的脚本太短或为空")
@@ -720,7 +812,7 @@ def analyze_generate_podcast_background(podcast_id: str, job_id: str, s3_key: st
             print(f"   截取后: {len(script)} 字符")
         
         # 生成音频
-        audio_data = ai_service.generate_dialogue_audio(script, language=language)
+        audio_data = get_ai_service().generate_dialogue_audio(script, language=language)
         
         if not audio_data or len(audio_data) < 1000:
             raise Exception("音频生成失败或音频太小")
@@ -750,26 +842,11 @@ def analyze_generate_podcast_background(podcast_id: str, job_id: str, s3_key: st
         generated_title = None
         try:
             # 使用summary和topics生成简洁的标题
-            title_prompt = f"""Based on this podcast summary, create a concise, engaging title (max 60 characters):
-
-Summary: {summary[:300]}
-Topics: {', '.join(topics[:3])}
-
-Title should be:
-- Clear and descriptive
-- Professional and engaging
-- Maximum 60 characters
-- No quotes or special formatting
-
-Title:"""
-            
-            generated_title = ai_service._call_gemini_api(title_prompt, temperature=0.7, max_tokens=50)
+            generated_title = run_sync(get_ai_service().generate_title(
+                "podcast summary",
+                f"Summary: {summary[:300]}\nTopics: {', '.join(topics[:3])}"
+            ), timeout=AI_CALL_TIMEOUT)
             if generated_title:
-                # 清理标题（去除引号、换行等）
-                generated_title = generated_title.strip().strip('"').strip("'").replace('\n', ' ')
-                # 限制长度
-                if len(generated_title) > 60:
-                    generated_title = generated_title[:57] + "..."
                 print(f"✅ 标题生成成功: {generated_title}")
         except Exception as e:
             print(f"⚠️  标题生成失败，使用备用标题: {e}")
@@ -831,20 +908,15 @@ Title:"""
 
 def start_analyze_generate_task(podcast_id: str, job_id: str, s3_key: str):
     """
-    启动分析并生成任务（在新线程中）
+    启动分析并生成任务（提交到后台任务线程池）
     
     Args:
         podcast_id: 播客ID
         job_id: 任务ID
         s3_key: S3 文件键
     """
-    thread = threading.Thread(
-        target=analyze_generate_podcast_background,
-        args=(podcast_id, job_id, s3_key)
-    )
-    thread.daemon = True
-    thread.start()
-    print(f"✅ 后台分析生成任务已启动")
+    submit_background_task(analyze_generate_podcast_background, podcast_id, job_id, s3_key)
+    print(f"✅ 后台分析生成任务已提交")
 
 
 def youtube_generate_podcast_background(podcast_id: str, job_id: str, youtube_url: str):
@@ -894,21 +966,16 @@ def youtube_generate_podcast_background(podcast_id: str, job_id: str, youtube_ur
         # 1. 从 YouTube 提取内容
         print("\n📥 步骤 1/5: 从 YouTube 提取内容...")
         from app.services.youtube_extractor import youtube_extractor
-        import asyncio
-        
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
         
-        try:
-            extraction_result = loop.run_until_complete(
-                youtube_extractor.extract_content(
-                    url=youtube_url,
-                    language=language,
-                    enhancement_prompt=enhancement_prompt
-                )
-            )
-        finally:
-            loop.close()
+        # 在共享的后台事件循环中运行异步函数
+        extraction_result = run_sync(
+            youtube_extractor.extract_content(
+                url=youtube_url,
+                language=language,
+                enhancement_prompt=enhancement_prompt
+            ),
+            timeout=AI_CALL_TIMEOUT
+        )
         
         transcript = extraction_result.get('transcript', '')
         summary = extraction_result.get('summary', '')
@@ -976,12 +1043,12 @@ Original Content (Excerpt):
                 topic_prompt += f"\nSpecial Focus: {enhancement_prompt}\n"
         
         # 使用 AI 服务生成播客脚本
-        script = ai_service.generate_script_from_topic(
+        script = run_sync(get_ai_service().generate_script_from_topic(
             topic=topic_prompt,
             style=style,
             duration_minutes=duration_minutes,
             language=language
-        )
+        ), timeout=AI_CALL_TIMEOUT)
         
         if not script or len(script) < 50:
             raise Exception("生成的脚本太短或为空")
@@ -1014,7 +1081,7 @@ Original Content (Excerpt):
             print(f"   截取后: {len(script)} 字符")
         
         # 生成音频
-        audio_data = ai_service.generate_dialogue_audio(script, language=language)
+        audio_data = get_ai_service().generate_dialogue_audio(script, language=language)
         
         if not audio_data or len(audio_data) < 1000:
             raise Exception("音频生成失败或音频太小")
@@ -1043,25 +1110,13 @@ Original Content (Excerpt):
         print("\n📝 生成播客标题...")
         generated_title = None
         try:
-            title_prompt = f"""Based on this YouTube video podcast, create a concise, engaging title (max 60 characters):
-
-Video Title: {youtube_metadata.get('title', '')}
-Summary: {summary[:300]}
-Topics: {', '.join(topics[:3])}
-
-Title should be:
-- Clear and descriptive
-- Professional and engaging
-- Maximum 60 characters
-- No quotes or special formatting
-
-Title:"""
-            
-            generated_title = ai_service._call_gemini_api(title_prompt, temperature=0.7, max_tokens=50)
+            generated_title = run_sync(get_ai_service().generate_title(
+                "YouTube video podcast",
+                f"Video Title: {youtube_metadata.get('title', '')}\n"
+                f"Summary: {summary[:300]}\n"
+                f"Topics: {', '.join(topics[:3])}"
+            ), timeout=AI_CALL_TIMEOUT)
             if generated_title:
-                generated_title = generated_title.strip().strip('"').strip("'").replace('\n', ' ')
-                if len(generated_title) > 60:
-                    generated_title = generated_title[:57] + "..."
                 print(f"✅ 标题生成成功: {generated_title}")
         except Exception as e:
             print(f"⚠️  标题生成失败: {e}")
@@ -1119,17 +1174,12 @@ Title:"""
 
 def start_youtube_generate_task(podcast_id: str, job_id: str, youtube_url: str):
     """
-    启动 YouTube 生成任务（在新线程中）
+    启动 YouTube 生成任务（提交到后台任务线程池）
     
     Args:
         podcast_id: 播客ID
         job_id: 任务ID
         youtube_url: YouTube 视频链接
     """
-    thread = threading.Thread(
-        target=youtube_generate_podcast_background,
-        args=(podcast_id, job_id, youtube_url)
-    )
-    thread.daemon = True
-    thread.start()
-    print(f"✅ 后台 YouTube 生成任务已启动")
+    submit_background_task(youtube_generate_podcast_background, podcast_id, job_id, youtube_url)
+    print(f"✅ 后台 YouTube 生成任务已提交")
@@ -0,0 +1,89 @@
+"""
+后台事件循环
+后台任务运行在普通线程中，通过同一个常驻事件循环执行异步调用，
+使共享的 httpx.AsyncClient 等绑定事件循环的资源可以在任务之间复用
+"""
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional, TypeVar
+
+from app.utils.http_client import close_async_client
+
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """获取后台事件循环（首次调用时在守护线程中启动）"""
+    global _loop, _thread
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(
+                target=_loop.run_forever,
+                name="background-event-loop",
+                daemon=True
+            )
+            _thread.start()
+        return _loop
+
+
+def run_sync(coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+    """
+    在后台事件循环中执行协程，并阻塞等待结果（供后台任务线程调用）
+    
+    Args:
+        coro: 要执行的协程
+        timeout: 最长等待时间（秒），None 表示一直等待
+    
+    Returns:
+        协程的返回值（协程抛出的异常会原样抛出）
+    
+    Raises:
+        TimeoutError: 超过 timeout 仍未完成（协程随即被取消）
+        concurrent.futures.CancelledError: 事件循环关闭时协程被取消
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_background_loop())
+    try:
+        return future.result(timeout)
+    except TimeoutError:
+        future.cancel()
+        raise
+
+
+async def _cancel_pending_tasks():
+    """取消事件循环上其余所有任务并等待取消完成"""
+    current = asyncio.current_task()
+    tasks = [task for task in asyncio.all_tasks() if task is not current]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def stop_background_loop():
+    """
+    停止后台事件循环
+    
+    先取消循环上仍在执行的协程（阻塞在 run_sync 中的任务线程随即收到 CancelledError，
+    而不是永远等待），再关闭共享客户端并停止事件循环
+    """
+    global _loop, _thread
+    with _lock:
+        loop, thread = _loop, _thread
+        _loop, _thread = None, None
+    
+    if loop is None or loop.is_closed():
+        return
+    
+    try:
+        asyncio.run_coroutine_threadsafe(_cancel_pending_tasks(), loop).result(timeout=5)
+        asyncio.run_coroutine_threadsafe(close_async_client(), loop).result(timeout=5)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout=5)
+        loop.close()
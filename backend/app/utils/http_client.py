@@ -0,0 +1,74 @@
+"""
+共享 HTTP 客户端
+按事件循环复用 httpx.AsyncClient（连接池 + HTTP/2），避免每次请求都重新建立 TCP/TLS 连接
+"""
+import asyncio
+import importlib.util
+import threading
+import weakref
+
+import httpx
+from typing import Optional
+
+
+# HTTP/2 需要 h2 包（httpx[http2]），未安装时退回 HTTP/1.1
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+DEFAULT_TIMEOUT = httpx.Timeout(180.0, connect=10.0)
+DEFAULT_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+
+# httpx.AsyncClient 的连接绑定在创建它的事件循环上，因此每个事件循环一个客户端
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+# 同步客户端（供 ElevenLabs SDK 等同步调用方使用）在所有线程间共享
+_sync_client: Optional[httpx.Client] = None
+_sync_client_lock = threading.Lock()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    获取当前事件循环的共享 AsyncClient（首次调用时创建）
+    
+    Returns:
+        httpx.AsyncClient
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=DEFAULT_TIMEOUT,
+            limits=DEFAULT_LIMITS
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_async_client():
+    """关闭当前事件循环的共享 AsyncClient"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def get_sync_client() -> httpx.Client:
+    """
+    获取进程内共享的同步 httpx.Client（首次调用时创建）
+    
+    httpx.Client 是线程安全的，后台任务线程共用同一个连接池，
+    保持长连接以跳过每次请求的 TCP/TLS 握手。
+    客户端在进程生命周期内一直存在（ElevenLabs SDK 在初始化时持有其引用）
+    
+    Returns:
+        httpx.Client
+    """
+    global _sync_client
+    with _sync_client_lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                timeout=DEFAULT_TIMEOUT,
+                limits=DEFAULT_LIMITS
+            )
+        return _sync_client
+
@@ -0,0 +1,97 @@
+"""
+重试工具
+为异步调用提供带抖动的指数退避重试
+"""
+import asyncio
+import functools
+import logging
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Tuple, Type
+
+
+logger = logging.getLogger(__name__)
+
+
+def backoff_delay(attempt: int, initial: float = 1.0, max_delay: float = 30.0, jitter: float = 1.0) -> float:
+    """
+    计算第 attempt 次失败后的等待时间
+    
+    Args:
+        attempt: 已失败的次数（从1开始）
+        initial: 首次等待时间（秒）
+        max_delay: 最长等待时间（秒）
+        jitter: 随机抖动上限（秒），避免多个任务同时重试
+    
+    Returns:
+        等待时间（秒）
+    """
+    return min(max_delay, initial * 2 ** (attempt - 1) + random.uniform(0, jitter))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析 Retry-After 响应头
+    
+    Args:
+        value: 秒数（如 "30"）或 HTTP 日期（如 "Wed, 21 Oct 2015 07:28:00 GMT"）
+    
+    Returns:
+        需要等待的秒数；缺失或无法解析时返回 None
+    """
+    if not value:
+        return None
+    
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def async_retry(
+    retry_on: Tuple[Type[BaseException], ...],
+    attempts: int = 4,
+    initial: float = 1.0,
+    max_delay: float = 30.0
+):
+    """
+    异步函数重试装饰器（指数退避 + 抖动）
+    
+    只有 retry_on 中的异常会触发重试，其他异常直接抛出；
+    异常带有 retry_after 属性（如来自 Retry-After 响应头）时，至少等待该时长；
+    重试次数用完后抛出最后一次的异常
+    
+    Args:
+        retry_on: 可重试的异常类型
+        attempts: 最多尝试次数（包含首次调用）
+        initial: 首次等待时间（秒）
+        max_delay: 最长等待时间（秒）
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            for attempt in range(1, attempts + 1):
+                try:
+                    return await func(*args, **kwargs)
+                except retry_on as e:
+                    if attempt >= attempts:
+                        raise
+                    delay = backoff_delay(attempt, initial, max_delay)
+                    retry_after = getattr(e, "retry_after", None)
+                    if retry_after is not None:
+                        delay = max(delay, retry_after)
+                    logger.warning(
+                        "⚠️  %s 第 %d/%d 次调用失败，%.1f 秒后重试: %s",
+                        func.__qualname__, attempt, attempts, delay, e
+                    )
+                    await asyncio.sleep(delay)
+        return wrapper
+    return decorator
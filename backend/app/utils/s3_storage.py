@@ -3,14 +3,57 @@ AWS S3 存储服务
 提供文件上传、下载、删除和预签名 URL 生成功能
 """
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError, NoCredentialsError
 from botocore.config import Config
+import asyncio
+import io
+import threading
 import uuid
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, BinaryIO
+from typing import Optional, BinaryIO, List, AsyncIterator
+from urllib.parse import quote
 from app.config import settings
 
 
+@lru_cache(maxsize=4096)
+def build_content_disposition(filename: str, disposition: str = "attachment") -> str:
+    """
+    构建 Content-Disposition 头（RFC 6266 格式，支持中文文件名）
+    
+    Args:
+        filename: 文件名
+        disposition: attachment（下载）或 inline（在浏览器中播放）
+    
+    Returns:
+        Content-Disposition 头的值
+    """
+    return f"{disposition}; filename*=UTF-8''{quote(filename)}"
+
+
+class _QueueWriter(io.RawIOBase):
+    """
+    download_fileobj 的写入端（不可 seek）
+    
+    把下载线程写入的数据块放入事件循环中的有界队列，队列满时阻塞写入线程（背压）
+    """
+    
+    def __init__(self, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop, closed: threading.Event):
+        self._queue = queue
+        self._loop = loop
+        self._closed = closed
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        if self._closed.is_set():
+            raise IOError("读取端已关闭，停止下载")
+        asyncio.run_coroutine_threadsafe(self._queue.put(bytes(data)), self._loop).result()
+        return len(data)
+
+
 class S3Storage:
     """S3 存储服务类"""
     
@@ -30,6 +73,19 @@ class S3Storage:
             config=self.config
         )
         
+        # 分片上传配置：大文件自动走 multipart，每片 8MB，内存占用与文件大小无关
+        self.transfer_config = TransferConfig(
+            multipart_chunksize=8 * 1024 * 1024,
+            use_threads=True
+        )
+        
+        # 分段并行下载配置：用于后端代理整个音频文件
+        self.download_config = TransferConfig(
+            multipart_chunksize=8 * 1024 * 1024,
+            max_concurrency=4,
+            use_threads=True
+        )
+        
         self.bucket = settings.aws_s3_bucket
         self.region = settings.aws_region
     
@@ -38,7 +94,7 @@ class S3Storage:
         # 获取文件扩展名
         suffix = Path(original_filename).suffix
         # 生成 UUID 文件名
-        unique_name = f"{uuid.uuid4()}{suffix}"
+        unique_name = f"{uuid.uuid4().hex}{suffix}"
         # 返回完整路径
         return f"{prefix}/{unique_name}"
     
@@ -91,6 +147,56 @@ class S3Storage:
             print(f"❌ 上传异常: {e}")
             return None
     
+    def upload_fileobj(
+        self,
+        file_obj: BinaryIO,
+        original_filename: str,
+        prefix: str = "uploads",
+        content_type: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        流式上传文件对象到 S3（不把整个文件读入内存）
+        
+        使用 boto3 的 upload_fileobj，超过分片阈值时自动分片上传，
+        适合直接传入 UploadFile.file（SpooledTemporaryFile）
+        
+        Args:
+            file_obj: 可读的文件对象（需位于起始位置）
+            original_filename: 原始文件名
+            prefix: S3 键前缀
+            content_type: 文件 MIME 类型
+        
+        Returns:
+            S3 对象键，失败返回 None
+        """
+        try:
+            # 生成唯一键
+            key = self._generate_unique_key(original_filename, prefix)
+            
+            extra_args = {'ContentType': content_type} if content_type else None
+            
+            # 分片流式上传
+            self.s3_client.upload_fileobj(
+                file_obj,
+                self.bucket,
+                key,
+                ExtraArgs=extra_args,
+                Config=self.transfer_config
+            )
+            
+            print(f"✅ 文件上传成功: s3://{self.bucket}/{key}")
+            return key
+        
+        except NoCredentialsError:
+            print("❌ AWS 凭证错误")
+            return None
+        except ClientError as e:
+            print(f"❌ S3 上传失败: {e}")
+            return None
+        except Exception as e:
+            print(f"❌ 上传异常: {e}")
+            return None
+    
     def upload_file_with_key(
         self,
         file_data: bytes,
@@ -164,6 +270,111 @@ class S3Storage:
             print(f"❌ 下载异常: {e}")
             return None
     
+    def get_object_stream(self, key: str, range_header: Optional[str] = None) -> Optional[dict]:
+        """
+        获取 S3 对象的流式响应（支持 HTTP Range）
+        
+        Args:
+            key: S3 对象键
+            range_header: 客户端的 Range 头（如 "bytes=0-1023"），None 表示整个文件
+        
+        Returns:
+            get_object 响应（Body 为可按块读取的流），失败返回 None
+        
+        Raises:
+            ClientError: 请求的 Range 无法满足（InvalidRange）
+        """
+        try:
+            params = {
+                'Bucket': self.bucket,
+                'Key': key
+            }
+            if range_header:
+                params['Range'] = range_header
+            
+            return self.s3_client.get_object(**params)
+        
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            if error_code == 'InvalidRange':
+                raise
+            if error_code == 'NoSuchKey':
+                print(f"❌ 文件不存在: {key}")
+            else:
+                print(f"❌ S3 读取失败: {e}")
+            return None
+        except Exception as e:
+            print(f"❌ 读取异常: {e}")
+            return None
+    
+    def get_object_size(self, key: str) -> Optional[int]:
+        """
+        获取 S3 对象大小（字节）
+        
+        Args:
+            key: S3 对象键
+        
+        Returns:
+            对象大小，失败返回 None
+        """
+        try:
+            response = self.s3_client.head_object(Bucket=self.bucket, Key=key)
+            return response['ContentLength']
+        
+        except ClientError as e:
+            print(f"❌ 获取文件信息失败: {e}")
+            return None
+        except Exception as e:
+            print(f"❌ 获取文件信息异常: {e}")
+            return None
+    
+    async def iter_object_chunks(self, key: str, max_buffered_chunks: int = 4) -> AsyncIterator[bytes]:
+        """
+        流式读取整个 S3 对象
+        
+        后台线程用 download_fileobj 分段并行下载，数据块经有界队列按顺序产出，
+        内存占用与文件大小无关
+        
+        Args:
+            key: S3 对象键
+            max_buffered_chunks: 队列中最多缓存的数据块数量
+        
+        Yields:
+            按顺序的数据块
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffered_chunks)
+        closed = threading.Event()
+        writer = _QueueWriter(queue, loop, closed)
+        
+        def download():
+            try:
+                self.s3_client.download_fileobj(
+                    self.bucket, key, writer, Config=self.download_config
+                )
+                result = None  # None 表示下载完成
+            except Exception as e:
+                result = e
+            if not closed.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(result), loop).result()
+        
+        producer = loop.run_in_executor(None, download)
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    print(f"❌ S3 流式读取失败: {item}")
+                    raise item
+                yield item
+        finally:
+            # 读取端提前结束（如客户端断开）时，通知下载线程停止，并释放可能阻塞的写入
+            closed.set()
+            while not queue.empty():
+                queue.get_nowait()
+            await producer
+    
     def delete_file(self, key: str) -> bool:
         """
         删除 S3 文件
@@ -189,6 +400,45 @@ class S3Storage:
             print(f"❌ 删除异常: {e}")
             return False
     
+    def delete_files(self, keys: List[str]) -> bool:
+        """
+        批量删除 S3 文件（单次 delete_objects 请求，最多 1000 个）
+        
+        Args:
+            keys: S3 对象键列表
+        
+        Returns:
+            是否全部成功删除
+        """
+        if not keys:
+            return True
+        
+        try:
+            response = self.s3_client.delete_objects(
+                Bucket=self.bucket,
+                Delete={
+                    'Objects': [{'Key': key} for key in keys],
+                    'Quiet': True
+                }
+            )
+            
+            errors = response.get('Errors', [])
+            for error in errors:
+                print(f"❌ S3 删除失败: {error.get('Key')} ({error.get('Code')}: {error.get('Message')})")
+            
+            if errors:
+                return False
+            
+            print(f"✅ 文件删除成功: {', '.join(keys)}")
+            return True
+        
+        except ClientError as e:
+            print(f"❌ S3 批量删除失败: {e}")
+            return False
+        except Exception as e:
+            print(f"❌ 批量删除异常: {e}")
+            return False
+    
     def generate_presigned_url(self, key: str, expires_in: int = 3600, filename: str = None, force_download: bool = False) -> Optional[str]:
         """
         生成预签名下载 URL
@@ -210,11 +460,8 @@ class S3Storage:
             
             # 如果需要强制下载，添加 Content-Disposition 头
             if force_download:
-                from urllib.parse import quote
                 download_filename = filename if filename else key.split('/')[-1]
-                # 使用 RFC 6266 格式支持中文文件名
-                encoded_filename = quote(download_filename)
-                params['ResponseContentDisposition'] = f'attachment; filename*=UTF-8\'\'{encoded_filename}'
+                params['ResponseContentDisposition'] = build_content_disposition(download_filename)
             
             url = self.s3_client.generate_presigned_url(
                 'get_object',
@@ -0,0 +1,47 @@
+"""
+上传大小限制中间件
+在解析 multipart 请求体之前，根据 Content-Length 拒绝超大上传
+"""
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import settings
+
+
+# multipart 边界、各字段头等额外开销的余量
+MULTIPART_OVERHEAD = 1024 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    """
+    上传大小限制（纯 ASGI 中间件）
+    
+    FastAPI 会在调用路由函数之前把整个 multipart 请求体读入临时文件，
+    因此 validate_file 中的大小检查发生在数据已经落盘之后。
+    这里在读取请求体之前检查 Content-Length，超限直接返回 413。
+    """
+    
+    def __init__(self, app: ASGIApp, max_body_size: int = None):
+        self.app = app
+        self.max_body_size = max_body_size or settings.max_upload_size + MULTIPART_OVERHEAD
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and scope["method"] in ("POST", "PUT"):
+            headers = dict(scope["headers"])
+            content_type = headers.get(b"content-type", b"")
+            content_length = headers.get(b"content-length", b"")
+            
+            if (
+                content_type.startswith(b"multipart/form-data")
+                and content_length.isdigit()
+                and int(content_length) > self.max_body_size
+            ):
+                max_size_mb = settings.max_upload_size / (1024 * 1024)
+                response = JSONResponse(
+                    status_code=413,
+                    content={"detail": f"文件过大: {int(content_length) / (1024 * 1024):.2f}MB。最大允许: {max_size_mb}MB"}
+                )
+                await response(scope, receive, send)
+                return
+        
+        await self.app(scope, receive, send)
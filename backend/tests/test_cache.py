@@ -0,0 +1,54 @@
+"""
+测试 TTLCache 缓存工具
+"""
+import time
+from app.utils.cache import TTLCache
+
+
+def test_ttl_expiry():
+    """测试过期"""
+    print("=" * 50)
+    print("测试缓存过期")
+    print("=" * 50)
+    
+    cache = TTLCache(maxsize=10, ttl=0.05)
+    cache.set("a", 1)
+    print(f"\n1. 写入后读取: {cache.get('a')}")
+    assert cache.get("a") == 1
+    
+    time.sleep(0.1)
+    print(f"2. 过期后读取: {cache.get('a')}")
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    
+    print("\n✅ 缓存过期测试完成\n")
+
+
+def test_lru_eviction():
+    """测试容量淘汰"""
+    print("=" * 50)
+    print("测试 LRU 淘汰")
+    print("=" * 50)
+    
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # a 变为最近使用
+    cache.set("c", 3)  # 淘汰 b
+    
+    print(f"\n   a={cache.get('a')}, b={cache.get('b')}, c={cache.get('c')}")
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    
+    assert cache.pop("a") == 1
+    assert cache.get("a") is None
+    
+    print("\n✅ LRU 淘汰测试完成\n")
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始测试 TTLCache\n")
+    test_ttl_expiry()
+    test_lru_eviction()
+    print("✅ 所有测试通过！")
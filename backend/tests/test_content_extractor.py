@@ -8,7 +8,7 @@ from pathlib import Path
 # 添加父目录到 path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.services.content_extractor import content_extractor
+from app.services.content_extractor import ContentExtractor, content_extractor, strip_code_fences
 
 
 async def test_format_validation():
@@ -108,6 +108,94 @@ async def test_error_handling():
     print("\n✅ 错误处理测试完成")
 
 
+async def check_analysis_cache():
+    """测试相同内容重复提取时命中分析缓存"""
+    print("\n" + "="*60)
+    print("测试 6: 分析结果缓存")
+    print("="*60)
+    
+    extractor = ContentExtractor()
+    calls = []
+    
+    async def fake_analyze(media_content, filename, media_kind, enhancement_prompt=None):
+        calls.append(filename)
+        return {"transcript": "hello", "summary": "summary", "topics": ["a"]}
+    
+    extractor._analyze_media_with_gemini = fake_analyze
+    first = await extractor.extract_from_audio(b"same audio", "first.mp3")
+    second = await extractor.extract_from_audio(b"same audio", "second.mp3")
+    await extractor.extract_from_audio(b"same audio", "second.mp3", "关注技术细节")
+    
+    print(f"  Gemini 调用次数: {len(calls)}")
+    assert len(calls) == 2
+    assert second["transcript"] == first["transcript"]
+    assert second["original_filename"] == "second.mp3"
+    
+    print("\n✅ 分析缓存测试完成")
+
+
+def test_analysis_cache():
+    asyncio.run(check_analysis_cache())
+
+
+def test_strip_code_fences():
+    """测试去掉 markdown 代码块标记"""
+    print("\n" + "="*60)
+    print("测试 7: 代码块标记清理")
+    print("="*60)
+    
+    test_cases = [
+        ('```json\n{"a": 1}\n```', '{"a": 1}'),
+        ('```json\n{"a": 1}', '{"a": 1}'),
+        ('{"a": 1}\n```', '{"a": 1}'),
+        ('{"a": 1}', '{"a": 1}'),
+        ('```\n{"code": "x```y"}\n```', '{"code": "x```y"}'),
+    ]
+    
+    for text, expected in test_cases:
+        result = strip_code_fences(text)
+        status = "✅" if result == expected else "❌"
+        print(f"  {status} {text!r} -> {result!r}")
+        assert result == expected
+    
+    print("\n✅ 代码块标记清理测试完成")
+
+
+async def check_oversized_media():
+    """测试超过内联上限的文件在调用 Gemini 之前被拒绝"""
+    print("\n" + "="*60)
+    print("测试 8: 超大文件提前拒绝")
+    print("="*60)
+    
+    extractor = ContentExtractor()
+    extractor.use_file_api = False
+    extractor.max_inline_bytes = 10
+    calls = []
+    
+    async def fake_analyze(media_content, filename, media_kind, enhancement_prompt=None):
+        calls.append(filename)
+        return {"transcript": "hello", "summary": "summary", "topics": []}
+    
+    extractor._analyze_media_with_gemini = fake_analyze
+    try:
+        await extractor.extract_from_audio(b"x" * 11, "big.mp3")
+        assert False, "应该抛出异常"
+    except Exception as e:
+        print(f"  ✅ 正确拒绝超大文件: {e}")
+    assert calls == []
+    
+    # 启用 File API 时超大文件改为上传，不再拒绝
+    extractor.use_file_api = True
+    await extractor.extract_from_audio(b"x" * 11, "big.mp3")
+    assert calls == ["big.mp3"]
+    
+    print("\n✅ 超大文件测试完成")
+
+
+def test_oversized_media():
+    asyncio.run(check_oversized_media())
+
+
 async def main():
     """运行所有测试"""
     print("\n" + "🔬 ContentExtractor 服务测试")
@@ -126,6 +214,15 @@ async def main():
         # 测试 4: 错误处理
         await test_error_handling()
         
+        # 测试 6: 分析结果缓存
+        await check_analysis_cache()
+        
+        # 测试 7: 代码块标记清理
+        test_strip_code_fences()
+        
+        # 测试 8: 超大文件提前拒绝
+        await check_oversized_media()
+        
         print("\n" + "="*60)
         print("🎉 所有测试完成！")
         print("="*60)
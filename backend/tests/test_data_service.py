@@ -63,6 +63,49 @@ def test_podcast_operations():
     print("\n✅ 播客操作测试完成\n")
 
 
+def test_list_podcasts():
+    """测试分页查询播客"""
+    print("=" * 50)
+    print("测试分页查询播客")
+    print("=" * 50)
+    
+    # 1. 创建 3 个测试播客（创建时间递增）
+    keyword = f"分页测试-{uuid.uuid4().hex[:8]}"
+    test_podcasts = [
+        {
+            "id": str(uuid.uuid4()),
+            "title": f"{keyword} {i}",
+            "status": "completed",
+            "original_filename": "test.txt",
+            "created_at": f"2099-01-0{i + 1}T00:00:00"
+        }
+        for i in range(3)
+    ]
+    
+    print(f"\n1. 保存 {len(test_podcasts)} 个播客")
+    for podcast in test_podcasts:
+        data_service.save_podcast(podcast)
+    
+    try:
+        # 2. 第1页（每页2条），应按创建时间降序
+        print("\n2. 查询第1页（每页2条）")
+        rows, total = data_service.list_podcasts(page=1, limit=2, search=keyword.upper())
+        print(f"   返回 {len(rows)} 条，共 {total} 条")
+        assert total == 3
+        assert [p["id"] for p in rows] == [test_podcasts[2]["id"], test_podcasts[1]["id"]]
+        
+        # 3. 第2页
+        print("\n3. 查询第2页（每页2条）")
+        rows, total = data_service.list_podcasts(page=2, limit=2, search=keyword)
+        print(f"   返回 {len(rows)} 条，共 {total} 条")
+        assert [p["id"] for p in rows] == [test_podcasts[0]["id"]]
+    finally:
+        for podcast in test_podcasts:
+            data_service.delete_podcast(podcast["id"])
+    
+    print("\n✅ 分页查询测试完成\n")
+
+
 def test_job_operations():
     """测试任务操作"""
     print("=" * 50)
@@ -114,12 +157,58 @@ def test_job_operations():
     print("\n✅ 任务操作测试完成\n")
 
 
+
+def test_podcast_cache_stale_read():
+    """测试读取期间有更新提交时，读到的旧数据不会写回缓存"""
+    print("=" * 50)
+    print("测试播客缓存并发失效")
+    print("=" * 50)
+    
+    podcast_id = str(uuid.uuid4())
+    data_service.save_podcast({"id": podcast_id, "title": "旧标题", "status": "processing"})
+    real_get_connection = data_service._get_connection
+    
+    class StaleReadConnection:
+        """读取完旧数据后、写入缓存前，模拟另一线程提交更新"""
+        
+        def execute(self, sql, params=()):
+            row = real_get_connection().execute(sql, params).fetchone()
+            del data_service._get_connection
+            data_service.update_podcast(podcast_id, {"title": "新标题"})
+            return StaleCursor(row)
+    
+    class StaleCursor:
+        def __init__(self, row):
+            self.row = row
+        
+        def fetchone(self):
+            return self.row
+    
+    try:
+        data_service._get_connection = lambda: StaleReadConnection()
+        stale = data_service.get_podcast(podcast_id)
+        fresh = data_service.get_podcast(podcast_id)
+        print(f"   并发读取: {stale['title']}，再次读取: {fresh['title']}")
+        assert stale["title"] == "旧标题"
+        assert fresh["title"] == "新标题"
+    finally:
+        data_service.__dict__.pop("_get_connection", None)
+        data_service.delete_podcast(podcast_id)
+    
+    # 删除后不保留失效记录
+    assert podcast_id not in data_service._podcast_generations
+    assert data_service.get_podcast(podcast_id) is None
+    
+    print("\n✅ 缓存并发失效测试完成\n")
+
 if __name__ == "__main__":
     print("\n🚀 开始测试 DataService\n")
     
     try:
         test_podcast_operations()
+        test_list_podcasts()
         test_job_operations()
+        test_podcast_cache_stale_read()
         
         print("=" * 50)
         print("✅ 所有测试通过！")
@@ -2,16 +2,121 @@
 端到端测试：analyze-and-generate 完整流程
 使用真实音频文件测试完整的分析和生成流程
 """
+import atexit
 import httpx
+import orjson
+import os
+import random
 import time
 from pathlib import Path
 
 BASE_URL = "http://localhost:18188"
 TEST_FILE = Path(__file__).parent.parent.parent / "upload_files" / "NoteGPT_AI_Podcast_AP Biology Course and Exam Description (2025).mp3"
 
+# 模块级共享客户端：所有请求（包括重复运行的测试）复用到后端的 TCP 连接，进程退出时关闭
+_CLIENT = httpx.Client(base_url=BASE_URL)
+atexit.register(_CLIENT.close)
+
+# 任务轮询间隔：从 POLL_INITIAL_DELAY 开始按 POLL_BACKOFF 倍增长，最长 POLL_MAX_DELAY 秒
+POLL_INITIAL_DELAY = 0.3
+POLL_BACKOFF = 1.5
+POLL_MAX_DELAY = 5.0
+
+# 只上传测试音频的前 500KB 用于快速测试
+UPLOAD_LIMIT_BYTES = 500 * 1024
+
+
+class LimitedFile:
+    """
+    只暴露文件前 limit 字节的只读文件对象
+    
+    httpx 按块调用 read() 把文件流式写入请求体，并通过 seek/tell 得到 Content-Length，
+    无需先把整段内容读入内存
+    """
+    
+    def __init__(self, file, limit: int):
+        self._file = file
+        # 文件比 limit 短时以实际大小为准，否则 Content-Length 会大于实际发送的字节数
+        self._limit = min(limit, os.fstat(file.fileno()).st_size)
+        self._pos = 0
+    
+    def read(self, size: int = -1) -> bytes:
+        remaining = self._limit - self._pos
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        data = self._file.read(size)
+        self._pos += len(data)
+        return data
+    
+    def tell(self) -> int:
+        return self._pos
+    
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self._pos, os.SEEK_END: self._limit}[whence]
+        self._pos = max(0, min(base + offset, self._limit))
+        self._file.seek(self._pos)
+        return self._pos
+
+
+def _next_delay(delay: float) -> float:
+    """
+    计算下一次轮询前的等待时间（指数退避 + 少量随机抖动）
+    
+    快速完成的任务一两次轮询即可结束，耗时长的任务轮询次数也大幅减少
+    
+    Args:
+        delay: 当前等待时间（秒）
+    
+    Returns:
+        下一次等待时间（秒）
+    """
+    return min(delay * POLL_BACKOFF, POLL_MAX_DELAY) + random.uniform(0, 0.15)
+
+
+def _iter_job_events(client: httpx.Client, job_id: str, timeout: float):
+    """
+    订阅任务事件流（SSE），逐个返回服务端推送的任务状态
+    
+    Args:
+        client: 指向后端服务的 HTTP 客户端
+        job_id: 任务ID
+        timeout: 最长监控时间（秒）
+    
+    Yields:
+        任务状态字典；收到心跳时为 None（供调用方检查耗时）
+    """
+    deadline = time.time() + timeout
+    # 服务端无变化时每 15 秒发送一次心跳，读超时需大于心跳间隔
+    with client.stream("GET", f"/api/v1/jobs/{job_id}/events", timeout=httpx.Timeout(10.0, read=30.0)) as response:
+        if response.status_code != 200:
+            print(f"❌ 订阅任务事件失败: {response.status_code}")
+            return
+        
+        for line in response.iter_lines():
+            if line.startswith("data: "):
+                yield orjson.loads(line[len("data: "):])
+            elif line.startswith(":"):
+                yield None
+            
+            if time.time() >= deadline:
+                return
+
 
 def test_full_flow():
     """测试完整的分析和生成流程"""
+    return _run_full_flow(_CLIENT)
+
+
+def _run_full_flow(client: httpx.Client):
+    """
+    执行完整流程
+    
+    Args:
+        client: 指向后端服务的 HTTP 客户端
+    
+    Returns:
+        流程是否成功完成
+    """
     print("\n" + "="*80)
     print("🧪 端到端测试：analyze-and-generate 完整流程")
     print("="*80)
@@ -27,24 +132,22 @@ def test_full_flow():
     print(f"   文件: {TEST_FILE.name}")
     print(f"   大小: {TEST_FILE.stat().st_size / 1024:.1f} KB")
     
-    # 读取文件（限制大小用于测试）
+    # 直接从磁盘流式上传（限制大小用于测试），不把文件内容读入内存
     with open(TEST_FILE, 'rb') as f:
-        # 只读取前 500KB 用于快速测试
-        file_content = f.read(500 * 1024)
-    
-    files = {'file': ('test_audio.mp3', file_content, 'audio/mpeg')}
-    upload_response = httpx.post(
-        f"{BASE_URL}/api/v1/podcasts/upload",
-        files=files,
-        timeout=30.0
-    )
+        upload_file = LimitedFile(f, UPLOAD_LIMIT_BYTES)
+        files = {'file': ('test_audio.mp3', upload_file, 'audio/mpeg')}
+        upload_response = client.post(
+            "/api/v1/podcasts/upload",
+            files=files,
+            timeout=30.0
+        )
     
     if upload_response.status_code != 200:
         print(f"❌ 文件上传失败: {upload_response.status_code}")
         print(f"响应: {upload_response.text}")
         return False
     
-    upload_data = upload_response.json()
+    upload_data = orjson.loads(upload_response.content)
     upload_podcast_id = upload_data['podcast_id']
     upload_job_id = upload_data['job_id']
     
@@ -55,28 +158,34 @@ def test_full_flow():
     # 等待上传任务完成
     print("\n⏳ 等待上传任务完成...")
     s3_key = None
+    last_state = None
+    # 轮询的路径和参数每次相同，循环前构建一次
+    upload_job_path = f"/api/v1/jobs/{upload_job_id}"
+    upload_job_params = {"include": "podcast"}
+    start_time = time.time()
+    delay = POLL_INITIAL_DELAY
     
-    for i in range(60):  # 最多等待60秒
-        time.sleep(1)
-        job_response = httpx.get(f"{BASE_URL}/api/v1/jobs/{upload_job_id}")
+    while time.time() - start_time < 60:  # 最多等待60秒
+        time.sleep(delay)
+        delay = _next_delay(delay)
+        job_response = client.get(upload_job_path, params=upload_job_params)
         
         if job_response.status_code == 200:
-            job_data = job_response.json()
+            job_data = orjson.loads(job_response.content)
             status = job_data['status']
             progress = job_data.get('progress', 0)
             
-            if i % 5 == 0:  # 每5秒打印一次
-                print(f"   [{i}s] {progress}% - {status}")
+            # 只在进度或状态改变时打印
+            if (progress, status) != last_state:
+                print(f"   [{int(time.time() - start_time)}s] {progress}% - {status}")
+                last_state = (progress, status)
             
             if status == 'completed':
-                # 获取 S3 key
-                podcast_response = httpx.get(f"{BASE_URL}/api/v1/podcasts/{upload_podcast_id}")
-                if podcast_response.status_code == 200:
-                    podcast_data = podcast_response.json()
-                    s3_key = podcast_data.get('audio_s3_key')
-                    if s3_key:
-                        print(f"✅ 上传完成！S3 Key: {s3_key}")
-                        break
+                # 任务响应中附带了播客详情，直接读取 S3 key
+                s3_key = (job_data.get('podcast') or {}).get('audio_s3_key')
+                if s3_key:
+                    print(f"✅ 上传完成！S3 Key: {s3_key}")
+                    break
             elif status == 'failed':
                 print(f"❌ 上传任务失败: {job_data.get('error_message')}")
                 return False
@@ -109,8 +218,8 @@ def test_full_flow():
     print(f"   Language: {request_data['language']}")
     print(f"   Enhancement: {request_data['enhancement_prompt'][:50]}...")
     
-    analyze_response = httpx.post(
-        f"{BASE_URL}/api/v1/podcasts/analyze-and-generate",
+    analyze_response = client.post(
+        "/api/v1/podcasts/analyze-and-generate",
         json=request_data,
         timeout=10.0
     )
@@ -120,7 +229,7 @@ def test_full_flow():
         print(f"响应: {analyze_response.text}")
         return False
     
-    analyze_data = analyze_response.json()
+    analyze_data = orjson.loads(analyze_response.content)
     podcast_id = analyze_data['podcast_id']
     job_id = analyze_data['job_id']
     
@@ -144,16 +253,14 @@ def test_full_flow():
     print()
     
     last_message = ""
+    hint_shown = False
     start_time = time.time()
     
-    for i in range(300):  # 最多监控5分钟
-        time.sleep(2)
+    # 服务端在状态变化时推送，无需轮询；任务结束时推送的状态中附带播客详情
+    for job_data in _iter_job_events(client, job_id, timeout=300):  # 最多监控5分钟
         elapsed = int(time.time() - start_time)
         
-        job_response = httpx.get(f"{BASE_URL}/api/v1/jobs/{job_id}")
-        
-        if job_response.status_code == 200:
-            job_data = job_response.json()
+        if job_data is not None:
             status = job_data['status']
             progress = job_data.get('progress', 0)
             message = job_data.get('status_message', '')
@@ -164,11 +271,9 @@ def test_full_flow():
                 last_message = message
             
             if status == 'completed':
-                # 获取最终的播客信息
-                podcast_response = httpx.get(f"{BASE_URL}/api/v1/podcasts/{podcast_id}")
-                if podcast_response.status_code == 200:
-                    podcast_data = podcast_response.json()
-                    
+                # 任务事件中附带了最终的播客信息
+                podcast_data = job_data.get('podcast')
+                if podcast_data:
                     print("\n" + "="*80)
                     print("🎉 任务完成！")
                     print("="*80)
@@ -190,7 +295,8 @@ def test_full_flow():
                 return False
         
         # 如果超过60秒，提示用户可以继续等待
-        if elapsed == 60:
+        if elapsed >= 60 and not hint_shown:
+            hint_shown = True
             print("\n💡 提示：任务仍在进行中...")
             print(f"   Job ID: {job_id}")
             print(f"   可以使用以下命令查看后端日志:")
@@ -3,6 +3,7 @@
 """
 import requests
 import io
+import json
 
 BASE_URL = "http://localhost:18188"
 
@@ -58,6 +59,23 @@ def test_job_status_api():
             assert 'updated_at' in job, "缺少 updated_at 字段"
             
             print(f"   ✅ 数据完整性验证通过")
+            
+            # 附带关联播客详情，轮询方无需再请求播客接口
+            response = requests.get(f"{BASE_URL}/api/v1/jobs/{job_id}", params={"include": "podcast"})
+            assert response.status_code == 200, "include=podcast 查询失败"
+            assert response.json()['podcast']['id'] == podcast_id, "附带的播客不匹配"
+            
+            print(f"   ✅ 附带播客详情验证通过")
+            
+            # 事件流：连接建立后立即推送一次当前状态
+            with requests.get(f"{BASE_URL}/api/v1/jobs/{job_id}/events", stream=True, timeout=30) as response:
+                assert response.status_code == 200, "订阅任务事件失败"
+                assert response.headers['content-type'].startswith('text/event-stream'), "事件流类型错误"
+                first_line = next(response.iter_lines(decode_unicode=True))
+                assert first_line.startswith('data: '), "首条消息应为任务状态"
+                assert json.loads(first_line[len('data: '):])['id'] == job_id, "推送的任务不匹配"
+            
+            print(f"   ✅ 任务事件流验证通过")
         else:
             print(f"   ❌ 查询失败: {response.text}")
             return
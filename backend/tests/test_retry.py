@@ -0,0 +1,102 @@
+"""
+测试异步重试工具
+"""
+import asyncio
+from app.utils.retry import async_retry, backoff_delay, parse_retry_after
+
+
+class TransientError(Exception):
+    pass
+
+
+def test_retry_until_success():
+    """测试可重试异常会重试直到成功"""
+    print("=" * 50)
+    print("测试重试直到成功")
+    print("=" * 50)
+    
+    calls = []
+    
+    @async_retry(retry_on=(TransientError,), attempts=4, initial=0.01, max_delay=0.01)
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise TransientError("busy")
+        return "ok"
+    
+    result = asyncio.run(flaky())
+    print(f"\n   结果: {result}, 调用次数: {len(calls)}")
+    assert result == "ok"
+    assert len(calls) == 3
+    
+    print("\n✅ 重试测试完成\n")
+
+
+def test_non_retryable_error():
+    """测试不可重试异常直接抛出"""
+    print("=" * 50)
+    print("测试不可重试异常")
+    print("=" * 50)
+    
+    calls = []
+    
+    @async_retry(retry_on=(TransientError,), attempts=4, initial=0.01, max_delay=0.01)
+    async def broken():
+        calls.append(1)
+        raise ValueError("bad request")
+    
+    try:
+        asyncio.run(broken())
+        assert False, "应该抛出 ValueError"
+    except ValueError:
+        pass
+    print(f"\n   调用次数: {len(calls)}")
+    assert len(calls) == 1
+    
+    # 等待时间按指数增长并受上限约束
+    assert 1 <= backoff_delay(1, initial=1, max_delay=30) <= 2
+    assert backoff_delay(10, initial=1, max_delay=30) == 30
+    
+    print("\n✅ 不可重试异常测试完成\n")
+
+
+def test_retry_after():
+    """测试遵循 Retry-After 指定的等待时间"""
+    print("=" * 50)
+    print("测试 Retry-After")
+    print("=" * 50)
+    
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("not a date") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    
+    class RateLimited(Exception):
+        def __init__(self, retry_after):
+            super().__init__("rate limited")
+            self.retry_after = retry_after
+    
+    calls = []
+    
+    @async_retry(retry_on=(RateLimited,), attempts=2, initial=0.01, max_delay=0.01)
+    async def limited():
+        calls.append(asyncio.get_running_loop().time())
+        if len(calls) < 2:
+            raise RateLimited(retry_after=0.2)
+        return "ok"
+    
+    result = asyncio.run(limited())
+    waited = calls[1] - calls[0]
+    print(f"\n   结果: {result}, 等待: {waited:.2f}s")
+    assert result == "ok"
+    assert waited >= 0.2
+    
+    print("\n✅ Retry-After 测试完成\n")
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始测试 async_retry\n")
+    test_retry_until_success()
+    test_non_retryable_error()
+    test_retry_after()
+    print("✅ 所有测试通过！")
@@ -0,0 +1,280 @@
+"""
+测试 YouTubeExtractor 服务
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加父目录到 path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+import app.services.ai_service as ai_service
+import app.services.youtube_extractor as youtube_extractor_module
+from app.services.youtube_extractor import YouTubeExtractor, _validate_metadata
+
+
+TEST_URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+COMBINED_RESPONSE = """```json
+{
+  "metadata": {"title": "Test Video", "description": "desc", "duration": 120, "uploader": "Channel"},
+  "transcript": "full transcript",
+  "summary": "summary",
+  "topics": ["topic"],
+  "insights": ["insight"]
+}
+```"""
+
+ANALYSIS_RESPONSE = '{"transcript": "zh transcript", "summary": "zh summary", "topics": [], "insights": []}'
+
+
+class FakeAIService:
+    """记录调用的 Gemini 视频分析替身"""
+    
+    def __init__(self):
+        self.calls = []
+    
+    async def _call_gemini_api_with_video(self, url, prompt, temperature=0.3, max_tokens=3000):
+        self.calls.append(max_tokens)
+        return COMBINED_RESPONSE if '"metadata"' in prompt else ANALYSIS_RESPONSE
+
+
+async def check_combined_extraction():
+    """测试元数据和内容分析合并为一次 Gemini 调用"""
+    print("\n" + "="*60)
+    print("测试 1: 合并提取元数据和内容")
+    print("="*60)
+    
+    extractor = YouTubeExtractor()
+    fake = FakeAIService()
+    original = ai_service.get_ai_service
+    ai_service.get_ai_service = lambda: fake
+    try:
+        result = await extractor.extract_content(TEST_URL)
+        print(f"  Gemini 调用次数: {len(fake.calls)}")
+        assert len(fake.calls) == 1
+        assert result["metadata"]["title"] == "Test Video"
+        assert result["duration"] == 120
+        assert result["transcript"] == "full transcript"
+        
+        # 两份结果都已缓存：同一视频的另一种 URL 写法不再调用 Gemini
+        metadata = await extractor.extract_metadata("https://youtu.be/dQw4w9WgXcQ")
+        await extractor.extract_content("https://youtu.be/dQw4w9WgXcQ")
+        assert metadata["uploader"] == "Channel"
+        assert len(fake.calls) == 1
+        
+        # 元数据已缓存时只单独分析内容
+        result = await extractor.extract_content(TEST_URL, language="zh")
+        assert fake.calls == [3500, 3000]
+        assert result["summary"] == "zh summary"
+    finally:
+        ai_service.get_ai_service = original
+    
+    print("\n✅ 合并提取测试完成")
+
+
+def test_combined_extraction():
+    asyncio.run(check_combined_extraction())
+
+
+async def check_batch_extraction():
+    """测试多个视频合并为一次 Gemini 调用，响应无法拆分时逐个分析"""
+    print("\n" + "="*60)
+    print("测试 5: 批量提取")
+    print("="*60)
+    
+    class FakeBatchAIService(FakeAIService):
+        def __init__(self, batch_response):
+            super().__init__()
+            self.batch_response = batch_response
+        
+        async def _call_gemini_api_with_videos(self, urls, prompt, temperature=0.3, max_tokens=3000):
+            self.calls.append(len(urls))
+            return self.batch_response
+    
+    urls = [f"https://youtu.be/video{index}abcde" for index in range(3)]
+    item = COMBINED_RESPONSE.strip("`").removeprefix("json")
+    original = ai_service.get_ai_service
+    try:
+        extractor = YouTubeExtractor()
+        fake = FakeBatchAIService(f"[{item}, {item}, {item}]")
+        ai_service.get_ai_service = lambda: fake
+        results = await extractor.extract_content_batch(urls + urls[:1])
+        print(f"  Gemini 调用: {fake.calls}")
+        assert fake.calls == [3]
+        assert len(results) == 4
+        assert all(result["metadata"]["title"] == "Test Video" for result in results)
+        assert [result["metadata"]["video_id"] for result in results] == ["video0abcde", "video1abcde", "video2abcde", "video0abcde"]
+        
+        # 响应条目数与视频数不符时退回逐个分析
+        extractor = YouTubeExtractor()
+        fake = FakeBatchAIService(f"[{item}]")
+        ai_service.get_ai_service = lambda: fake
+        results = await extractor.extract_content_batch(urls[:2])
+        print(f"  Gemini 调用: {fake.calls}")
+        assert fake.calls == [2, 3500, 3500]
+        assert [result["transcript"] for result in results] == ["full transcript", "full transcript"]
+    finally:
+        ai_service.get_ai_service = original
+    
+    print("\n✅ 批量提取测试完成")
+
+
+def test_batch_extraction():
+    asyncio.run(check_batch_extraction())
+
+
+def test_ydl_reuse():
+    """测试相同配置的 YoutubeDL 实例在同一线程内复用"""
+    print("\n" + "="*60)
+    print("测试 2: YoutubeDL 实例复用")
+    print("="*60)
+    
+    extractor = YouTubeExtractor()
+    first = extractor._get_ydl({"quiet": True, "skip_download": True}, "/tmp/first")
+    second = extractor._get_ydl({"quiet": True, "skip_download": True}, "/tmp/second")
+    other = extractor._get_ydl({"quiet": True, "format": "bestaudio/best"}, "/tmp/other")
+    
+    assert first is second
+    assert other is not first
+    assert second.params["outtmpl"]["default"] == "/tmp/second"
+    
+    print("\n✅ 实例复用测试完成")
+
+
+def test_clean_srt_format():
+    """测试 SRT 字幕清理：去掉序号、时间戳和空行"""
+    print("\n" + "="*60)
+    print("测试 3: SRT 字幕清理")
+    print("="*60)
+    
+    srt = "1\n00:00:01,000 --> 00:00:02,500\nHello there\n\n2\n00:00:03,000 --> 00:00:04,000\n  second line  \n2024 is here\n"
+    cleaned = YouTubeExtractor()._clean_srt_format(srt)
+    print(f"  清理结果: {cleaned}")
+    assert cleaned == "Hello there second line 2024 is here"
+    
+    vtt = "WEBVTT\nKind: captions\nLanguage: en\n\n00:00:00.000 --> 00:00:02.000 align:start\nHello<00:00:01.000><c> world</c>\n"
+    assert YouTubeExtractor()._clean_srt_format(vtt) == "Hello world"
+    
+    print("\n✅ SRT 清理测试完成")
+
+
+def test_validate_metadata():
+    """测试元数据结构校验"""
+    print("\n" + "="*60)
+    print("测试 4: 元数据结构校验")
+    print("="*60)
+    
+    valid = _validate_metadata({"title": "T", "duration": "300", "uploader": "U"})
+    assert valid == {"title": "T", "description": "", "duration": 300.0, "uploader": "U"}
+    assert _validate_metadata({"title": "T", "duration": "5 minutes", "uploader": "U"}) is None
+    assert _validate_metadata({"title": "T"}) is None
+    assert _validate_metadata(["not", "an", "object"]) is None
+    assert _validate_metadata(None) is None
+    
+    print("\n✅ 元数据校验测试完成")
+
+
+async def check_invalid_url():
+    """测试无效 URL 在调用 Gemini 之前被拒绝"""
+    print("\n" + "="*60)
+    print("测试 6: 无效 URL 快速失败")
+    print("="*60)
+    
+    assert YouTubeExtractor.validate_and_extract(TEST_URL) == ("dQw4w9WgXcQ", None)
+    assert YouTubeExtractor.validate_and_extract("https://youtu.be/short")[0] is None
+    assert YouTubeExtractor.validate_and_extract("https://example.com/x") == (None, "无效的 YouTube URL")
+    assert YouTubeExtractor.validate_url("https://youtu.be/short")[0] is False
+    assert YouTubeExtractor.extract_video_id("https://youtu.be/short") is None
+    assert YouTubeExtractor.extract_video_id(TEST_URL) == "dQw4w9WgXcQ"
+    assert YouTubeExtractor.validate_urls_bulk(
+        [TEST_URL, "https://youtu.be/short", "", "x\nhttps://youtu.be/dQw4w9WgXcQ", " https://youtu.be/dQw4w9WgXcQ "]
+    ) == [(True, "dQw4w9WgXcQ"), (False, None), (False, None), (False, None), (True, "dQw4w9WgXcQ")]
+    
+    extractor = YouTubeExtractor()
+    fake = FakeAIService()
+    original = ai_service.get_ai_service
+    ai_service.get_ai_service = lambda: fake
+    try:
+        for url in ["", "https://example.com/watch?v=dQw4w9WgXcQ", "https://youtu.be/short"]:
+            for call in (extractor.extract_metadata(url), extractor.extract_content(url)):
+                try:
+                    await call
+                except ValueError as e:
+                    print(f"  {url!r}: {e}")
+                else:
+                    raise AssertionError(f"应拒绝无效 URL: {url!r}")
+        assert fake.calls == []
+    finally:
+        ai_service.get_ai_service = original
+    
+    print("\n✅ 无效 URL 测试完成")
+
+
+def test_invalid_url():
+    asyncio.run(check_invalid_url())
+
+
+async def check_subtitles_reuse_info():
+    """测试字幕下载复用缓存的 yt-dlp 视频信息"""
+    print("\n" + "="*60)
+    print("测试 7: 字幕下载复用视频信息")
+    print("="*60)
+    
+    extract_calls = []
+    
+    class FakeYoutubeDL:
+        def extract_info(self, url, download=False):
+            extract_calls.append(url)
+            return {"subtitles": {"en": [{"ext": "vtt", "url": "https://example.com/subs.vtt"}]}}
+        
+        def sanitize_info(self, info):
+            return info
+    
+    extractor = YouTubeExtractor()
+    extractor._get_ydl = lambda ydl_opts, outtmpl=None: FakeYoutubeDL()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, text="WEBVTT\n\n00:00:00.000 --> 00:00:01.000\nHi there\n")
+    ))
+    original = youtube_extractor_module.get_async_client
+    youtube_extractor_module.get_async_client = lambda: client
+    try:
+        first = await extractor.download_subtitles("https://youtu.be/dQw4w9WgXcQ")
+        second = await extractor.download_subtitles(TEST_URL)
+    finally:
+        youtube_extractor_module.get_async_client = original
+        await client.aclose()
+    
+    print(f"  extract_info 调用次数: {len(extract_calls)}")
+    assert first == second == "Hi there"
+    assert len(extract_calls) == 1
+    
+    print("\n✅ 视频信息复用测试完成")
+
+
+def test_subtitles_reuse_info():
+    asyncio.run(check_subtitles_reuse_info())
+
+
+async def main():
+    """运行所有测试"""
+    print("\n" + "="*60)
+    print("🚀 YouTubeExtractor 服务测试")
+    print("="*60)
+    
+    await check_combined_extraction()
+    await check_batch_extraction()
+    test_ydl_reuse()
+    test_clean_srt_format()
+    test_validate_metadata()
+    await check_subtitles_reuse_info()
+    await check_invalid_url()
+    
+    print("\n" + "="*60)
+    print("🎉 所有测试完成！")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())